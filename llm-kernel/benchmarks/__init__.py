@@ -0,0 +1,14 @@
+"""
+Microbenchmarks of the protocol and request-building hot paths, and of
+how the request path and shared state scale over worker processes.
+
+Run from the llm-kernel directory:
+
+    python -m benchmarks run [--quick] [-k NAME] [--save NAME]
+    python -m benchmarks compare BASELINE [--threshold 0.2]
+
+Baselines are machine-specific: compare against one recorded on the same
+machine, e.g. with `run --save local` before a change and
+`compare local` after it. compare refuses a baseline recorded with
+another Python version or platform.
+"""
@@ -0,0 +1,107 @@
+import argparse
+import sys
+
+from benchmarks import cases  # noqa: F401  (registers the cases)
+from benchmarks.harness import Result, baseline_path, compare, load, platform_mismatch, run, save, select
+
+
+def _report(name: str, result: Result) -> None:
+    print(
+        f"{name:<48} {result.ops_per_sec:>12,.1f} ops/s {result.mean_ms:>11.4f} ms"
+        f" {result.peak_kb:>12,.1f} KB peak {result.retained_kb:>10,.1f} KB retained"
+        f" {result.allocations:>10,} allocs",
+        flush=True,
+    )
+
+
+def _run(args: argparse.Namespace) -> dict:
+    selected = select(args.k, args.quick)
+    if not selected:
+        sys.exit(f"No benchmark matches {args.k!r}")
+    return run(selected, args.min_time, args.rounds, _report)
+
+
+def cmd_list(args: argparse.Namespace) -> int:
+    for c in select(args.k, args.quick):
+        print(c.name)
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    document = _run(args)
+    if args.save:
+        path = baseline_path(args.save)
+        save(document, path)
+        print(f"Saved to {path}")
+    return 0
+
+
+def cmd_compare(args: argparse.Namespace) -> int:
+    path = baseline_path(args.baseline)
+    if not path.exists():
+        sys.exit(f"No baseline at {path}: record one with `python -m benchmarks run --save {args.baseline}`")
+    baseline = load(path)
+    current = load(baseline_path(args.against)) if args.against else _run(args)
+    mismatch = platform_mismatch(baseline, current)
+    if mismatch and not args.any_platform:
+        sys.exit(
+            f"Baseline {path} was recorded with different {', '.join(mismatch)} "
+            f"({', '.join(str(baseline['meta'].get(key)) for key in mismatch)}); "
+            "record one here or pass --any-platform"
+        )
+
+    regressions, improvements = compare(baseline, current, args.threshold)
+    missing = sorted(set(current["results"]) - set(baseline["results"]))
+    print(f"\nAgainst {path} ({baseline['meta']['created']}, Python {baseline['meta']['python']}):")
+    for title, changes in (("Regressions", regressions), ("Improvements", improvements)):
+        for change in changes:
+            print(
+                f"  {title[:-1].lower():<12} {change.name:<48} {change.metric:<12}"
+                f" {change.baseline:>14,.1f} -> {change.current:>14,.1f} ({change.ratio:.2f}x)"
+            )
+    if missing:
+        print(f"  not in baseline: {', '.join(missing)}")
+    print(f"{len(regressions)} regression(s), {len(improvements)} improvement(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_selection(command: argparse.ArgumentParser) -> None:
+        command.add_argument("-k", default="", metavar="NAME", help="Only cases whose name contains NAME")
+        command.add_argument("--quick", action="store_true", help="Skip payloads of 10 MB and more")
+        command.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timing round")
+        command.add_argument("--rounds", type=int, default=5, help="Timing rounds, the best one counts")
+
+    list_parser = commands.add_parser("list", help="List benchmark cases")
+    add_selection(list_parser)
+    list_parser.set_defaults(handler=cmd_list)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks")
+    add_selection(run_parser)
+    run_parser.add_argument("--save", metavar="NAME", help="Store results as baseline NAME (or a .json path)")
+    run_parser.set_defaults(handler=cmd_run)
+
+    compare_parser = commands.add_parser(
+        "compare", help="Run benchmarks and compare with a baseline; exits 1 on regressions",
+    )
+    add_selection(compare_parser)
+    compare_parser.add_argument("baseline", help="Baseline name or .json path, recorded on this machine")
+    compare_parser.add_argument("--against", metavar="NAME", help="Compare stored results instead of running")
+    compare_parser.add_argument(
+        "--any-platform", action="store_true",
+        help="Compare even if the baseline is from another Python version or platform",
+    )
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.2, help="Relative change reported, 0.2 = 20%% (default)",
+    )
+    compare_parser.set_defaults(handler=cmd_compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+import asyncio
+import json
+import os
+import ssl
+import tempfile
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import httpx
+
+from benchmarks.harness import case
+from src.core.message_builder import build_chat_request
+from src.core.openrouter import OpenRouterClient, iter_request_body
+from src.core.shared_state import SharedStore
+from src.models.config import DefaultsConfig, OpenRouterConfig
+from src.models.requests import LLMRequest
+from src.server.protocol import (
+    SerializationFormat,
+    create_chunk,
+    create_complete,
+    deserialize_request,
+    load_protobuf,
+    serialize_response,
+)
+
+
+PROMPT_SIZES = {
+    "1KB": 1024,
+    "100KB": 100 * 1024,
+    "10MB": 10 * 1024 * 1024,
+    "100MB": 100 * 1024 * 1024,
+}
+
+# Completions are far shorter than prompts in practice
+REPLY_SIZES = {name: size for name, size in PROMPT_SIZES.items() if size < 100 * 1024 * 1024}
+
+STREAM_CHUNKS = 10_000
+
+# Dialog length for structured history against the same dialog flattened into user_prompt
+HISTORY_MESSAGES = 2000
+
+# Worker process counts for the 1-to-N core scaling cases. Counts over
+# os.cpu_count() still run, and show what oversubscription costs
+WORKER_COUNTS = (1, 2, 4, 8)
+
+# Work per scaling operation, split evenly between the workers
+SCALING_REQUESTS = 512
+SCALING_UPDATES = 256
+
+# Chat transcript lines: Cyrillic, quotes and tabs, so encoders have escaping to do
+_TRANSCRIPT = "\n".join([
+    'Алиса: Ты видел, что вчера выложили "новую" версию? Говорят, вдвое быстрее.',
+    "Bob: Yes — and the changelog says it's 2x faster.\tNot sure I believe it though.",
+    'Кирилл: Проверю вечером на своих данных и пришлю цифры {"runs": 3, "warmup": true}.',
+    "Alice: Deal. If it holds up, we switch the staging cluster on Monday.",
+]) + "\n"
+
+_SYSTEM_PROMPT = (
+    "You are Alice, a participant of a group chat. Stay in character, answer briefly, "
+    "never speak for other participants. " * 12
+)
+
+
+def text(size: int) -> str:
+    """Transcript text of about size bytes in UTF-8."""
+    unit = _TRANSCRIPT.encode("utf-8")
+    data = unit * (size // len(unit) + 1)
+    return data[:size].decode("utf-8", errors="ignore")
+
+
+def request_fields(prompt_size: int) -> dict:
+    return {
+        "request_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "model": "anthropic/claude-3.5-sonnet",
+        "system_prompt": _SYSTEM_PROMPT,
+        "user_prompt": text(prompt_size),
+        "stream": True,
+        "persona": "Alice",
+    }
+
+
+def history_fields(messages: int, flattened: bool) -> dict:
+    """Request with a multi-speaker dialog, as history messages or flattened into the user prompt."""
+    lines = _TRANSCRIPT.splitlines()
+    history = []
+    for i in range(messages):
+        name, _, content = lines[i % len(lines)].partition(": ")
+        history.append({"role": "assistant" if name == "Alice" else "user", "name": name, "content": content})
+    fields = {**request_fields(0), "user_prompt": ""}
+    if flattened:
+        fields["user_prompt"] = "\n".join(f"{m['name']}: {m['content']}" for m in history)
+    else:
+        fields["messages"] = history
+    return fields
+
+
+def _protobuf_request(fields: dict) -> bytes:
+    message = load_protobuf().WebSocketMessage()
+    for field, value in fields.items():
+        if field == "messages":
+            for item in value:
+                message.request.messages.add(**item)
+        else:
+            setattr(message.request, field, value)
+    return message.SerializeToString()
+
+
+def _in_loop(
+    coro_fn: Callable[[], Awaitable[object]],
+    cleanup: Callable[[], Awaitable[object]] | None = None,
+) -> Iterator[Callable[[], object]]:
+    """Yield an operation running coro_fn to completion in a private event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        yield lambda: loop.run_until_complete(coro_fn())
+    finally:
+        if cleanup is not None:
+            loop.run_until_complete(cleanup())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+for _label, _size in PROMPT_SIZES.items():
+
+    @case(f"deserialize_request/json/{_label}", size=_size)
+    def _deserialize_json(size: int = _size):
+        payload = json.dumps(request_fields(size), ensure_ascii=False)
+        yield lambda: deserialize_request(payload, SerializationFormat.JSON)
+
+    @case(f"deserialize_request/protobuf/{_label}", size=_size)
+    def _deserialize_protobuf(size: int = _size):
+        payload = _protobuf_request(request_fields(size))
+        yield lambda: deserialize_request(payload, SerializationFormat.PROTOBUF)
+
+    @case(f"build_chat_request/{_label}", size=_size)
+    def _build(size: int = _size):
+        request = LLMRequest.model_validate(request_fields(size))
+        defaults = DefaultsConfig()
+        yield lambda: build_chat_request(request, defaults)
+
+    @case(f"encode_request_body/{_label}", size=_size)
+    def _encode(size: int = _size):
+        chat_request = build_chat_request(LLMRequest.model_validate(request_fields(size)), DefaultsConfig())
+
+        async def encode() -> int:
+            # Count instead of joining: the body is streamed, never held whole
+            return sum([len(piece) async for piece in iter_request_body(chat_request, stream=True)])
+
+        yield from _in_loop(encode)
+
+
+for _form in ("history", "flattened"):
+    _name = f"{_form}-{HISTORY_MESSAGES}msgs"
+
+    @case(f"deserialize_request/json/{_name}")
+    def _deserialize_history_json(flattened: bool = _form == "flattened"):
+        payload = json.dumps(history_fields(HISTORY_MESSAGES, flattened), ensure_ascii=False)
+        yield lambda: deserialize_request(payload, SerializationFormat.JSON)
+
+    @case(f"deserialize_request/protobuf/{_name}")
+    def _deserialize_history_protobuf(flattened: bool = _form == "flattened"):
+        payload = _protobuf_request(history_fields(HISTORY_MESSAGES, flattened))
+        yield lambda: deserialize_request(payload, SerializationFormat.PROTOBUF)
+
+    @case(f"build_chat_request/{_name}")
+    def _build_history(flattened: bool = _form == "flattened"):
+        request = LLMRequest.model_validate(history_fields(HISTORY_MESSAGES, flattened))
+        defaults = DefaultsConfig()
+        yield lambda: build_chat_request(request, defaults)
+
+    @case(f"encode_request_body/{_name}")
+    def _encode_history(flattened: bool = _form == "flattened"):
+        request = LLMRequest.model_validate(history_fields(HISTORY_MESSAGES, flattened))
+        chat_request = build_chat_request(request, DefaultsConfig())
+
+        async def encode() -> int:
+            return sum([len(piece) async for piece in iter_request_body(chat_request, stream=True)])
+
+        yield from _in_loop(encode)
+
+
+for _fmt in SerializationFormat:
+
+    @case(f"serialize_response/{_fmt.value}/chunk")
+    def _serialize_chunk(fmt: SerializationFormat = _fmt):
+        response = create_chunk("0f8fad5b-d9cb-469f-a165-70867728950e", "Говорят, ")
+        yield lambda: serialize_response(response, fmt)
+
+    for _label, _size in REPLY_SIZES.items():
+
+        @case(f"serialize_response/{_fmt.value}/complete/{_label}", size=_size)
+        def _serialize_complete(fmt: SerializationFormat = _fmt, size: int = _size):
+            response = create_complete(
+                request_id="0f8fad5b-d9cb-469f-a165-70867728950e",
+                content=text(size),
+                finish_reason="stop",
+                prompt_tokens=1200,
+                completion_tokens=size // 4,
+            )
+            yield lambda: serialize_response(response, fmt)
+
+
+def _sse_events(chunks: int) -> list[bytes]:
+    """SSE events of a streamed completion, one network read each."""
+    words = text(chunks * 8).split(" ")
+    events = []
+    for i in range(chunks):
+        chunk = {
+            "id": "gen-1729000000-abc",
+            "object": "chat.completion.chunk",
+            "created": 1729000000,
+            "model": "anthropic/claude-3.5-sonnet",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": words[i % len(words)] + " "}}],
+        }
+        events.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+    final = {
+        "id": "gen-1729000000-abc",
+        "model": "anthropic/claude-3.5-sonnet",
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1200, "completion_tokens": chunks, "total_tokens": 1200 + chunks},
+    }
+    events.append(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+    return events
+
+
+@case(f"parse_sse_stream/{STREAM_CHUNKS // 1000}K-chunks")
+def _parse_stream():
+    events = _sse_events(STREAM_CHUNKS)
+
+    async def body() -> AsyncIterator[bytes]:
+        for event in events:
+            yield event
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    config = OpenRouterConfig(base_url="http://openrouter.test/api/v1")
+    client = OpenRouterClient(api_key="benchmark", config=config)
+    # Upstream is replaced by the in-process transport, which needs no CA certificates
+    client._ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client._client = httpx.AsyncClient(base_url=config.base_url, transport=httpx.MockTransport(handler))
+    chat_request = build_chat_request(LLMRequest.model_validate(request_fields(1024)), DefaultsConfig())
+
+    async def parse() -> int:
+        return sum([len(chunk.choices) async for chunk in client.chat_completion_stream(chat_request)])
+
+    yield from _in_loop(parse, cleanup=client.close)
+
+
+# Scaling cases run in worker processes, like server.workers > 1. An
+# operation is a fixed amount of work split between the workers, so ideal
+# scaling multiplies ops/s by the worker count, up to the number of cores.
+# Memory columns only cover the parent process here
+
+_worker_payload = ""
+_worker_store: SharedStore | None = None
+
+
+def _init_request_worker() -> None:
+    global _worker_payload
+    _worker_payload = json.dumps(request_fields(1024), ensure_ascii=False)
+
+
+def _request_path(count: int) -> int:
+    """What a worker does per client request: validate, build the upstream request, encode the reply."""
+    defaults = DefaultsConfig()
+    size = 0
+    for _ in range(count):
+        request = deserialize_request(_worker_payload, SerializationFormat.JSON)
+        build_chat_request(request, defaults)
+        reply = create_complete(
+            request_id=request.request_id,
+            content=request.user_prompt[:256],
+            finish_reason="stop",
+            prompt_tokens=1200,
+            completion_tokens=64,
+        )
+        size += len(serialize_response(reply, SerializationFormat.JSON))
+    return size
+
+
+def _init_store_worker(path: str) -> None:
+    global _worker_store
+    _worker_store = SharedStore(Path(path))
+    _worker_store.open()
+
+
+def _store_updates(count: int) -> int:
+    """Rate limit bucket updates, each one a transaction on the shared database."""
+    def consume(value: dict | None) -> tuple[dict, float]:
+        tokens = (value or {"tokens": 1e9})["tokens"] - 1000
+        return {"tokens": tokens}, tokens
+
+    for _ in range(count):
+        _worker_store.update("rate_limit", "benchmark|model", consume)
+    return count
+
+
+def _in_workers(
+    workers: int,
+    total: int,
+    fn: Callable[[int], int],
+    initializer: Callable[..., None],
+    initargs: tuple = (),
+) -> Iterator[Callable[[], object]]:
+    """Yield an operation running fn over total units of work split between worker processes."""
+    shares = [total // workers + (i < total % workers) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        # Start every worker before timing
+        list(pool.map(fn, [0] * workers))
+        yield lambda: sum(pool.map(fn, shares))
+
+
+for _workers in WORKER_COUNTS:
+
+    @case(f"scaling/request_path/{_workers}-workers")
+    def _scale_request_path(workers: int = _workers):
+        yield from _in_workers(workers, SCALING_REQUESTS, _request_path, _init_request_worker)
+
+    @case(f"scaling/shared_store/{_workers}-workers")
+    def _scale_shared_store(workers: int = _workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shared_state.sqlite3")
+            store = SharedStore(Path(path))
+            store.open()  # Creates the schema once, before workers race for it
+            store.close()
+            yield from _in_workers(workers, SCALING_UPDATES, _store_updates, _init_store_worker, (path,))
@@ -0,0 +1,212 @@
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+
+# Sizes at or over this are skipped by --quick
+LARGE_SIZE = 10 * 1024 * 1024
+
+# Peak memory changes under this many KB are noise, whatever the ratio
+MEMORY_NOISE_KB = 64
+
+# Same for allocation count changes under this many blocks
+ALLOCATION_NOISE = 100
+
+# Baseline metadata that must match for timings to be comparable
+PLATFORM_KEYS = ("python", "platform", "machine")
+
+
+@dataclass
+class Case:
+    """One benchmark: setup builds its inputs and yields the operation to time."""
+
+    name: str
+    setup: Callable[[], AbstractContextManager[Callable[[], object]]]
+    size: int = 0  # Payload size in bytes, for --quick
+
+
+@dataclass
+class Result:
+    ops_per_sec: float
+    mean_ms: float  # Best round, per operation
+    peak_kb: float  # Memory allocated at the high-water mark of one operation
+    retained_kb: float  # Memory still held once the operation's result is dropped
+    allocations: int  # Memory blocks allocated by one operation and still live when it returns
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, size: int = 0) -> Callable:
+    """Register a setup generator as a benchmark case; code after its yield cleans up."""
+    def register(setup: Callable[[], Iterator[Callable[[], object]]]) -> Callable:
+        CASES.append(Case(name, contextmanager(setup), size))
+        return setup
+    return register
+
+
+def _time(op: Callable[[], object], number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        op()
+    return time.perf_counter() - started
+
+
+def measure(op: Callable[[], object], min_time: float, rounds: int) -> Result:
+    """
+    Time an operation and measure the memory one run of it takes.
+
+    Like timeit, the call count per round is calibrated to take at least
+    min_time and garbage collection is off while timing; the best round
+    counts. Memory is traced in a separate run, as tracing slows it down.
+    """
+    op()  # Warm-up: first-call imports and caches are not what is measured
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = 1
+        while True:
+            elapsed = _time(op, number)
+            if elapsed >= min_time:
+                break
+            number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+        best = min([elapsed, *(_time(op, number) for _ in range(rounds - 1))]) / number
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    gc.collect()
+    # With collection off, blocks freed by refcounting are the only ones
+    # given back, so the count includes the operation's garbage cycles
+    gc.disable()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        blocks = sys.getallocatedblocks()
+        result = op()
+        allocations = sys.getallocatedblocks() - blocks
+        peak = tracemalloc.get_traced_memory()[1] - start
+        del result
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+        if gc_enabled:
+            gc.enable()
+
+    return Result(
+        ops_per_sec=round(1 / best, 2),
+        mean_ms=round(best * 1000, 4),
+        peak_kb=round(peak / 1024, 1),
+        retained_kb=round(max(0, retained) / 1024, 1),
+        allocations=max(0, allocations),
+    )
+
+
+def select(name_filter: str = "", quick: bool = False) -> list[Case]:
+    return [
+        c for c in CASES
+        if name_filter in c.name and not (quick and c.size >= LARGE_SIZE)
+    ]
+
+
+def run(cases: list[Case], min_time: float, rounds: int, report: Callable[[str, Result], None]) -> dict:
+    """Run cases in order, returning a results document that can be saved as a baseline."""
+    results = {}
+    for c in cases:
+        with c.setup() as op:
+            result = measure(op, min_time, rounds)
+        results[c.name] = asdict(result)
+        report(c.name, result)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **platform_meta(),
+        },
+        "results": results,
+    }
+
+
+def platform_meta() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def platform_mismatch(baseline: dict, current: dict) -> list[str]:
+    """Metadata keys on which two results documents differ, so their timings are not comparable."""
+    return [key for key in PLATFORM_KEYS if baseline["meta"].get(key) != current["meta"].get(key)]
+
+
+def baseline_path(name: str) -> Path:
+    """Path of a stored baseline by name, or the path itself if one is given."""
+    if name.endswith(".json"):
+        return Path(name)
+    return BASELINES_DIR / f"{name}.json"
+
+
+def save(document: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+
+
+def load(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+@dataclass
+class Change:
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple[list[Change], list[Change]]:
+    """
+    Find benchmarks that got slower, hungrier or allocate more by more than threshold (0.2 = 20%).
+
+    Returns:
+        Regressions and improvements, over cases present in both documents
+    """
+    regressions, improvements = [], []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+
+        speed = Change(name, "ops_per_sec", before["ops_per_sec"], now["ops_per_sec"])
+        if speed.ratio < 1 - threshold:
+            regressions.append(speed)
+        elif speed.ratio > 1 + threshold:
+            improvements.append(speed)
+
+        memory = [(Change(name, "peak_kb", before["peak_kb"], now["peak_kb"]), MEMORY_NOISE_KB)]
+        # Baselines recorded before allocations were counted have none
+        if "allocations" in before:
+            memory.append((Change(name, "allocations", before["allocations"], now["allocations"]), ALLOCATION_NOISE))
+        for change, noise in memory:
+            if abs(change.current - change.baseline) < noise:
+                continue
+            if change.current > change.baseline * (1 + threshold):
+                regressions.append(change)
+            elif change.current < change.baseline * (1 - threshold):
+                improvements.append(change)
+    return regressions, improvements
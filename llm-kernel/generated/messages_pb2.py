@@ -24,21 +24,33 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0emessages.proto\x12\tllmkernel\"k\n\nLLMRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\r\n\x05model\x18\x02 \x01(\t\x12\x15\n\rsystem_prompt\x18\x03 \x01(\t\x12\x13\n\x0buser_prompt\x18\x04 \x01(\t\x12\x0e\n\x06stream\x18\x05 \x01(\x08\"V\n\x03\x41\x63k\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x02 \x01(\x08\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"2\n\x0bStreamChunk\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\"{\n\x0bLLMResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\x12\x15\n\rfinish_reason\x18\x03 \x01(\t\x12\x15\n\rprompt_tokens\x18\x04 \x01(\r\x12\x19\n\x11\x63ompletion_tokens\x18\x05 \x01(\r\"\xbb\x01\n\x10WebSocketMessage\x12(\n\x07request\x18\x01 \x01(\x0b\x32\x15.llmkernel.LLMRequestH\x00\x12\x1d\n\x03\x61\x63k\x18\x02 \x01(\x0b\x32\x0e.llmkernel.AckH\x00\x12\'\n\x05\x63hunk\x18\x03 \x01(\x0b\x32\x16.llmkernel.StreamChunkH\x00\x12*\n\x08response\x18\x04 \x01(\x0b\x32\x16.llmkernel.LLMResponseH\x00\x42\t\n\x07payloadb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0emessages.proto\x12\tllmkernel\"\x7f\n\x0bNextRequest\x12\r\n\x05model\x18\x01 \x01(\t\x12\x0f\n\x07persona\x18\x02 \x01(\t\x12\x15\n\rsystem_prompt\x18\x03 \x01(\t\x12\x13\n\x0buser_prompt\x18\x04 \x01(\t\x12$\n\x08messages\x18\x05 \x03(\x0b\x32\x12.llmkernel.Message\"M\n\nAttachment\x12\x11\n\tmime_type\x18\x01 \x01(\t\x12\x0c\n\x04hash\x18\x02 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\x12\x10\n\x08\x66ilename\x18\x04 \x01(\t\"6\n\x07Message\x12\x0c\n\x04role\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x03 \x01(\t\"\xb2\x02\n\nLLMRequest\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\r\n\x05model\x18\x02 \x01(\t\x12\x15\n\rsystem_prompt\x18\x03 \x01(\t\x12\x13\n\x0buser_prompt\x18\x04 \x01(\t\x12\x0e\n\x06stream\x18\x05 \x01(\x08\x12\x10\n\x08priority\x18\x06 \x01(\t\x12\x13\n\x0b\x64\x65\x61\x64line_ms\x18\x07 \x01(\r\x12\x0f\n\x07persona\x18\x08 \x01(\t\x12\r\n\x05tools\x18\t \x03(\t\x12,\n\x0cnext_request\x18\n \x01(\x0b\x32\x16.llmkernel.NextRequest\x12*\n\x0b\x61ttachments\x18\x0b \x03(\x0b\x32\x15.llmkernel.Attachment\x12$\n\x08messages\x18\x0c \x03(\x0b\x32\x12.llmkernel.Message\"V\n\x03\x41\x63k\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x02 \x01(\x08\x12\x12\n\nerror_code\x18\x03 \x01(\t\x12\x15\n\rerror_message\x18\x04 \x01(\t\"2\n\x0bStreamChunk\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\"\x91\x01\n\x0bLLMResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12\x0f\n\x07\x63ontent\x18\x02 \x01(\t\x12\x15\n\rfinish_reason\x18\x03 \x01(\t\x12\x15\n\rprompt_tokens\x18\x04 \x01(\r\x12\x19\n\x11\x63ompletion_tokens\x18\x05 \x01(\r\x12\x14\n\x0ctokens_saved\x18\x06 \x01(\r\"\x81\x01\n\x0eToolCallResult\x12\n\n\x02id\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x11\n\targuments\x18\x03 \x01(\t\x12\x0e\n\x06result\x18\x04 \x01(\t\x12\r\n\x05\x65rror\x18\x05 \x01(\t\x12\x0e\n\x06\x63\x61\x63hed\x18\x06 \x01(\x08\x12\x13\n\x0b\x64uration_ms\x18\x07 \x01(\r\"I\n\tToolCalls\x12\x12\n\nrequest_id\x18\x01 \x01(\t\x12(\n\x05\x63\x61lls\x18\x02 \x03(\x0b\x32\x19.llmkernel.ToolCallResult\">\n\x07\x43ontrol\x12\r\n\x05\x65vent\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65\x61\x64line_ms\x18\x03 \x01(\r\"\x8e\x02\n\x10WebSocketMessage\x12(\n\x07request\x18\x01 \x01(\x0b\x32\x15.llmkernel.LLMRequestH\x00\x12\x1d\n\x03\x61\x63k\x18\x02 \x01(\x0b\x32\x0e.llmkernel.AckH\x00\x12\'\n\x05\x63hunk\x18\x03 \x01(\x0b\x32\x16.llmkernel.StreamChunkH\x00\x12*\n\x08response\x18\x04 \x01(\x0b\x32\x16.llmkernel.LLMResponseH\x00\x12*\n\ntool_calls\x18\x05 \x01(\x0b\x32\x14.llmkernel.ToolCallsH\x00\x12%\n\x07\x63ontrol\x18\x06 \x01(\x0b\x32\x12.llmkernel.ControlH\x00\x42\t\n\x07payloadb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'messages_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_LLMREQUEST']._serialized_start=29
-  _globals['_LLMREQUEST']._serialized_end=136
-  _globals['_ACK']._serialized_start=138
-  _globals['_ACK']._serialized_end=224
-  _globals['_STREAMCHUNK']._serialized_start=226
-  _globals['_STREAMCHUNK']._serialized_end=276
-  _globals['_LLMRESPONSE']._serialized_start=278
-  _globals['_LLMRESPONSE']._serialized_end=401
-  _globals['_WEBSOCKETMESSAGE']._serialized_start=404
-  _globals['_WEBSOCKETMESSAGE']._serialized_end=591
+  _globals['_NEXTREQUEST']._serialized_start=29
+  _globals['_NEXTREQUEST']._serialized_end=156
+  _globals['_ATTACHMENT']._serialized_start=158
+  _globals['_ATTACHMENT']._serialized_end=235
+  _globals['_MESSAGE']._serialized_start=237
+  _globals['_MESSAGE']._serialized_end=291
+  _globals['_LLMREQUEST']._serialized_start=294
+  _globals['_LLMREQUEST']._serialized_end=600
+  _globals['_ACK']._serialized_start=602
+  _globals['_ACK']._serialized_end=688
+  _globals['_STREAMCHUNK']._serialized_start=690
+  _globals['_STREAMCHUNK']._serialized_end=740
+  _globals['_LLMRESPONSE']._serialized_start=743
+  _globals['_LLMRESPONSE']._serialized_end=888
+  _globals['_TOOLCALLRESULT']._serialized_start=891
+  _globals['_TOOLCALLRESULT']._serialized_end=1020
+  _globals['_TOOLCALLS']._serialized_start=1022
+  _globals['_TOOLCALLS']._serialized_end=1095
+  _globals['_CONTROL']._serialized_start=1097
+  _globals['_CONTROL']._serialized_end=1159
+  _globals['_WEBSOCKETMESSAGE']._serialized_start=1162
+  _globals['_WEBSOCKETMESSAGE']._serialized_end=1432
 # @@protoc_insertion_point(module_scope)
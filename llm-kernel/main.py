@@ -1,17 +1,25 @@
-import uvicorn
+# First import: marks the start of startup timing
+from src.utils import startup
 
-from src.server.app import create_app
-from src.utils.config import get_config
+with startup.phase("import uvicorn"):
+    import uvicorn
+
+# Imported ahead of the kernel modules only to time the framework separately
+with startup.phase("import fastapi"):
+    import fastapi  # noqa: F401
+
+with startup.phase("import kernel"):
+    from src.core.shared_state import SharedStore
+    from src.server.app import create_app
+    from src.server.runner import inherited_sockets, run_server
+    from src.utils.config import get_config, get_data_dir
 
 
 def main() -> None:
     """Entry point for LLM Kernel server."""
     config = get_config()
 
-    app = create_app()
-
-    uvicorn.run(
-        app,
+    server_options = dict(
         host=config.server.host,
         port=config.server.port,
         ws_max_size=config.websocket.max_message_size_bytes,
@@ -19,6 +27,30 @@ def main() -> None:
         ws_ping_timeout=config.websocket.ping_timeout_sec,
     )
 
+    if config.server.workers > 1:
+        # State left by a previous run (e.g. before a reboot, when monotonic
+        # timestamps in rate buckets are meaningless) must not leak in
+        store = SharedStore(get_data_dir() / config.storage.shared_state_file)
+        store.open()
+        store.clear()
+        store.close()
+
+        # Workers accept on one shared socket; a WebSocket connection stays
+        # on the worker that accepted it for its whole lifetime
+        uvicorn.run(
+            "src.server.app:create_app",
+            factory=True,
+            workers=config.server.workers,
+            **server_options,
+        )
+        return
+
+    with startup.phase("create app"):
+        app = create_app()
+
+    # A process started by a restart serves on its predecessor's socket
+    run_server(app, sockets=inherited_sockets(), **server_options)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+
+from src.core.blob_store import BlobError
+from src.server.app import get_blob_store
+
+
+router = APIRouter(prefix="/blobs", tags=["blobs"])
+
+
+@router.get("")
+async def get_blob_stats() -> dict:
+    """Get stored size and store/dedup/eviction counters."""
+    return get_blob_store().stats()
+
+
+@router.put("")
+async def put_blob(request: Request) -> dict:
+    """Store the raw request body as an attachment; requests then reference it by the returned hash."""
+    store = get_blob_store()
+    limit = store.config.max_blob_mb * 1024 * 1024
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail=f"Attachment is over {store.config.max_blob_mb} MB")
+
+    # Chunked uploads carry no length: count while reading
+    received = bytearray()
+    async for chunk in request.stream():
+        received += chunk
+        if len(received) > limit:
+            raise HTTPException(status_code=413, detail=f"Attachment is over {store.config.max_blob_mb} MB")
+    data = bytes(received)
+    try:
+        digest = await asyncio.to_thread(store.put, data)
+    except BlobError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"hash": digest, "size": len(data)}
+
+
+@router.get("/{digest}")
+async def get_blob(digest: str) -> dict:
+    """Check whether an attachment is stored, e.g. before sending a request that references it."""
+    size = await asyncio.to_thread(get_blob_store().size, digest.lower())
+    if size is None:
+        raise HTTPException(status_code=404, detail=f"Attachment {digest} is not stored")
+    return {"hash": digest.lower(), "size": size}
+
+
+@router.delete("/{digest}")
+async def delete_blob(digest: str) -> dict:
+    """Delete a stored attachment."""
+    if not await asyncio.to_thread(get_blob_store().delete, digest.lower()):
+        raise HTTPException(status_code=404, detail=f"Attachment {digest} is not stored")
+    return {"status": "ok"}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from src.server.app import get_response_cache
+
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("")
+async def get_cache_stats() -> dict:
+    """Get similarity cache hit rate and size."""
+    return get_response_cache().stats()
+
+
+@router.get("/hits")
+async def get_cache_hits(limit: int = Query(default=50, ge=1, le=200)) -> list[dict]:
+    """Get recently served hits with both prompts, for false-positive review."""
+    return get_response_cache().recent_hits(limit)
+
+
+@router.post("/hits/{hit_id}/reject")
+async def reject_cache_hit(hit_id: int) -> dict:
+    """Mark a served hit as a false positive and evict the cached answer."""
+    if not get_response_cache().reject_hit(hit_id):
+        raise HTTPException(status_code=404, detail=f"Hit {hit_id} is not in the review window")
+    return {"status": "ok"}
+
+
+@router.delete("")
+async def clear_cache() -> dict:
+    """Drop all cached responses."""
+    get_response_cache().clear()
+    return {"status": "ok"}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from src.server.app import get_profiler
+
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.post("/profiler/start")
+async def start_profiler(duration_sec: float = Query(default=30, gt=0)) -> dict:
+    """Start a sampling profile of the running kernel for duration_sec."""
+    profiler = get_profiler()
+    try:
+        profiler.start(duration_sec)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.status()
+
+
+@router.post("/profiler/stop")
+async def stop_profiler() -> dict:
+    """Stop the running profile early."""
+    profiler = get_profiler()
+    profiler.stop()
+    return profiler.status()
+
+
+@router.get("/profiler")
+async def get_profiler_status() -> dict:
+    """Get profiler state."""
+    return get_profiler().status()
+
+
+@router.get("/profiler/profile", response_class=PlainTextResponse)
+async def download_profile() -> PlainTextResponse:
+    """Download the last profile as collapsed stacks for flamegraph tools."""
+    profiler = get_profiler()
+    if profiler.status()["started_at"] is None:
+        raise HTTPException(status_code=404, detail="No profile recorded")
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="kernel-profile.folded"'},
+    )
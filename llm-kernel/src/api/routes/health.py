@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from pydantic import BaseModel
 
+from src.server.app import is_ready
+from src.utils import startup
+
 
 router = APIRouter(tags=["health"])
 
@@ -10,7 +13,27 @@ class HealthResponse(BaseModel):
     version: str
 
 
+class ReadinessResponse(BaseModel):
+    ready: bool  # Accepting LLM requests
+    warm: bool  # Background warm-up finished, first requests pay no loading costs
+    startup: dict
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
     """Health check endpoint."""
     return HealthResponse(status="ok", version="0.1.0")
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response) -> ReadinessResponse:
+    """
+    Readiness endpoint: 200 once requests can be sent, 503 while shutting down.
+
+    Clients can start sending as soon as this succeeds; warm-up continues
+    in background and is reported under startup.
+    """
+    ready = is_ready()
+    if not ready:
+        response.status_code = 503
+    return ReadinessResponse(ready=ready, warm=startup.warm(), startup=startup.report())
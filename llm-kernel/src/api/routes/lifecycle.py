@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+
+from src.server.app import get_drain_controller
+from src.server.runner import KernelServer, get_server
+
+
+router = APIRouter(prefix="/server", tags=["server"])
+
+
+def _server() -> KernelServer:
+    server = get_server()
+    if server is None:
+        raise HTTPException(
+            status_code=409,
+            detail="Workers are managed by uvicorn: send SIGTERM to stop or SIGHUP to restart its supervisor",
+        )
+    return server
+
+
+@router.get("/drain")
+async def get_drain_status() -> dict:
+    """Get drain state: whether draining, running requests and connected clients."""
+    return get_drain_controller().stats()
+
+
+@router.post("/shutdown", status_code=202)
+async def shutdown_server() -> dict:
+    """Stop taking requests, let running ones finish within server.drain_timeout_sec, then exit."""
+    if not _server().request_shutdown():
+        raise HTTPException(status_code=409, detail="Already stopping or restarting")
+    return {"status": "draining"}
+
+
+@router.post("/restart", status_code=202)
+async def restart_server() -> dict:
+    """Start a new server process on the same socket, then drain and exit this one."""
+    server = _server()
+    if not server.can_restart():
+        raise HTTPException(status_code=501, detail="Restart needs socket inheritance, which requires POSIX")
+    if not server.request_restart():
+        raise HTTPException(status_code=409, detail="Already stopping or restarting")
+    return {"status": "restarting"}
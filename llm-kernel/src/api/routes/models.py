@@ -1,52 +1,93 @@
-from fastapi import APIRouter, HTTPException
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
 from src.core.openrouter import OpenRouterError
-from src.server.app import get_openrouter_client
+from src.server.app import get_model_catalog
 
 
 router = APIRouter(tags=["models"])
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches etag.
+
+    The header may be "*" or a list of tags. The comparison is weak, as
+    RFC 9110 requires for If-None-Match, so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
 class ModelInfo(BaseModel):
     id: str
     name: str
     description: str
     context_length: int
+    pricing: dict
 
 
 class ModelsListResponse(BaseModel):
     models: list[ModelInfo]
-
-
-# Simple in-memory cache
-_models_cache: list[ModelInfo] | None = None
+    total: int
+    offset: int
+    limit: int
 
 
 @router.get("/models", response_model=ModelsListResponse)
-async def list_models(refresh: bool = False) -> ModelsListResponse:
+async def list_models(
+    request: Request,
+    response: Response,
+    refresh: bool = False,
+    q: str = "",
+    min_context: int = Query(default=0, ge=0),
+    max_prompt_price: float | None = Query(default=None, ge=0),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> ModelsListResponse | Response:
     """
     Get list of available models from OpenRouter.
 
     Args:
-        refresh: Force refresh cache if True
+        refresh: Force catalog refresh if True
+        q: Id prefix or id/name substring
+        min_context: Minimum context length
+        max_prompt_price: Maximum prompt price per token (USD)
+        offset: Pagination offset
+        limit: Page size
     """
-    global _models_cache
-
-    if _models_cache is None or refresh:
-        try:
-            client = get_openrouter_client()
-            raw_models = await client.list_models()
-            _models_cache = [
-                ModelInfo(
-                    id=m.id,
-                    name=m.name or m.id,
-                    description=m.description,
-                    context_length=m.context_length,
-                )
-                for m in raw_models
-            ]
-        except OpenRouterError as e:
-            raise HTTPException(status_code=502, detail=str(e))
-
-    return ModelsListResponse(models=_models_cache)
+    try:
+        snapshot = await get_model_catalog().get(force_refresh=refresh)
+    except OpenRouterError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    # ETag covers catalog version and query, so pages are cached independently
+    query_key = repr((q, min_context, max_prompt_price, offset, limit)).encode("utf-8")
+    etag = f'W/"{snapshot.etag}-{hashlib.sha256(query_key).hexdigest()[:8]}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    found = snapshot.search(q, min_context=min_context, max_prompt_price=max_prompt_price)
+    page = found[offset:offset + limit]
+    return ModelsListResponse(
+        models=[
+            ModelInfo(
+                id=m.id,
+                name=m.name or m.id,
+                description=m.description,
+                context_length=m.context_length,
+                pricing=m.pricing,
+            )
+            for m in page
+        ],
+        total=len(found),
+        offset=offset,
+        limit=limit,
+    )
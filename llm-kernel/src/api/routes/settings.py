@@ -2,7 +2,8 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from src.models.config import AppConfig
-from src.utils.config import get_api_key, get_config, save_config, set_api_key
+from src.server.app import apply_config
+from src.utils.config import get_api_key, get_config, save_config_async, set_api_key_async
 
 
 router = APIRouter(tags=["settings"])
@@ -25,8 +26,9 @@ async def get_configuration() -> AppConfig:
 
 @router.put("/config", response_model=AppConfig)
 async def update_configuration(config: AppConfig) -> AppConfig:
-    """Update and save configuration."""
-    save_config(config)
+    """Update and save configuration, applying it to running services."""
+    await save_config_async(config)
+    await apply_config(config)
     return config
 
 
@@ -48,5 +50,6 @@ async def update_api_key(update: ApiKeyUpdate) -> dict:
     if not update.api_key:
         raise HTTPException(status_code=400, detail="API key cannot be empty")
 
-    set_api_key(update.api_key)
+    await set_api_key_async(update.api_key)
+    await apply_config(get_config())
     return {"status": "ok", "message": "API key updated"}
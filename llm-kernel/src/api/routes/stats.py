@@ -0,0 +1,30 @@
+import asyncio
+
+from fastapi import APIRouter
+
+from src.server.app import (
+    WORKER_STATS_INTERVAL_SEC,
+    WORKER_STATS_NAMESPACE,
+    get_shared_store,
+    runtime_stats,
+)
+
+
+router = APIRouter(tags=["stats"])
+
+
+@router.get("/stats")
+async def get_stats() -> dict:
+    """
+    Get kernel runtime statistics.
+
+    In multi-worker mode the response comes from whichever worker accepted
+    the connection; "workers" holds the latest snapshot of every worker.
+    """
+    stats = await runtime_stats()
+    store = get_shared_store()
+    if store is not None:
+        stats["workers"] = await asyncio.to_thread(
+            store.items, WORKER_STATS_NAMESPACE, max_age_sec=3 * WORKER_STATS_INTERVAL_SEC
+        )
+    return stats
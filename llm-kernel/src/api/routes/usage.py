@@ -0,0 +1,51 @@
+import time
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from src.server.app import get_request_journal
+
+
+router = APIRouter(prefix="/usage", tags=["usage"])
+
+_DEFAULT_WINDOW_SEC = 24 * 3600
+
+
+class UsageResponse(BaseModel):
+    since: float
+    until: float
+    group_by: str | None
+    bucket_sec: int | None
+    rows: list[dict]
+
+
+@router.get("", response_model=UsageResponse)
+async def get_usage(
+    since: float | None = Query(default=None, description="Window start, unix time (default: 24h ago)"),
+    until: float | None = Query(default=None, description="Window end, unix time (default: now)"),
+    group_by: Literal["model", "persona", "client_id", "priority", "outcome", "source"] | None = None,
+    bucket_sec: int | None = Query(default=None, ge=60, description="Time series bucket width"),
+) -> UsageResponse:
+    """
+    Aggregate token usage, cost and latency from the request journal.
+
+    Args:
+        since: Window start
+        until: Window end
+        group_by: Optional breakdown, e.g. per model or persona
+        bucket_sec: Optional time bucket width, e.g. 3600 for hourly rows
+    """
+    until = until if until is not None else time.time()
+    since = since if since is not None else until - _DEFAULT_WINDOW_SEC
+    if since >= until:
+        raise HTTPException(status_code=400, detail="'since' must be before 'until'")
+
+    rows = await get_request_journal().aggregate(since, until, group_by=group_by, bucket_sec=bucket_sec)
+    return UsageResponse(since=since, until=until, group_by=group_by, bucket_sec=bucket_sec, rows=rows)
+
+
+@router.get("/recent")
+async def get_recent_requests(limit: int = Query(default=100, ge=1, le=1000)) -> list[dict]:
+    """Get the most recent journal entries, newest first."""
+    return await get_request_journal().recent(limit)
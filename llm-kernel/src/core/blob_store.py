@@ -0,0 +1,188 @@
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.models.config import BlobStoreConfig
+from src.utils.logging import get_logger
+
+
+logger = get_logger("blobs")
+
+_HASH_RE = re.compile(r"[0-9a-f]{64}")
+
+# Eviction frees space down to this share of max_total_mb, so it doesn't run on every put
+EVICT_TO_FRACTION = 0.9
+
+
+class BlobError(Exception):
+    """Blob could not be stored or read."""
+    pass
+
+
+class BlobNotFound(BlobError):
+    """No blob with this hash is stored."""
+    pass
+
+
+def blob_hash(data: bytes) -> str:
+    """SHA-256 hex digest that names a blob."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed store of attachment data.
+
+    Each blob is a file named by the SHA-256 of its data, so a client
+    uploads an image once and later turns only reference its hash. Reads
+    memory-map the file: the data is paged in from disk while the upstream
+    request body is encoded, never held on the heap as a whole. A blob's
+    mtime is its last use; once the store grows over max_total_mb, the
+    least recently used blobs are deleted.
+
+    The directory is the source of truth, so worker processes can share
+    it. Calls block on disk: async code should run them in a worker thread.
+    """
+
+    def __init__(self, config: BlobStoreConfig, root: Path):
+        self.config = config
+        self.root = root
+        self._total = 0
+        self._lock = threading.Lock()
+        self._counters: Counter[str] = Counter()
+
+    def open(self) -> None:
+        """Create the directory and measure what is stored."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._total = sum(size for _, _, size in self._scan())
+
+    def _path(self, digest: str) -> Path:
+        if not _HASH_RE.fullmatch(digest):
+            raise BlobNotFound(f"Not a blob hash: {digest!r}")
+        return self.root / digest
+
+    def _scan(self) -> list[tuple[float, Path, int]]:
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if _HASH_RE.fullmatch(entry.name):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, Path(entry.path), stat.st_size))
+        return entries
+
+    def put(self, data: bytes) -> str:
+        """
+        Store data, returning its hash. Storing what is already stored only marks it used.
+
+        Raises:
+            BlobError: If data is empty or over max_blob_mb
+        """
+        if not data:
+            raise BlobError("Attachment is empty")
+        if len(data) > self.config.max_blob_mb * 1024 * 1024:
+            raise BlobError(f"Attachment is over {self.config.max_blob_mb} MB")
+
+        digest = blob_hash(data)
+        path = self._path(digest)
+        if self.touch(digest):
+            self._counters["deduplicated"] += 1
+            return digest
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".blob.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self._counters["stored"] += 1
+        with self._lock:
+            self._total += len(data)
+            if self._total > self.config.max_total_mb * 1024 * 1024:
+                self._evict()
+        return digest
+
+    def touch(self, digest: str) -> bool:
+        """Mark a blob used. False if it is not stored."""
+        try:
+            os.utime(self._path(digest))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def size(self, digest: str) -> int | None:
+        """Size of a stored blob, None if it is not stored."""
+        try:
+            return self._path(digest).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def read(self, digest: str) -> Iterator[mmap.mmap]:
+        """
+        Map a blob into memory for reading.
+
+        Raises:
+            BlobNotFound: If the blob is not stored
+        """
+        try:
+            f = open(self._path(digest), "rb")
+        except FileNotFoundError as e:
+            raise BlobNotFound(f"Attachment {digest} is not stored") from e
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+    def delete(self, digest: str) -> bool:
+        try:
+            path = self._path(digest)
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._total = max(0, self._total - size)
+        return True
+
+    def _evict(self) -> None:
+        """Delete least recently used blobs. Called with the lock held."""
+        entries = sorted(self._scan())
+        # Other workers write to the same directory: recount
+        self._total = sum(size for _, _, size in entries)
+        target = self.config.max_total_mb * 1024 * 1024 * EVICT_TO_FRACTION
+        evicted = 0
+        for _, path, size in entries:
+            if self._total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Windows does not delete files that are mapped at the moment
+                logger.debug("Cannot evict blob %s: %s", path.name, e)
+                continue
+            self._total -= size
+            evicted += 1
+        self._counters["evicted"] += evicted
+        logger.info("Evicted %d blob(s), %.1f MB stored", evicted, self._total / 1024 / 1024)
+
+    def stats(self) -> dict:
+        """Get blob store metrics snapshot."""
+        return {
+            "stored_mb": round(self._total / 1024 / 1024, 1),
+            "max_total_mb": self.config.max_total_mb,
+            **{name: self._counters[name] for name in ("stored", "deduplicated", "evicted")},
+        }
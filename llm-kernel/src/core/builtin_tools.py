@@ -0,0 +1,102 @@
+import ast
+import operator
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from src.core.tools import Tool, ToolError, ToolExecutor
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# Guards against expressions like ((9**999)**999)**999 that would pin a worker
+# thread: wait_for cannot stop it, so integers are bounded before they are built
+MAX_INT_BITS = 4096
+MAX_EXPRESSION_CHARS = 500
+
+
+def _check_size(op: ast.operator, left: int | float, right: int | float) -> None:
+    """Reject integer operations whose result would be over MAX_INT_BITS."""
+    if type(left) is not int or type(right) is not int:
+        return
+    if isinstance(op, ast.Pow):
+        # Negative exponents give floats; bases 0 and ±1 stay small
+        bits = abs(left).bit_length() * right if right > 0 and abs(left) > 1 else 0
+    elif isinstance(op, ast.Mult):
+        bits = left.bit_length() + right.bit_length()
+    else:
+        bits = max(left.bit_length(), right.bit_length()) + 1
+    if bits > MAX_INT_BITS:
+        raise ToolError(f"Result would be larger than {MAX_INT_BITS} bits")
+
+
+def _evaluate(node: ast.AST) -> int | float:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        if type(node.value) is int and node.value.bit_length() > MAX_INT_BITS:
+            raise ToolError(f"Number is larger than {MAX_INT_BITS} bits")
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        _check_size(node.op, left, right)
+        return _BINARY_OPERATORS[type(node.op)](left, right)
+    raise ToolError(f"Unsupported expression element: {type(node).__name__}")
+
+
+def calculate(expression: str) -> str:
+    """Evaluate an arithmetic expression without eval()."""
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise ToolError(f"Expression is longer than {MAX_EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ToolError(f"Invalid expression: {e.msg}") from e
+    try:
+        return str(_evaluate(tree))
+    except ZeroDivisionError as e:
+        raise ToolError("Division by zero") from e
+    except OverflowError as e:
+        raise ToolError("Result is too large") from e
+
+
+def current_time(timezone: str = "UTC") -> str:
+    """Current date and time in an IANA timezone."""
+    try:
+        zone = ZoneInfo(timezone)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ToolError(f"Unknown timezone '{timezone}'") from e
+    return datetime.now(zone).isoformat(timespec="seconds")
+
+
+def register_tools(executor: ToolExecutor) -> None:
+    executor.register(Tool(
+        name="calculate",
+        description="Evaluate an arithmetic expression with + - * / // % ** and parentheses.",
+        parameters={
+            "type": "object",
+            "properties": {"expression": {"type": "string", "description": "e.g. (2 + 3) * 4.5"}},
+            "required": ["expression"],
+        },
+        handler=calculate,
+    ))
+    executor.register(Tool(
+        name="current_time",
+        description="Get the current date and time.",
+        parameters={
+            "type": "object",
+            "properties": {"timezone": {"type": "string", "description": "IANA timezone, e.g. Europe/Moscow"}},
+        },
+        handler=current_time,
+        cacheable=False,
+    ))
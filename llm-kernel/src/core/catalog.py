@@ -0,0 +1,223 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+from src.models.config import CatalogConfig
+from src.models.openrouter import OpenRouterModel
+from src.utils.config import atomic_write_text
+from src.utils.logging import get_logger
+
+
+logger = get_logger("catalog")
+
+# Minimum gap between background refresh attempts, so a failing upstream is
+# not hit on every lookup
+REFRESH_RETRY_SEC = 60
+
+
+def _price(model: OpenRouterModel, kind: str) -> float | None:
+    """Per-token price from OpenRouter pricing strings, None if unknown."""
+    try:
+        return float(model.pricing[kind])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class CatalogSnapshot:
+    """Immutable indexed view of one catalog version."""
+
+    def __init__(self, models: list[OpenRouterModel], fetched_at: float):
+        self.models = sorted(models, key=lambda m: m.id)
+        self.fetched_at = fetched_at
+        self.by_id = {m.id: m for m in self.models}
+
+        # Prefix search runs on sorted lowercase ids, substring on "id name"
+        self._ids_lower = [m.id.lower() for m in self.models]
+        self._haystacks = [f"{m.id} {m.name}".lower() for m in self.models]
+
+        digest = hashlib.sha256()
+        for m in self.models:
+            digest.update(m.model_dump_json().encode("utf-8"))
+        self.etag = digest.hexdigest()[:16]
+
+    def search(
+        self,
+        query: str = "",
+        min_context: int = 0,
+        max_prompt_price: float | None = None,
+    ) -> list[OpenRouterModel]:
+        """
+        Find models by id/name substring and filters.
+
+        Models whose id starts with the query come first: they are a
+        contiguous range of the sorted ids. The other substring matches
+        follow in id order.
+        """
+        query = query.lower()
+        if query:
+            start = bisect.bisect_left(self._ids_lower, query)
+            end = bisect.bisect_left(self._ids_lower, query + "\uffff")
+            candidates = [
+                *range(start, end),
+                *(i for i, h in enumerate(self._haystacks) if query in h and not start <= i < end),
+            ]
+        else:
+            candidates = range(len(self.models))
+
+        result = []
+        for i in candidates:
+            model = self.models[i]
+            if model.context_length < min_context:
+                continue
+            if max_prompt_price is not None:
+                price = _price(model, "prompt")
+                if price is None or price > max_prompt_price:
+                    continue
+            result.append(model)
+        return result
+
+
+class ModelCatalog:
+    """
+    OpenRouter model catalog with TTL refresh and disk persistence.
+
+    Reads never wait on the network once any catalog is available: a stale
+    catalog is served while a single background refresh runs
+    (stale-while-revalidate). The last catalog is stored on disk so a
+    restart serves models immediately. Worker processes share that file:
+    a background refresh first checks whether another worker has already
+    stored a fresh catalog.
+    """
+
+    def __init__(
+        self,
+        config: CatalogConfig,
+        cache_path: Path,
+        fetch: Callable[[], Awaitable[list[OpenRouterModel]]],
+    ):
+        self.config = config
+        self.cache_path = cache_path
+        self._fetch = fetch
+        self._snapshot: CatalogSnapshot | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_prefers_disk = False
+        self._last_attempt = 0.0
+
+    def _load_from_disk_sync(self) -> CatalogSnapshot | None:
+        if not self.cache_path.exists():
+            return None
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        models = [OpenRouterModel.model_validate(m) for m in data["models"]]
+        return CatalogSnapshot(models, fetched_at=data["fetched_at"])
+
+    async def load_from_disk(self) -> None:
+        """Load persisted catalog, if any. Corrupt files are ignored."""
+        try:
+            snapshot = await asyncio.to_thread(self._load_from_disk_sync)
+        except Exception as e:
+            logger.warning("Ignoring unreadable model cache %s: %s", self.cache_path, e)
+            return
+        if snapshot is not None and self._snapshot is None:
+            self._snapshot = snapshot
+            logger.info("Loaded %d models from disk cache", len(snapshot.models))
+
+    def _save_to_disk_sync(self, snapshot: CatalogSnapshot) -> None:
+        data = {
+            "fetched_at": snapshot.fetched_at,
+            "models": [m.model_dump() for m in snapshot.models],
+        }
+        atomic_write_text(self.cache_path, json.dumps(data))
+
+    async def _refresh(self, prefer_disk: bool) -> CatalogSnapshot:
+        if prefer_disk:
+            try:
+                stored = await asyncio.to_thread(self._load_from_disk_sync)
+            except Exception:
+                stored = None
+            if stored is not None and time.time() - stored.fetched_at <= self.config.ttl_sec:
+                if self._snapshot is None or stored.fetched_at > self._snapshot.fetched_at:
+                    self._snapshot = stored
+                    logger.info("Model catalog reloaded from disk cache: %d models", len(stored.models))
+                return self._snapshot
+
+        models = await self._fetch()
+        snapshot = CatalogSnapshot(models, fetched_at=time.time())
+        self._snapshot = snapshot
+        logger.info("Model catalog refreshed: %d models", len(models))
+
+        try:
+            await asyncio.to_thread(self._save_to_disk_sync, snapshot)
+        except OSError as e:
+            logger.warning("Failed to persist model catalog: %s", e)
+        return snapshot
+
+    def _start_refresh(self, prefer_disk: bool = False) -> asyncio.Task:
+        """Start a refresh unless one is already running (single flight)."""
+        running = self._refresh_task is not None and not self._refresh_task.done()
+        # A disk-preferring refresh may settle for the disk cache, which a forced one must not
+        if not running or (self._refresh_prefers_disk and not prefer_disk):
+            self._last_attempt = time.monotonic()
+            self._refresh_prefers_disk = prefer_disk
+            self._refresh_task = asyncio.create_task(self._refresh(prefer_disk))
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        return self._refresh_task
+
+    @staticmethod
+    def _on_refresh_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Model catalog refresh failed: %s", task.exception())
+
+    def is_stale(self) -> bool:
+        if self._snapshot is None:
+            return True
+        return time.time() - self._snapshot.fetched_at > self.config.ttl_sec
+
+    def _revalidate(self) -> None:
+        """Refresh a stale catalog in background, rate-limited on failures."""
+        if self.is_stale() and time.monotonic() - self._last_attempt >= REFRESH_RETRY_SEC:
+            self._start_refresh(prefer_disk=True)
+
+    async def get(self, force_refresh: bool = False) -> CatalogSnapshot:
+        """
+        Get current catalog.
+
+        Waits only when there is no catalog at all or a refresh is forced;
+        otherwise a stale catalog triggers a background refresh and is
+        returned as is. Only a forced refresh bypasses the disk cache.
+
+        Raises:
+            OpenRouterError: If a required fetch fails
+        """
+        if force_refresh or self._snapshot is None:
+            return await asyncio.shield(self._start_refresh(prefer_disk=not force_refresh))
+
+        self._revalidate()
+        return self._snapshot
+
+    def lookup(self, model_id: str) -> OpenRouterModel | None:
+        """O(1) model lookup in the current catalog without network access."""
+        if self._snapshot is None:
+            return None
+        self._revalidate()
+        return self._snapshot.by_id.get(model_id)
+
+    def cost(self, model_id: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+        """Request cost in USD from catalog pricing, None if the model or its prices are unknown."""
+        model = self.lookup(model_id)
+        if model is None:
+            return None
+        prompt_price = _price(model, "prompt")
+        completion_price = _price(model, "completion")
+        if prompt_price is None or completion_price is None:
+            return None
+        return prompt_tokens * prompt_price + completion_tokens * completion_price
+
+    async def close(self) -> None:
+        """Cancel a running refresh."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
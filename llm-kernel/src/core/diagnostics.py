@@ -0,0 +1,215 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from types import FrameType
+
+from src.models.config import DiagnosticsConfig
+from src.utils.logging import get_logger
+from src.utils.metrics import Histogram
+
+
+logger = get_logger("diagnostics")
+
+# Slow-callback events kept for the stats endpoint
+RECENT_STALLS = 20
+
+# Frames kept per sampled stack; deeper outer frames are cut off
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(frame: FrameType) -> str:
+    """Flamegraph label for a frame: qualified function name and file."""
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _describe_stack(frame: FrameType | None) -> str:
+    """Short location of the code currently running in a frame stack."""
+    if frame is None:
+        return "unknown location"
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} at {code.co_filename}:{frame.f_lineno}"
+
+
+class LoopLagMonitor:
+    """
+    Event loop lag sampler.
+
+    A coroutine sleeps for a fixed interval and records how late it wakes
+    up. A watchdog thread notices when the loop has not woken for longer
+    than slow_callback_ms and captures what the loop thread is executing,
+    so the warning names the blocking task and code location.
+    """
+
+    def __init__(self, config: DiagnosticsConfig):
+        self.config = config
+        self.lag_ms = Histogram()
+        self.stalls: deque[dict] = deque(maxlen=RECENT_STALLS)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._expected_wake = 0.0
+        self._culprit: str | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    async def run(self) -> None:
+        """Sample loop lag until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+        try:
+            while True:
+                interval = self.config.loop_lag_interval_ms / 1000
+                self._expected_wake = time.monotonic() + interval
+                await asyncio.sleep(interval)
+                lag_ms = max(0.0, (time.monotonic() - self._expected_wake) * 1000)
+                self.lag_ms.observe(lag_ms)
+
+                culprit, self._culprit = self._culprit, None
+                if self.config.slow_callback_ms and lag_ms >= self.config.slow_callback_ms:
+                    self._report_stall(lag_ms, culprit)
+        finally:
+            self._stop.set()
+
+    def _report_stall(self, lag_ms: float, culprit: str | None) -> None:
+        culprit = culprit or "a callback shorter than the watchdog period"
+        self.stalls.append({"at": time.time(), "lag_ms": round(lag_ms, 1), "culprit": culprit})
+        logger.warning("Event loop blocked for %.0fms by %s", lag_ms, culprit)
+
+    def _watch(self) -> None:
+        """Watchdog thread: capture the loop thread stack during a stall."""
+        while not self._stop.is_set():
+            period = max(self.config.slow_callback_ms, 10) / 2000
+            self._stop.wait(period)
+            if not self.config.slow_callback_ms or self._culprit is not None:
+                continue
+            overdue_ms = (time.monotonic() - self._expected_wake) * 1000
+            if overdue_ms >= self.config.slow_callback_ms:
+                self._culprit = self._capture_culprit()
+
+    def _capture_culprit(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        location = _describe_stack(frame)
+
+        # Reading the loop's current task from another thread is racy but
+        # harmless: the loop is stuck inside that task right now
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        if task is None:
+            return location
+        coro = task.get_coro()
+        coro_name = getattr(coro, "__qualname__", repr(coro))
+        return f"task {task.get_name()} ({coro_name}) in {location}"
+
+    def stats(self) -> dict:
+        """Get loop lag metrics snapshot."""
+        return {
+            "lag_ms": self.lag_ms.snapshot(),
+            "slow_callbacks": len(self.stalls),
+            "recent_stalls": list(self.stalls),
+        }
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for all threads.
+
+    Runs in a background thread for a bounded time and aggregates sampled
+    stacks into collapsed format ("thread;outer;...;inner count" per line),
+    which flamegraph.pl, speedscope and similar tools read directly.
+    """
+
+    def __init__(self, config: DiagnosticsConfig):
+        self.config = config
+        self._stacks: Counter[str] = Counter()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._started_at: float | None = None
+        self._finished_at: float | None = None
+        self._duration_sec = 0.0
+        self._samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration_sec: float) -> None:
+        """
+        Start sampling for duration_sec, discarding the previous profile.
+
+        Raises:
+            RuntimeError: If a profile is already being recorded
+            ValueError: If duration exceeds max_profile_sec
+        """
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        if not 0 < duration_sec <= self.config.max_profile_sec:
+            raise ValueError(f"Duration must be between 0 and {self.config.max_profile_sec}s")
+
+        self._stacks = Counter()
+        self._samples = 0
+        self._duration_sec = duration_sec
+        self._started_at = time.time()
+        self._finished_at = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Profiler started for %.0fs", duration_sec)
+
+    def stop(self) -> None:
+        """Stop sampling early; the collected profile is kept."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        interval = self.config.profiler_interval_ms / 1000
+        deadline = time.monotonic() + self._duration_sec
+        own_id = threading.get_ident()
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self._stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self._samples += 1
+            self._stop.wait(interval)
+
+        self._finished_at = time.time()
+        logger.info("Profiler finished: %d samples, %d unique stacks", self._samples, len(self._stacks))
+
+    @staticmethod
+    def _collapse(thread_name: str, frame: FrameType | None) -> str:
+        labels = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(labels)).replace("\n", " ")
+
+    def collapsed(self) -> str:
+        """Profile in collapsed-stack format, hottest stacks first."""
+        # Plain dict copy is atomic, so this is safe while sampling runs
+        stacks = dict(self._stacks)
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(stacks.items(), key=lambda item: item[1], reverse=True)
+        )
+
+    def status(self) -> dict:
+        """Get profiler state."""
+        return {
+            "running": self.running,
+            "started_at": self._started_at,
+            "finished_at": self._finished_at,
+            "duration_sec": self._duration_sec,
+            "samples": self._samples,
+            "unique_stacks": len(self._stacks),
+        }
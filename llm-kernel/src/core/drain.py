@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+
+from src.core.scheduler import AdmissionRejected
+from src.utils.logging import get_logger
+
+
+logger = get_logger("drain")
+
+# Notifies one connected client that the server is draining; gets seconds left
+DrainNotifier = Callable[[float], Awaitable[None]]
+
+
+class DrainController:
+    """
+    Graceful shutdown of client traffic.
+
+    Once draining starts, new requests are rejected with DRAINING right
+    away, every connected client gets a control frame telling it to send
+    new requests elsewhere (e.g. to a successor process on the same
+    socket), and requests already running are given until the deadline
+    to finish. Nothing is cancelled here: whatever is still running at
+    the deadline is cut off by the shutdown that follows.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.reason = ""
+        self._deadline: float | None = None
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._notifiers: set[DrainNotifier] = set()
+        self._counters: Counter[str] = Counter()
+
+    def remaining_sec(self) -> float:
+        """Seconds until the drain deadline, 0 if not draining."""
+        if self._deadline is None:
+            return 0.0
+        return max(0.0, self._deadline - time.monotonic())
+
+    def admit(self) -> None:
+        """
+        Check that a new request may start.
+
+        Raises:
+            AdmissionRejected: If the server is draining
+        """
+        if self.draining:
+            self._counters["rejected"] += 1
+            raise AdmissionRejected("DRAINING", "Server is shutting down, reconnect and retry")
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a client request as running until the block exits."""
+        started_before_drain = not self.draining
+        self._active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            if started_before_drain and self.draining:
+                self._counters["finished_while_draining"] += 1
+            if self._active == 0:
+                self._idle.set()
+
+    def add_connection(self, notify: DrainNotifier) -> None:
+        self._notifiers.add(notify)
+
+    def remove_connection(self, notify: DrainNotifier) -> None:
+        self._notifiers.discard(notify)
+
+    async def drain(self, timeout_sec: float, reason: str = "shutdown") -> bool:
+        """
+        Start draining, if not started yet, and wait for running requests.
+
+        Returns:
+            True if all requests finished before the deadline
+        """
+        if not self.draining:
+            self.draining = True
+            self.reason = reason
+            self._deadline = time.monotonic() + timeout_sec
+            self._counters["drains"] += 1
+            logger.info(
+                "Draining (%s): %d request(s) running, %d client(s) connected, deadline %.0fs",
+                reason, self._active, len(self._notifiers), timeout_sec,
+            )
+            await asyncio.gather(
+                *(notify(timeout_sec) for notify in list(self._notifiers)),
+                return_exceptions=True,
+            )
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.remaining_sec())
+        except asyncio.TimeoutError:
+            self._counters["abandoned"] += self._active
+            logger.warning("Drain deadline reached with %d request(s) still running", self._active)
+            return False
+        logger.info("Drained in %.1fs", time.monotonic() - started)
+        return True
+
+    def stats(self) -> dict:
+        """Get drain state snapshot."""
+        return {
+            "draining": self.draining,
+            "reason": self.reason,
+            "remaining_sec": round(self.remaining_sec(), 1),
+            "active_requests": self._active,
+            "connections": len(self._notifiers),
+            **{
+                name: self._counters[name]
+                for name in ("drains", "rejected", "finished_while_draining", "abandoned")
+            },
+        }
@@ -0,0 +1,275 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, fields
+from pathlib import Path
+
+from src.models.config import JournalConfig
+from src.utils.logging import get_logger
+
+
+logger = get_logger("journal")
+
+# Columns that aggregate queries may group by
+GROUP_COLUMNS = ("model", "persona", "client_id", "priority", "outcome", "source")
+
+_SECONDS_PER_DAY = 86400
+
+
+@dataclass
+class JournalEntry:
+    """Metadata of a single handled request. Column order matches the table."""
+
+    ts: float  # Unix time of receipt
+    request_id: str
+    client_id: str
+    persona: str
+    model: str
+    priority: str
+    stream: bool
+    outcome: str = "ok"  # "ok" or error code sent to the client
+    source: str = "upstream"  # Where the answer came from
+    finish_reason: str | None = None
+    queue_ms: float | None = None  # Rate limiter and scheduler wait
+    first_token_ms: float | None = None  # From the upstream call, streaming only
+    total_ms: float | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float | None = None  # USD from catalog pricing, None if unknown
+
+
+_COLUMNS = [f.name for f in fields(JournalEntry)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    request_id TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    persona TEXT NOT NULL,
+    model TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    stream INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    source TEXT NOT NULL,
+    finish_reason TEXT,
+    queue_ms REAL,
+    first_token_ms REAL,
+    total_ms REAL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost REAL
+);
+CREATE INDEX IF NOT EXISTS requests_ts ON requests (ts);
+"""
+
+_INSERT = f"INSERT INTO requests ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+class RequestJournal:
+    """
+    Append-only SQLite journal of handled requests.
+
+    record() only enqueues; a background task writes entries in batches
+    from a worker thread, so the request path never waits on disk. The
+    database runs in WAL mode, which keeps appends cheap and lets
+    aggregate queries read while a batch is being written.
+    """
+
+    def __init__(self, config: JournalConfig, path: Path):
+        self.config = config
+        self.path = path
+        self._queue: asyncio.Queue[JournalEntry] = asyncio.Queue(maxsize=config.max_pending)
+        self._conn: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self._writer_task: asyncio.Task | None = None
+        # Set by record() and close(); the writer sleeps on it while idle
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._written = 0
+        self._dropped = 0
+        self._last_prune = 0.0
+
+    def _open_sync(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # Worker processes share the file; wait out each other's write transactions
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    async def start(self) -> None:
+        """Open the database and start the background writer."""
+        await asyncio.to_thread(self._open_sync)
+        self._writer_task = asyncio.create_task(self._run_writer())
+        logger.info("Request journal at %s", self.path)
+
+    def record(self, entry: JournalEntry) -> None:
+        """Queue an entry for writing. Never blocks; drops entries when the queue is full."""
+        if not self.config.enabled or self._writer_task is None:
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self._dropped += 1
+        else:
+            self._wakeup.set()
+
+    def _write_sync(self, batch: list[JournalEntry]) -> None:
+        with self._db_lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(_INSERT, [astuple(entry) for entry in batch])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune_sync(self, cutoff: float) -> int:
+        with self._db_lock:
+            return self._conn.execute("DELETE FROM requests WHERE ts < ?", (cutoff,)).rowcount
+
+    def _take_batch(self, first: JournalEntry) -> list[JournalEntry]:
+        batch = [first]
+        while len(batch) < self.config.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _flush(self, batch: list[JournalEntry]) -> None:
+        try:
+            await asyncio.to_thread(self._write_sync, batch)
+            self._written += len(batch)
+        except sqlite3.Error as e:
+            self._dropped += len(batch)
+            logger.error("Failed to write %d journal entries: %s", len(batch), e)
+
+    async def _flush_queue(self) -> None:
+        while not self._queue.empty():
+            await self._flush(self._take_batch(self._queue.get_nowait()))
+
+    async def _run_writer(self) -> None:
+        """
+        Write queued entries until close() sets _stopping.
+
+        The writer is never cancelled: a write runs to completion in its
+        thread either way, and cancelling would lose the batch in hand.
+        """
+        while not self._stopping.is_set():
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Let a batch accumulate: one transaction per interval, not per request
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.config.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_queue()
+
+            if self.config.retention_days and time.time() - self._last_prune > _SECONDS_PER_DAY:
+                self._last_prune = time.time()
+                cutoff = time.time() - self.config.retention_days * _SECONDS_PER_DAY
+                try:
+                    pruned = await asyncio.to_thread(self._prune_sync, cutoff)
+                except sqlite3.Error as e:
+                    logger.error("Failed to prune journal: %s", e)
+                else:
+                    if pruned:
+                        logger.info("Pruned %d journal entries older than %d days", pruned, self.config.retention_days)
+
+        # Entries recorded while the last batch was being written
+        await self._flush_queue()
+
+    def _close_sync(self) -> None:
+        with self._db_lock:
+            conn, self._conn = self._conn, None
+            conn.close()
+
+    async def close(self) -> None:
+        """Stop the writer once it has flushed queued entries, then close the database."""
+        if self._writer_task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._writer_task
+            self._writer_task = None
+
+        if self._conn is not None:
+            await asyncio.to_thread(self._close_sync)
+
+    def _query_sync(self, sql: str, params: tuple) -> list[dict]:
+        with self._db_lock:
+            if self._conn is None:  # Closed while the query waited for the lock
+                return []
+            cursor = self._conn.execute(sql, params)
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    async def aggregate(
+        self,
+        since: float,
+        until: float,
+        group_by: str | None = None,
+        bucket_sec: int | None = None,
+    ) -> list[dict]:
+        """
+        Usage totals for requests received in [since, until).
+
+        Args:
+            since: Window start, unix time
+            until: Window end, unix time
+            group_by: Optional breakdown column, one of GROUP_COLUMNS
+            bucket_sec: Optional time bucket width for a time series
+
+        Returns:
+            One row per group and bucket
+
+        Raises:
+            ValueError: If group_by is not a known column
+        """
+        keys = []
+        if bucket_sec:
+            keys.append(f"CAST(ts / {int(bucket_sec)} AS INTEGER) * {int(bucket_sec)} AS bucket")
+        if group_by:
+            if group_by not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{group_by}', expected one of {', '.join(GROUP_COLUMNS)}")
+            keys.append(group_by)
+
+        select_keys = "".join(f"{key}, " for key in keys)
+        group_clause = ""
+        if keys:
+            names = ", ".join(key.rsplit(" AS ", 1)[-1] for key in keys)
+            group_clause = f"GROUP BY {names} ORDER BY {names}"
+
+        sql = f"""
+            SELECT {select_keys}
+                COUNT(*) AS requests,
+                SUM(outcome != 'ok') AS errors,
+                SUM(prompt_tokens) AS prompt_tokens,
+                SUM(completion_tokens) AS completion_tokens,
+                ROUND(SUM(cost), 6) AS cost,
+                ROUND(AVG(queue_ms), 1) AS avg_queue_ms,
+                ROUND(AVG(first_token_ms), 1) AS avg_first_token_ms,
+                ROUND(AVG(total_ms), 1) AS avg_total_ms
+            FROM requests
+            WHERE ts >= ? AND ts < ?
+            {group_clause}
+        """
+        if self._conn is None:
+            return []
+        return await asyncio.to_thread(self._query_sync, sql, (since, until))
+
+    async def recent(self, limit: int = 100) -> list[dict]:
+        """Most recent journal entries, newest first."""
+        if self._conn is None:
+            return []
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM requests ORDER BY ts DESC LIMIT ?"
+        return await asyncio.to_thread(self._query_sync, sql, (limit,))
+
+    def stats(self) -> dict:
+        """Get journal writer metrics snapshot."""
+        return {
+            "enabled": self.config.enabled,
+            "pending": self._queue.qsize(),
+            "written": self._written,
+            "dropped": self._dropped,
+        }
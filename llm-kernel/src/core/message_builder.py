@@ -1,23 +1,32 @@
 from src.models.config import DefaultsConfig
-from src.models.openrouter import ChatCompletionRequest, ChatMessage
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, ContentPart, HistoryMessage, ToolDefinition
 from src.models.requests import LLMRequest
 
 
 def build_chat_request(
     llm_request: LLMRequest,
     defaults: DefaultsConfig,
+    tools: list[ToolDefinition] | None = None,
+    parts: list[ContentPart] | None = None,
 ) -> ChatCompletionRequest:
     """
     Build OpenRouter ChatCompletionRequest from client LLMRequest.
 
+    History messages are sent as messages of their own, so providers can
+    cache the unchanged prefix of a dialog. Speaker names go into the text
+    as labels: the name field of the OpenAI schema only allows latin names
+    and most providers drop it.
+
     Args:
         llm_request: Incoming request from WebSocket client
         defaults: Default configuration values
+        tools: Definitions of the kernel tools the request may use
+        parts: Stored attachments that follow the user prompt
 
     Returns:
         ChatCompletionRequest ready to send to OpenRouter API
     """
-    messages: list[ChatMessage] = []
+    messages: list[ChatMessage | HistoryMessage] = []
 
     # Add system message if provided
     if llm_request.system_prompt:
@@ -25,14 +34,24 @@ def build_chat_request(
             ChatMessage(role="system", content=llm_request.system_prompt)
         )
 
-    # Add user message
-    messages.append(
-        ChatMessage(role="user", content=llm_request.user_prompt)
-    )
+    # Add dialog history. Only other participants' turns are labelled:
+    # the model's own turns and system messages must stay as they were
+    for message in llm_request.messages:
+        content = message.content
+        if message.name and message.role == "user" and defaults.speaker_labels:
+            content = f"{message.name}: {content}"
+        messages.append(HistoryMessage(message.role, content))
+
+    # Add user message, which also carries the attachments
+    if llm_request.user_prompt or parts:
+        messages.append(
+            ChatMessage(role="user", content=llm_request.user_prompt, parts=parts or None)
+        )
 
     return ChatCompletionRequest(
         model=llm_request.model,
         messages=messages,
         stream=llm_request.stream,
         max_tokens=defaults.max_tokens,
+        tools=tools or None,
     )
@@ -1,5 +1,11 @@
+import asyncio
+import base64
+import importlib.util
 import json
-from collections.abc import AsyncIterator
+import ssl
+import time
+from collections.abc import AsyncIterator, Awaitable, Iterator
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import httpx
 
@@ -7,15 +13,121 @@ from src.models.config import OpenRouterConfig
 from src.models.openrouter import (
     ChatCompletionRequest,
     ChatCompletionResponse,
+    ContentPart,
     ModelsResponse,
     OpenRouterModel,
     StreamChunk,
 )
 from src.utils.logging import get_logger
 
+if TYPE_CHECKING:
+    import mmap
+
+    from src.core.blob_store import BlobStore
+    from src.core.rate_limiter import RateLimiter
+
 
 logger = get_logger("openrouter")
 
+T = TypeVar("T")
+
+# Characters of message content encoded per body chunk in streamed mode
+BODY_CHUNK_CHARS = 64 * 1024
+
+# Attachment bytes base64-encoded per body chunk; a multiple of 3 leaves no padding mid-stream
+BLOB_CHUNK_BYTES = 192 * 1024
+
+# input_audio wants a format name, not a MIME type
+_AUDIO_FORMATS = {"audio/mpeg": "mp3", "audio/mp3": "mp3", "audio/x-wav": "wav", "audio/wave": "wav"}
+
+
+def _iter_text(text: str) -> Iterator[bytes]:
+    """JSON-escaped text in slices, without quotes."""
+    for start in range(0, len(text), BODY_CHUNK_CHARS):
+        piece = text[start:start + BODY_CHUNK_CHARS]
+        yield json.dumps(piece, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+def _encode_slice(data: "mmap.mmap", start: int) -> bytes:
+    """Base64 of one body chunk of a mapped blob. Blocks while the pages are read from disk."""
+    return base64.b64encode(data[start:start + BLOB_CHUNK_BYTES])
+
+
+async def _iter_part(part: ContentPart, blobs: "BlobStore") -> AsyncIterator[bytes]:
+    """Content part with its blob inlined as base64, in the shape its MIME type calls for."""
+    mime_type = part.mime_type.lower()
+    if mime_type.startswith("image/"):
+        head = f'{{"type": "image_url", "image_url": {{"url": "data:{mime_type};base64,'
+        tail = '"}}'
+    elif mime_type.startswith("audio/"):
+        audio_format = _AUDIO_FORMATS.get(mime_type, mime_type.partition("/")[2])
+        head = f'{{"type": "input_audio", "input_audio": {{"format": {json.dumps(audio_format)}, "data": "'
+        tail = '"}}'
+    else:
+        filename = json.dumps(part.filename or part.hash[:16], ensure_ascii=False)
+        head = f'{{"type": "file", "file": {{"filename": {filename}, "file_data": "data:{mime_type};base64,'
+        tail = '"}}'
+
+    yield head.encode("utf-8")
+    with blobs.read(part.hash) as data:
+        for start in range(0, len(data), BLOB_CHUNK_BYTES):
+            yield await asyncio.to_thread(_encode_slice, data, start)
+    yield tail.encode("utf-8")
+
+
+async def iter_request_body(
+    request: ChatCompletionRequest,
+    stream: bool,
+    blobs: "BlobStore | None" = None,
+) -> AsyncIterator[bytes]:
+    """
+    Encode chat completion request as JSON body chunk by chunk.
+
+    Message contents are escaped in slices, so the full JSON document never
+    exists in memory at once. Slicing a str by code points is safe here:
+    each escape sequence belongs to a single code point. Messages with
+    content parts are sent as a list of parts, attachments read from blobs.
+    """
+    head = request.model_dump(exclude_none=True, exclude={"messages", "stream"})
+    head["stream"] = stream
+    yield json.dumps(head, ensure_ascii=False)[:-1].encode("utf-8")
+    yield b', "messages": ['
+
+    for i, message in enumerate(request.messages):
+        prefix = b", " if i else b""
+        # Role and tool call fields are small; only the content is sliced
+        if message.tool_calls is None and message.tool_call_id is None:
+            # Most messages have a role only, which needs no escaping
+            fields = f'{{"role": "{message.role}"}}'
+        else:
+            fields = json.dumps(message.model_dump(exclude_none=True, exclude={"content"}), ensure_ascii=False)
+
+        if not message.parts:
+            yield prefix + f'{fields[:-1]}, "content": "'.encode("utf-8")
+            for piece in _iter_text(message.content):
+                yield piece
+            yield b'"}'
+            continue
+
+        if blobs is None:
+            raise ValueError("Message has content parts but no blob store to read them from")
+        yield prefix + f'{fields[:-1]}, "content": ['.encode("utf-8")
+        separator = b""
+        if message.content:
+            yield b'{"type": "text", "text": "'
+            for piece in _iter_text(message.content):
+                yield piece
+            yield b'"}'
+            separator = b", "
+        for part in message.parts:
+            yield separator
+            async for piece in _iter_part(part, blobs):
+                yield piece
+            separator = b", "
+        yield b"]}"
+
+    yield b"]}"
+
 
 class OpenRouterError(Exception):
     """OpenRouter API error."""
@@ -25,16 +137,54 @@ class OpenRouterError(Exception):
         self.status_code = status_code
 
 
+class OpenRouterTimeout(OpenRouterError):
+    """OpenRouter request ran out of time."""
+
+    def __init__(self, message: str):
+        super().__init__(message, status_code=None)
+
+
+async def _wait(awaitable: Awaitable[T], deadline: float, message: str) -> T:
+    """Await with an absolute monotonic deadline, raising OpenRouterTimeout."""
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError as e:
+        raise OpenRouterTimeout(message) from e
+
+
 class OpenRouterClient:
     """Async client for OpenRouter API."""
 
-    def __init__(self, api_key: str, config: OpenRouterConfig):
+    def __init__(
+        self,
+        api_key: str,
+        config: OpenRouterConfig,
+        rate_limiter: "RateLimiter | None" = None,
+        blobs: "BlobStore | None" = None,
+    ):
         self.api_key = api_key
         self.config = config
+        self.rate_limiter = rate_limiter
+        self.blobs = blobs
         self._client: httpx.AsyncClient | None = None
+        self._ssl_context: ssl.SSLContext | None = None
+        self._in_flight = 0
+        self._requests_total = 0
+
+    def _http2_enabled(self) -> bool:
+        """HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 without it."""
+        if not self.config.http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but 'h2' is not installed (pip install httpx[http2]), using HTTP/1.1")
+            return False
+        return True
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create HTTP client."""
+        if self._ssl_context is None:
+            # Loading CA certificates blocks for 100+ ms: keep it off the event loop
+            self._ssl_context = await asyncio.to_thread(httpx.create_ssl_context)
         if self._client is None or self._client.is_closed:
             self._client = httpx.AsyncClient(
                 base_url=self.config.base_url,
@@ -46,98 +196,284 @@ class OpenRouterClient:
                 },
                 timeout=httpx.Timeout(self.config.timeout_sec),
                 limits=httpx.Limits(
-                    max_connections=50,
-                    max_keepalive_connections=20,
-                    keepalive_expiry=30,
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=self.config.keepalive_expiry_sec,
                 ),
+                http2=self._http2_enabled(),
+                verify=self._ssl_context,
             )
         return self._client
 
+    async def prewarm(self) -> None:
+        """
+        Open pooled connections ahead of the first request.
+
+        Pays TCP+TLS handshakes at startup. Any response keeps the
+        connection, so a cheap HEAD is enough. With HTTP/2 one connection
+        serves all streams.
+        """
+        count = self.config.prewarm_connections
+        if count == 0:
+            return
+        client = await self._get_client()
+        if self._http2_enabled():
+            count = 1
+
+        results = await asyncio.gather(
+            *(client.head("/models") for _ in range(count)),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.warning("Connection pre-warming failed for %d/%d: %r", len(failed), count, failed[0])
+        else:
+            logger.info("Pre-warmed %d upstream connection(s)", count)
+
+    def pool_stats(self) -> dict:
+        """
+        Get connection pool utilization.
+
+        Reads httpcore pool state, which httpx doesn't expose publicly;
+        missing internals yield empty figures rather than errors.
+        """
+        connections = []
+        queued = 0
+        if self._client is not None and not self._client.is_closed:
+            pool = getattr(self._client, "_transport", None)
+            pool = getattr(pool, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            queued = sum(1 for r in getattr(pool, "_requests", []) if r.is_queued())
+
+        idle = sum(1 for c in connections if c.is_idle())
+        http2 = sum(1 for c in connections if "HTTP/2" in c.info())
+        return {
+            "http2_enabled": self.config.http2,
+            "max_connections": self.config.max_connections,
+            "connections": len(connections),
+            "http2_connections": http2,
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "utilization": round((len(connections) - idle) / self.config.max_connections, 3),
+            "in_flight_requests": self._in_flight,
+            "queued_in_pool": queued,
+            "requests_total": self._requests_total,
+        }
+
+    def _request_body(self, request: ChatCompletionRequest, stream: bool) -> dict[str, Any]:
+        """Build httpx body arguments, streaming the body for large requests and attachments."""
+        size = sum(len(m.content) for m in request.messages)
+        if size >= self.config.stream_body_threshold_kb * 1024 or any(m.parts for m in request.messages):
+            return {"content": iter_request_body(request, stream, self.blobs)}
+
+        request_data = request.model_dump(exclude_none=True)
+        request_data["stream"] = stream
+        return {"json": request_data}
+
+    def _observe(self, model: str, response: httpx.Response) -> None:
+        """Feed upstream rate-limit signals to the rate limiter."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe_response(self.api_key, model, response.status_code, response.headers)
+
     async def close(self) -> None:
         """Close HTTP client."""
         if self._client is not None and not self._client.is_closed:
             await self._client.aclose()
             self._client = None
 
+    async def drain_and_close(self, timeout_sec: float, poll_sec: float = 0.5) -> None:
+        """Wait for in-flight requests to finish (up to timeout_sec), then close."""
+        deadline = time.monotonic() + timeout_sec
+        while self._in_flight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(poll_sec)
+        if self._in_flight > 0:
+            logger.warning("Closing client with %d request(s) still in flight", self._in_flight)
+        await self.close()
+
+    def _resolve_deadline(self, deadline: float | None) -> float:
+        """Absolute monotonic deadline, capped by the configured total timeout."""
+        total = time.monotonic() + self.config.timeout_sec
+        return total if deadline is None else min(deadline, total)
+
+    def _timeout(self, remaining: float, read: float | None) -> httpx.Timeout:
+        """Per-call httpx timeouts that never outlive the request deadline."""
+        return httpx.Timeout(
+            connect=min(self.config.connect_timeout_sec, remaining),
+            read=None if read is None else min(read, remaining),
+            write=remaining,
+            pool=remaining,
+        )
+
     async def chat_completion(
-        self, request: ChatCompletionRequest
+        self,
+        request: ChatCompletionRequest,
+        deadline: float | None = None,
     ) -> ChatCompletionResponse:
-        """Send non-streaming chat completion request."""
+        """
+        Send non-streaming chat completion request.
+
+        Args:
+            request: Chat completion request
+            deadline: Absolute time.monotonic() deadline shared by all retries
+
+        Raises:
+            OpenRouterTimeout: If the deadline passes or a connect/read timeout is hit
+            OpenRouterError: On other upstream failures
+        """
         client = await self._get_client()
+        deadline = self._resolve_deadline(deadline)
 
-        request_data = request.model_dump(exclude_none=True)
-        request_data["stream"] = False
-
-        for attempt in range(self.config.max_retries + 1):
-            try:
-                response = await client.post(
-                    "/chat/completions",
-                    json=request_data,
-                )
-                response.raise_for_status()
-                return ChatCompletionResponse.model_validate(response.json())
-
-            except httpx.HTTPStatusError as e:
-                logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
-                if attempt == self.config.max_retries:
-                    raise OpenRouterError(
-                        f"OpenRouter API error: {e.response.text}",
-                        status_code=e.response.status_code,
-                    ) from e
-
-            except httpx.RequestError as e:
-                logger.error(f"Request error: {e}")
-                if attempt == self.config.max_retries:
-                    raise OpenRouterError(f"Request failed: {e}") from e
-
-        raise OpenRouterError("Max retries exceeded")
+        self._in_flight += 1
+        self._requests_total += 1
+        try:
+            for attempt in range(self.config.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OpenRouterTimeout("Request deadline exceeded before upstream response")
+
+                try:
+                    # Body is rebuilt per attempt: a streamed body is single-use
+                    response = await asyncio.wait_for(
+                        client.post(
+                            "/chat/completions",
+                            timeout=self._timeout(remaining, read=remaining),
+                            **self._request_body(request, stream=False),
+                        ),
+                        timeout=remaining,
+                    )
+                    self._observe(request.model, response)
+                    response.raise_for_status()
+                    return ChatCompletionResponse.model_validate(response.json())
+
+                except asyncio.TimeoutError as e:
+                    raise OpenRouterTimeout("Request deadline exceeded waiting for upstream response") from e
+
+                except httpx.HTTPStatusError as e:
+                    logger.error("HTTP error %d: %s", e.response.status_code, e.response.text)
+                    if attempt == self.config.max_retries:
+                        raise OpenRouterError(
+                            f"OpenRouter API error: {e.response.text}",
+                            status_code=e.response.status_code,
+                        ) from e
+
+                except httpx.TimeoutException as e:
+                    logger.error("Upstream timeout: %r", e)
+                    if attempt == self.config.max_retries:
+                        raise OpenRouterTimeout(f"Upstream timeout: {e!r}") from e
+
+                except httpx.RequestError as e:
+                    logger.error("Request error: %s", e)
+                    if attempt == self.config.max_retries:
+                        raise OpenRouterError(f"Request failed: {e}") from e
+
+            raise OpenRouterError("Max retries exceeded")
+
+        finally:
+            self._in_flight -= 1
 
     async def chat_completion_stream(
-        self, request: ChatCompletionRequest
+        self,
+        request: ChatCompletionRequest,
+        deadline: float | None = None,
     ) -> AsyncIterator[StreamChunk]:
-        """Send streaming chat completion request, yields chunks."""
-        client = await self._get_client()
+        """
+        Send streaming chat completion request, yields chunks.
 
-        request_data = request.model_dump(exclude_none=True)
-        request_data["stream"] = True
+        The first content chunk must arrive within first_token_timeout_sec,
+        later SSE lines (including keep-alive comments) within
+        idle_timeout_sec, and everything before the deadline.
 
+        Args:
+            request: Chat completion request
+            deadline: Absolute time.monotonic() deadline
+
+        Raises:
+            OpenRouterTimeout: If any of the timeouts is hit
+            OpenRouterError: On other upstream failures
+        """
+        client = await self._get_client()
+        deadline = self._resolve_deadline(deadline)
+        started = time.monotonic()
+        first_token_by = min(deadline, started + self.config.first_token_timeout_sec)
+
+        self._in_flight += 1
+        self._requests_total += 1
+        response: httpx.Response | None = None
         try:
-            async with client.stream(
+            # Read timeouts are enforced per line below, httpx only guards connect
+            http_request = client.build_request(
                 "POST",
                 "/chat/completions",
-                json=request_data,
-            ) as response:
-                response.raise_for_status()
+                timeout=self._timeout(deadline - started, read=None),
+                **self._request_body(request, stream=True),
+            )
+            response = await _wait(
+                client.send(http_request, stream=True),
+                first_token_by,
+                "No response headers before first-token timeout or deadline",
+            )
+            self._observe(request.model, response)
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
 
-                async for line in response.aiter_lines():
-                    if not line:
+            lines = response.aiter_lines()
+            got_content = False
+            while True:
+                if got_content:
+                    line_by = time.monotonic() + self.config.idle_timeout_sec
+                    message = f"No stream data for {self.config.idle_timeout_sec}s"
+                else:
+                    line_by = started + self.config.first_token_timeout_sec
+                    message = f"No first token within {self.config.first_token_timeout_sec}s"
+                if deadline <= line_by:
+                    line_by = deadline
+                    message = "Request deadline exceeded during streaming"
+
+                try:
+                    line = await _wait(anext(lines), line_by, message)
+                except StopAsyncIteration:
+                    break
+
+                if not line:
+                    continue
+
+                # SSE format: "data: {...}" or "data: [DONE]"
+                if line.startswith("data: "):
+                    data = line[6:]  # Remove "data: " prefix
+
+                    if data == "[DONE]":
+                        break
+
+                    try:
+                        chunk = StreamChunk.model_validate(json.loads(data))
+                    except json.JSONDecodeError as e:
+                        logger.warning("Failed to parse SSE chunk: %s", e)
                         continue
 
-                    # SSE format: "data: {...}" or "data: [DONE]"
-                    if line.startswith("data: "):
-                        data = line[6:]  # Remove "data: " prefix
-
-                        if data == "[DONE]":
-                            break
-
-                        try:
-                            chunk = StreamChunk.model_validate(json.loads(data))
-                            yield chunk
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"Failed to parse SSE chunk: {e}")
-                            continue
+                    got_content = got_content or any(c.delta.content or c.delta.tool_calls for c in chunk.choices)
+                    yield chunk
 
         except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error {e.response.status_code}: {e.response.text}")
+            logger.error("HTTP error %d: %s", e.response.status_code, e.response.text)
             raise OpenRouterError(
                 f"OpenRouter API error: {e.response.text}",
                 status_code=e.response.status_code,
             ) from e
 
+        except httpx.TimeoutException as e:
+            logger.error("Upstream timeout: %r", e)
+            raise OpenRouterTimeout(f"Upstream timeout: {e!r}") from e
+
         except httpx.RequestError as e:
-            logger.error(f"Request error: {e}")
+            logger.error("Request error: %s", e)
             raise OpenRouterError(f"Request failed: {e}") from e
 
+        finally:
+            self._in_flight -= 1
+            if response is not None:
+                await response.aclose()
+
     async def list_models(self) -> list[OpenRouterModel]:
         """Get list of available models."""
         client = await self._get_client()
@@ -149,14 +485,14 @@ class OpenRouterClient:
             return models_response.data
 
         except httpx.HTTPStatusError as e:
-            logger.error(f"Failed to fetch models: {e.response.status_code}")
+            logger.error("Failed to fetch models: %d", e.response.status_code)
             raise OpenRouterError(
                 f"Failed to fetch models: {e.response.text}",
                 status_code=e.response.status_code,
             ) from e
 
         except httpx.RequestError as e:
-            logger.error(f"Request error: {e}")
+            logger.error("Request error: %s", e)
             raise OpenRouterError(f"Request failed: {e}") from e
 
     async def __aenter__(self) -> "OpenRouterClient":
@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+import httpx
+
+from src.core.scheduler import AdmissionRejected
+from src.core.shared_state import SharedStore
+from src.models.config import RateLimitConfig
+from src.utils.logging import get_logger
+
+
+logger = get_logger("rate_limiter")
+
+# Adaptive rate scale: halved on 429, recovered additively on success
+MIN_RATE_SCALE = 0.1
+RATE_SCALE_RECOVERY = 0.05
+
+# Pause applied on 429 when upstream sends no reset hint
+DEFAULT_BACKOFF_SEC = 1.0
+
+# Shared store namespace for bucket state
+STORE_NAMESPACE = "rate_limit"
+
+T = TypeVar("T")
+
+
+class RateLimited(AdmissionRejected):
+    """Request would exceed the upstream rate budget."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__("RATE_LIMITED", message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket that may go into debt.
+
+    Debt comes from reconciling estimates with actual usage; it delays
+    later requests instead of failing the one that already ran.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, rate_scale: float) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self._updated) * self.rate_per_sec * rate_scale,
+        )
+        self._updated = now
+
+    def wait_time(self, amount: float, rate_scale: float = 1.0) -> float:
+        """Seconds until amount can be consumed (0 if available now)."""
+        self._refill(rate_scale)
+        # A request larger than the bucket waits for a full bucket only
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.rate_per_sec * rate_scale)
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def resize(self, rate_per_sec: float, capacity: float) -> None:
+        """Change rate and size, keeping tokens (and debt) that still fit."""
+        self.rate_per_sec = rate_per_sec
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+
+class _KeyState:
+    """Buckets and adaptive state for a single (API key, model) pair."""
+
+    def __init__(self, config: RateLimitConfig):
+        self.requests = TokenBucket(config.requests_per_sec, config.request_burst)
+        self.tokens = TokenBucket(config.tokens_per_min / 60, config.tokens_per_min)
+        self.rate_scale = 1.0
+        self.blocked_until = 0.0
+
+    def resize(self, config: RateLimitConfig) -> None:
+        self.requests.resize(config.requests_per_sec, config.request_burst)
+        self.tokens.resize(config.tokens_per_min / 60, config.tokens_per_min)
+
+    def wait_time(self, estimated_tokens: int) -> float:
+        return max(
+            self.requests.wait_time(1, self.rate_scale),
+            self.tokens.wait_time(estimated_tokens, self.rate_scale),
+            self.blocked_until - time.monotonic(),
+        )
+
+    def to_dict(self) -> dict:
+        # Monotonic time is system-wide, so it is comparable across workers
+        return {
+            "requests": self.requests.tokens,
+            "requests_updated": self.requests._updated,
+            "tokens": self.tokens.tokens,
+            "tokens_updated": self.tokens._updated,
+            "rate_scale": self.rate_scale,
+            "blocked_until": self.blocked_until,
+        }
+
+    def load(self, data: dict) -> None:
+        self.requests.tokens = data["requests"]
+        self.requests._updated = data["requests_updated"]
+        self.tokens.tokens = data["tokens"]
+        self.tokens._updated = data["tokens_updated"]
+        self.rate_scale = data["rate_scale"]
+        self.blocked_until = data["blocked_until"]
+
+
+@dataclass
+class Reservation:
+    """Tokens reserved for a request before it goes upstream."""
+
+    key: tuple[str, str]
+    estimated_tokens: int
+
+
+def _key_id(api_key: str) -> str:
+    """Stable short identifier for an API key, so the raw key is never kept."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def _parse_reset(headers: httpx.Headers) -> float | None:
+    """Seconds until the upstream rate window resets, if advertised."""
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+    # OpenRouter sends the reset time as epoch milliseconds
+    reset = headers.get("x-ratelimit-reset")
+    if reset:
+        try:
+            value = float(reset)
+            if value > 1e12:
+                value /= 1000
+            return max(0.0, value - time.time())
+        except ValueError:
+            pass
+
+    return None
+
+
+class RateLimiter:
+    """
+    Request-rate and token-rate limiter keyed by API key and model.
+
+    Requests reserve one request token and their estimated prompt tokens.
+    If the budget is short, the request is delayed up to max_wait_sec,
+    otherwise rejected. Budgets adapt to upstream rate-limit headers and
+    429 responses.
+
+    With a shared store, bucket state lives in the store and every update
+    is a transaction, so worker processes draw from one budget.
+    """
+
+    def __init__(self, config: RateLimitConfig, store: SharedStore | None = None):
+        self.config = config
+        self._store = store
+        self._states: dict[tuple[str, str], _KeyState] = {}
+        self._counters: Counter[str] = Counter()
+
+    def reconfigure(self, config: RateLimitConfig) -> None:
+        """Apply new limits to existing buckets too; shared state picks them up on its next update."""
+        self.config = config
+        for state in self._states.values():
+            state.resize(config)
+
+    def _state(self, key: tuple[str, str]) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState(self.config)
+        return state
+
+    def _update_shared(self, key: tuple[str, str], fn: Callable[[_KeyState], T]) -> T:
+        def apply(data: dict | None) -> tuple[dict, T]:
+            state = _KeyState(self.config)
+            if data is not None:
+                state.load(data)
+            result = fn(state)
+            return state.to_dict(), result
+
+        return self._store.update(STORE_NAMESPACE, "|".join(key), apply)
+
+    async def _update(self, key: tuple[str, str], fn: Callable[[_KeyState], T]) -> T:
+        """Run fn on the state of key, in a store transaction if state is shared."""
+        if self._store is None:
+            return fn(self._state(key))
+        return await asyncio.to_thread(self._update_shared, key, fn)
+
+    def _update_later(self, key: tuple[str, str], fn: Callable[[_KeyState], None]) -> None:
+        """Like _update for callers that can't await; shared updates run in background."""
+        if self._store is None:
+            fn(self._state(key))
+            return
+        future = asyncio.get_running_loop().run_in_executor(None, self._update_shared, key, fn)
+        future.add_done_callback(_log_update_failure)
+
+    async def acquire(self, api_key: str, model: str, estimated_tokens: int) -> Reservation:
+        """
+        Reserve budget for a request, waiting if needed.
+
+        Raises:
+            RateLimited: If the budget won't be available within max_wait_sec
+        """
+        key = (_key_id(api_key), model)
+        if not self.config.enabled:
+            return Reservation(key=key, estimated_tokens=0)
+
+        def try_consume(state: _KeyState) -> float:
+            wait = state.wait_time(estimated_tokens)
+            if wait <= 0:
+                state.requests.consume(1)
+                state.tokens.consume(estimated_tokens)
+            return wait
+
+        deadline = time.monotonic() + self.config.max_wait_sec
+        delayed = False
+
+        while True:
+            wait = await self._update(key, try_consume)
+            if wait <= 0:
+                self._counters["delayed" if delayed else "admitted"] += 1
+                return Reservation(key=key, estimated_tokens=estimated_tokens)
+
+            if time.monotonic() + wait > deadline:
+                self._counters["rejected"] += 1
+                raise RateLimited(
+                    f"Rate limit for {model} exceeded, retry in {wait:.1f}s",
+                    retry_after=wait,
+                )
+
+            delayed = True
+            await asyncio.sleep(wait)
+
+    def reconcile(self, reservation: Reservation, actual_tokens: int) -> None:
+        """
+        Correct the token bucket with actual usage reported upstream.
+
+        Requests that failed, were rejected by the scheduler or cancelled
+        pass 0 and get their whole estimate back.
+        """
+        if not self.config.enabled:
+            return
+        correction = actual_tokens - reservation.estimated_tokens
+        if correction == 0:
+            return
+        self._update_later(reservation.key, lambda state: state.tokens.consume(correction))
+
+    def observe_response(self, api_key: str, model: str, status_code: int, headers: httpx.Headers) -> None:
+        """Adapt budgets to an upstream response."""
+        if not self.config.enabled:
+            return
+
+        key = (_key_id(api_key), model)
+        reset_in = _parse_reset(headers)
+
+        if status_code == 429:
+            self._counters["upstream_429"] += 1
+            backoff = reset_in if reset_in is not None else DEFAULT_BACKOFF_SEC
+
+            def back_off(state: _KeyState) -> None:
+                state.rate_scale = max(MIN_RATE_SCALE, state.rate_scale / 2)
+                state.blocked_until = max(state.blocked_until, time.monotonic() + backoff)
+
+            self._update_later(key, back_off)
+            logger.warning("Upstream rate limit for %s, backing off %.1fs", model, backoff)
+            return
+
+        remaining_requests = None
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            try:
+                remaining_requests = float(remaining)
+            except ValueError:
+                pass
+
+        def recover(state: _KeyState) -> None:
+            state.rate_scale = min(1.0, state.rate_scale + RATE_SCALE_RECOVERY)
+            if remaining_requests is not None:
+                # Upstream window is tighter than our bucket: follow it
+                state.requests.tokens = min(state.requests.tokens, remaining_requests)
+                if remaining_requests <= 0 and reset_in:
+                    state.blocked_until = max(state.blocked_until, time.monotonic() + reset_in)
+
+        self._update_later(key, recover)
+
+    def _bucket_states(self) -> dict[tuple[str, str], _KeyState]:
+        if self._store is None:
+            return self._states
+        states = {}
+        for key, data in self._store.items(STORE_NAMESPACE).items():
+            key_id, model = key.split("|", 1)
+            states[(key_id, model)] = state = _KeyState(self.config)
+            state.load(data)
+        return states
+
+    def stats(self, states: dict[tuple[str, str], _KeyState] | None = None) -> dict:
+        """Get rate limiter metrics snapshot. Without states, blocks reading the shared store if there is one."""
+        if states is None:
+            states = self._bucket_states()
+        return {
+            "enabled": self.config.enabled,
+            **{name: self._counters[name] for name in ("admitted", "delayed", "rejected", "upstream_429")},
+            "buckets": [
+                {
+                    "key": key_id,
+                    "model": model,
+                    "requests_available": round(state.requests.tokens, 2),
+                    "tokens_available": round(state.tokens.tokens),
+                    "rate_scale": round(state.rate_scale, 2),
+                    "blocked_for_sec": round(max(0.0, state.blocked_until - time.monotonic()), 2),
+                }
+                for (key_id, model), state in states.items()
+            ],
+        }
+
+    async def stats_async(self) -> dict:
+        """stats() with the shared store read in a worker thread."""
+        if self._store is None:
+            return self.stats()
+        return self.stats(await asyncio.to_thread(self._bucket_states))
+
+
+def _log_update_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Shared rate limit update failed: %s", future.exception())
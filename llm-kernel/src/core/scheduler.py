@@ -0,0 +1,193 @@
+import asyncio
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+
+from src.models.config import SchedulerConfig
+from src.utils.metrics import Histogram
+
+
+class Priority(str, Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
+# Lower rank is served first
+_PRIORITY_RANK = {Priority.INTERACTIVE: 0, Priority.BACKGROUND: 1}
+
+
+class AdmissionRejected(Exception):
+    """Request was not admitted to run upstream."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class _Waiter:
+    client_id: str
+    model: str
+    priority: Priority
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class RequestScheduler:
+    """
+    Kernel-wide admission control for upstream requests.
+
+    Limits total concurrency, concurrency per client and per model, and
+    caps background work so interactive requests always have headroom.
+    Waiting requests are served by priority, then FIFO; a waiter blocked
+    by its own client or model quota does not hold back others.
+    """
+
+    def __init__(self, config: SchedulerConfig):
+        self.config = config
+        self._waiters: list[_Waiter] = []
+        self._active = 0
+        self._active_by_priority: Counter[Priority] = Counter()
+        self._active_by_client: Counter[str] = Counter()
+        self._active_by_model: Counter[str] = Counter()
+
+        self._admitted: Counter[Priority] = Counter()
+        self._rejected: Counter[str] = Counter()
+        self._wait_ms: dict[Priority, Histogram] = {p: Histogram() for p in Priority}
+
+    def reconfigure(self, config: SchedulerConfig) -> None:
+        """Apply new limits, admitting queued requests that fit under raised ones."""
+        self.config = config
+        self._wake_waiters()
+
+    def _can_run(self, client_id: str, model: str, priority: Priority) -> bool:
+        """Check whether a request fits into all limits right now."""
+        if self._active >= self.config.max_concurrent:
+            return False
+        if (
+            priority == Priority.BACKGROUND
+            and self._active_by_priority[Priority.BACKGROUND] >= self.config.max_background_concurrent
+        ):
+            return False
+        if self._active_by_client[client_id] >= self.config.max_per_client:
+            return False
+        if self._active_by_model[model] >= self.config.max_per_model:
+            return False
+        return True
+
+    def _take(self, client_id: str, model: str, priority: Priority) -> None:
+        self._active += 1
+        self._active_by_priority[priority] += 1
+        self._active_by_client[client_id] += 1
+        self._active_by_model[model] += 1
+        self._admitted[priority] += 1
+
+    def _release(self, client_id: str, model: str, priority: Priority) -> None:
+        self._active -= 1
+        self._active_by_priority[priority] -= 1
+        # Drop zero entries so per-client/model counters don't grow forever
+        for counter, key in ((self._active_by_client, client_id), (self._active_by_model, model)):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        self._wake_waiters()
+
+    def _drop_waiter(self, waiter: _Waiter) -> None:
+        waiter.future.cancel()
+        self._waiters = [w for w in self._waiters if w is not waiter]
+
+    def _wake_waiters(self) -> None:
+        """Hand free slots to queued requests in priority order."""
+        if not self._waiters:
+            return
+
+        self._waiters.sort(key=lambda w: (_PRIORITY_RANK[w.priority], w.enqueued_at))
+        remaining: list[_Waiter] = []
+        for waiter in self._waiters:
+            if waiter.future.done():
+                continue
+            if self._can_run(waiter.client_id, waiter.model, waiter.priority):
+                self._take(waiter.client_id, waiter.model, waiter.priority)
+                waiter.future.set_result(None)
+            else:
+                remaining.append(waiter)
+        self._waiters = remaining
+
+    async def _acquire(self, client_id: str, model: str, priority: Priority) -> None:
+        """Wait for a slot or raise AdmissionRejected."""
+        # Waiters that could run were already woken on the last release, so
+        # a request that fits now does not overtake anyone runnable
+        if self._can_run(client_id, model, priority):
+            self._take(client_id, model, priority)
+            self._wait_ms[priority].observe(0.0)
+            return
+
+        if len(self._waiters) >= self.config.max_queue_depth:
+            self._rejected["QUEUE_FULL"] += 1
+            raise AdmissionRejected("QUEUE_FULL", f"Request queue is full ({len(self._waiters)} waiting)")
+
+        waiter = _Waiter(
+            client_id=client_id,
+            model=model,
+            priority=priority,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+
+        try:
+            # Unlike wait_for, wait neither cancels the future nor swallows a
+            # cancellation that arrives together with the slot
+            await asyncio.wait([waiter.future], timeout=self.config.max_queue_time_sec)
+        except BaseException:
+            # Cancelled while waiting: give back a slot granted concurrently
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(client_id, model, priority)
+            else:
+                self._drop_waiter(waiter)
+            raise
+        finally:
+            self._wait_ms[priority].observe((time.monotonic() - waiter.enqueued_at) * 1000)
+
+        # Slot may have been granted in the same loop iteration as the timeout
+        if not waiter.future.done():
+            self._drop_waiter(waiter)
+            self._rejected["QUEUE_TIMEOUT"] += 1
+            raise AdmissionRejected(
+                "QUEUE_TIMEOUT",
+                f"Request waited more than {self.config.max_queue_time_sec}s for an upstream slot",
+            )
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        client_id: str,
+        model: str,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> AsyncIterator[None]:
+        """
+        Hold an upstream slot for the duration of the block.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait exceeds max_queue_time_sec
+        """
+        await self._acquire(client_id, model, priority)
+        try:
+            yield
+        finally:
+            self._release(client_id, model, priority)
+
+    def stats(self) -> dict:
+        """Get scheduler metrics snapshot."""
+        depth = Counter(w.priority.value for w in self._waiters)
+        return {
+            "active": self._active,
+            "active_by_priority": {p.value: self._active_by_priority[p] for p in Priority},
+            "queue_depth": {p.value: depth[p.value] for p in Priority},
+            "admitted": {p.value: self._admitted[p] for p in Priority},
+            "rejected": dict(self._rejected),
+            "wait_ms": {p.value: self._wait_ms[p].snapshot() for p in Priority},
+            "limits": self.config.model_dump(),
+        }
@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TypeVar
+
+
+T = TypeVar("T")
+
+# How long a writer waits for another process's transaction
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+
+class SharedStore:
+    """
+    Key-value state shared by worker processes on one host.
+
+    Backed by a local SQLite database in WAL mode: read-modify-write
+    updates run in an immediate transaction, so concurrent workers
+    serialize on the database lock instead of overwriting each other.
+    Values are JSON objects grouped by namespace. Calls block on disk and
+    the lock, so async code should run them in a worker thread.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def update(self, namespace: str, key: str, fn: Callable[[dict | None], tuple[dict, T]]) -> T:
+        """
+        Atomically read, modify and write one value.
+
+        Args:
+            namespace: Value group, e.g. "rate_limit"
+            key: Value key within the namespace
+            fn: Gets the current value (None if missing), returns the new value and a result
+
+        Returns:
+            The result returned by fn
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            value, result = fn(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, updated) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time()),
+            )
+        return result
+
+    def put(self, namespace: str, key: str, value: dict) -> None:
+        """Write one value, replacing the previous one."""
+        self.update(namespace, key, lambda _: (value, None))
+
+    def items(self, namespace: str, max_age_sec: float | None = None) -> dict[str, dict]:
+        """All values of a namespace, optionally only those updated within max_age_sec."""
+        min_updated = time.time() - max_age_sec if max_age_sec is not None else 0.0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ? AND updated >= ?",
+                (namespace, min_updated),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self) -> None:
+        """Drop all shared state, e.g. before workers start."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM state")
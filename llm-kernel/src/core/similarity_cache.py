@@ -0,0 +1,334 @@
+import hashlib
+import itertools
+import re
+import time
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict, deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from src.models.config import SimilarityCacheConfig
+from src.utils.logging import get_logger
+
+
+logger = get_logger("similarity_cache")
+
+# MinHash signature length (power of two) and LSH banding: 16 bands of 4
+# rows make pairs above ~0.8 Jaccard almost certain candidates; candidates
+# are then verified with exact Jaccard, so banding only affects recall
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+# Character shingle size: tolerant to typos inside a word
+SHINGLE_SIZE = 3
+
+# Hits kept for false-positive review
+RECENT_HITS = 200
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_BUCKET_SHIFT = 64 - (NUM_PERM.bit_length() - 1)
+_VALUE_MASK = (1 << _BUCKET_SHIFT) - 1
+
+# Dates, times and ISO timestamps, matched after lowercasing
+_TIMESTAMP_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[t ]\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:z|[+-]\d{2}:?\d{2})?)?"
+    r"|\d{1,2}[./]\d{1,2}[./]\d{2,4}"
+    r"|\d{1,2}:\d{2}(?::\d{2})?(?:\s?[ap]m)?"
+)
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+_WHITESPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+")
+_TIMESTAMP_TOKEN = " tstamp "
+
+
+def normalize_prompt(text: str) -> str:
+    """Canonical prompt form: case, whitespace, punctuation and timestamps don't matter."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _TIMESTAMP_RE.sub(_TIMESTAMP_TOKEN, text)
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _shingles(normalized: str) -> set[str]:
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def _minhash(shingles: set[str]) -> tuple[int, ...]:
+    """
+    One-permutation MinHash with rotation densification.
+
+    Each shingle hash goes to one of NUM_PERM buckets by its top bits and
+    each bucket keeps its minimum, so the cost is one hash per shingle
+    instead of one per shingle and permutation. Empty buckets borrow the
+    value of the next non-empty one.
+    """
+    signature: list[int | None] = [None] * NUM_PERM
+    for shingle in shingles:
+        # crc32 is stable across processes, unlike the builtin str hash;
+        # the multiply spreads its 32 bits over the 64-bit range
+        h = (zlib.crc32(shingle.encode("utf-8")) * _GOLDEN_GAMMA) & _MASK64
+        bucket = h >> _BUCKET_SHIFT
+        value = h & _VALUE_MASK
+        current = signature[bucket]
+        if current is None or value < current:
+            signature[bucket] = value
+
+    filled = [i for i, value in enumerate(signature) if value is not None]
+    for i in range(NUM_PERM):
+        if signature[i] is None:
+            donor = next((j for j in filled if j > i), filled[0])
+            signature[i] = signature[donor] + ((donor - i) % NUM_PERM) * (_VALUE_MASK + 1)
+    return tuple(signature)
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class Fingerprint:
+    """Similarity features of the final user turn."""
+
+    normalized: str
+    shingles: set[str]
+    signature: tuple[int, ...] | None  # None for prompts matched exactly only
+    numbers: tuple[str, ...]  # Numbers outside timestamps must match exactly
+
+
+@dataclass
+class CachedResponse:
+    content: str
+    finish_reason: str | None
+    prompt_tokens: int
+    completion_tokens: int
+
+
+@dataclass
+class _Entry:
+    entry_id: int
+    context_key: str
+    model: str
+    prompt: str  # Original prompt, for review
+    fingerprint: Fingerprint
+    response: CachedResponse
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+@dataclass
+class CacheHit:
+    hit_id: int
+    entry_id: int
+    similarity: float
+    response: CachedResponse
+
+
+def context_key(model: str, persona: str, system_prompt: str, history: Iterable[str] = ()) -> str:
+    """Exact-match key of everything except the final user turn; history is the fields of earlier messages."""
+    digest = hashlib.sha256()
+    for part in itertools.chain((model, persona, normalize_prompt(system_prompt)), history):
+        # Length-prefixed: client text may contain any separator, and a key
+        # shared by two dialogs would serve one the other's reply
+        data = part.encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class SimilarityCache:
+    """
+    Near-duplicate response cache.
+
+    The final user turn is normalized, fingerprinted with MinHash over
+    character shingles and indexed with LSH; the rest of the context must
+    match exactly via context_key. Candidates from the index are verified
+    with exact shingle Jaccard against the threshold, and any numbers in
+    the prompt must be identical, so "2+2" never answers "2+3". Short
+    prompts only match after normalization, never by similarity.
+
+    Runs fully in-process without network access. Served hits are kept for
+    review; rejecting a hit evicts the entry and counts a false positive.
+    """
+
+    def __init__(self, config: SimilarityCacheConfig):
+        self.config = config
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()  # LRU order
+        self._exact: dict[tuple[str, str], int] = {}
+        self._bands: dict[tuple[int, int], set[int]] = {}
+        self._ids = itertools.count(1)
+        self._hit_ids = itertools.count(1)
+        self._recent_hits: deque[dict] = deque(maxlen=RECENT_HITS)
+        self._counters: Counter[str] = Counter()
+        self._hits_by_model: Counter[str] = Counter()
+
+    def eligible(self, model: str, persona: str) -> bool:
+        """Whether a request's model or persona opted in to caching."""
+        if not self.config.enabled:
+            return False
+        return model in self.config.models or (bool(persona) and persona in self.config.personas)
+
+    def fingerprint(self, prompt: str) -> Fingerprint | None:
+        """Fingerprint a user prompt, None if it is too long to be worth caching."""
+        if len(prompt) > self.config.max_prompt_chars:
+            return None
+        normalized = normalize_prompt(prompt)
+        shingles = _shingles(normalized)
+        signature = _minhash(shingles) if len(normalized) >= self.config.min_similarity_chars else None
+        return Fingerprint(
+            normalized=normalized,
+            shingles=shingles,
+            signature=signature,
+            numbers=tuple(_NUMBER_RE.findall(normalized)),
+        )
+
+    @staticmethod
+    def _band_keys(signature: tuple[int, ...]) -> list[tuple[int, int]]:
+        return [
+            (band, hash(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+            for band in range(LSH_BANDS)
+        ]
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.time() - entry.created_at > self.config.ttl_sec
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        fp = entry.fingerprint
+        if self._exact.get((entry.context_key, fp.normalized)) == entry_id:
+            del self._exact[(entry.context_key, fp.normalized)]
+        if fp.signature is not None:
+            for key in self._band_keys(fp.signature):
+                bucket = self._bands.get(key)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._bands[key]
+
+    def _best_candidate(self, key: str, fp: Fingerprint) -> tuple[_Entry, float] | None:
+        entry_id = self._exact.get((key, fp.normalized))
+        if entry_id is not None:
+            return self._entries[entry_id], 1.0
+        if fp.signature is None:
+            return None
+
+        candidate_ids: set[int] = set()
+        for band_key in self._band_keys(fp.signature):
+            candidate_ids |= self._bands.get(band_key, set())
+
+        best: tuple[_Entry, float] | None = None
+        for candidate_id in candidate_ids:
+            entry = self._entries[candidate_id]
+            if entry.context_key != key or entry.fingerprint.numbers != fp.numbers:
+                continue
+            similarity = _jaccard(fp.shingles, entry.fingerprint.shingles)
+            if similarity >= self.config.threshold and (best is None or similarity > best[1]):
+                best = (entry, similarity)
+        return best
+
+    def lookup(self, key: str, fp: Fingerprint, prompt: str) -> CacheHit | None:
+        """Find a cached response for a near-duplicate prompt in the same context."""
+        self._counters["lookups"] += 1
+        found = self._best_candidate(key, fp)
+        if found is not None and self._expired(found[0]):
+            self._remove(found[0].entry_id)
+            found = None
+        if found is None:
+            self._counters["misses"] += 1
+            return None
+
+        entry, similarity = found
+        entry.hits += 1
+        self._entries.move_to_end(entry.entry_id)
+        self._counters["hits"] += 1
+        self._hits_by_model[entry.model] += 1
+
+        hit = CacheHit(
+            hit_id=next(self._hit_ids),
+            entry_id=entry.entry_id,
+            similarity=similarity,
+            response=entry.response,
+        )
+        self._recent_hits.append({
+            "hit_id": hit.hit_id,
+            "entry_id": entry.entry_id,
+            "at": time.time(),
+            "model": entry.model,
+            "similarity": round(similarity, 3),
+            "prompt": prompt[:500],
+            "cached_prompt": entry.prompt[:500],
+            "rejected": False,
+        })
+        return hit
+
+    def store(self, key: str, fp: Fingerprint, model: str, prompt: str, response: CachedResponse) -> None:
+        """Cache a complete response, evicting least recently used entries over capacity."""
+        previous = self._exact.get((key, fp.normalized))
+        if previous is not None:
+            self._remove(previous)
+
+        entry_id = next(self._ids)
+        self._entries[entry_id] = _Entry(
+            entry_id=entry_id,
+            context_key=key,
+            model=model,
+            prompt=prompt,
+            fingerprint=fp,
+            response=response,
+        )
+        self._exact[(key, fp.normalized)] = entry_id
+        if fp.signature is not None:
+            for band_key in self._band_keys(fp.signature):
+                self._bands.setdefault(band_key, set()).add(entry_id)
+        self._counters["stored"] += 1
+
+        while len(self._entries) > self.config.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._counters["evicted"] += 1
+
+    def reject_hit(self, hit_id: int) -> bool:
+        """
+        Mark a served hit as a false positive and evict its entry.
+
+        Returns:
+            False if the hit is no longer in the review window
+        """
+        for hit in self._recent_hits:
+            if hit["hit_id"] == hit_id:
+                if not hit["rejected"]:
+                    hit["rejected"] = True
+                    self._counters["false_positives"] += 1
+                    self._remove(hit["entry_id"])
+                    logger.info("Cache hit %d rejected, entry %d evicted", hit_id, hit["entry_id"])
+                return True
+        return False
+
+    def recent_hits(self, limit: int = 50) -> list[dict]:
+        """Most recent served hits, newest first."""
+        return list(itertools.islice(reversed(self._recent_hits), limit))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._exact.clear()
+        self._bands.clear()
+
+    def stats(self) -> dict:
+        """Get cache metrics snapshot."""
+        lookups = self._counters["lookups"]
+        hits = self._counters["hits"]
+        return {
+            "enabled": self.config.enabled,
+            "entries": len(self._entries),
+            **{name: self._counters[name] for name in ("lookups", "hits", "misses", "stored", "evicted", "false_positives")},
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "false_positive_rate": round(self._counters["false_positives"] / hits, 4) if hits else 0.0,
+            "hits_by_model": dict(self._hits_by_model),
+        }
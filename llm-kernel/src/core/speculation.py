@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from collections import Counter, deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import aclosing
+from dataclasses import dataclass, field
+
+from src.core.journal import JournalEntry
+from src.core.scheduler import Priority
+from src.core.stop_detector import FINISH_REASON as STOP_DETECTOR_FINISH, StopDetector, StopDetectors
+from src.core.token_counter import count_tokens
+from src.models.config import SpeculationConfig
+from src.models.openrouter import ChatCompletionRequest, StreamChunk
+from src.models.requests import LLMRequest, NextRequestHint
+from src.utils.logging import get_logger
+
+
+logger = get_logger("speculation")
+
+# Marker in a predicted user prompt that is replaced with the current reply
+REPLY_PLACEHOLDER = "{{reply}}"
+
+# Window of the wasted token budget
+BUDGET_WINDOW_SEC = 3600
+
+# Outcomes of speculations that were not used
+MISS_OUTCOMES = ("mismatched", "expired", "replaced", "not_started", "failed", "disconnected")
+
+
+def request_key(request: LLMRequest) -> str:
+    """Exact-match key of the parts of a request that determine its answer."""
+    digest = hashlib.sha256()
+    parts = [request.model, request.persona, request.system_prompt, request.user_prompt]
+    for message in request.messages:
+        parts += (message.role, message.name, message.content)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _fill_reply(text: str, reply: str) -> str:
+    head, marker, tail = text.rpartition(REPLY_PLACEHOLDER)
+    return head + reply + tail if marker else text
+
+
+def predict_request(hint: NextRequestHint, reply: str) -> LLMRequest:
+    """Predicted next request: the hint with the current reply in place of the placeholder."""
+    return LLMRequest(
+        request_id=f"spec-{uuid.uuid4()}",
+        model=hint.model,
+        system_prompt=hint.system_prompt,
+        user_prompt=_fill_reply(hint.user_prompt, reply),
+        messages=[
+            message.model_copy(update={"content": _fill_reply(message.content, reply)})
+            if REPLY_PLACEHOLDER in message.content else message
+            for message in hint.messages
+        ],
+        stream=True,
+        priority="background",
+        persona=hint.persona,
+    )
+
+
+@dataclass
+class Speculation:
+    """Buffered speculative generation of one predicted request."""
+
+    key: str
+    client_id: str
+    persona: str
+    entry: JournalEntry  # queue_ms is set once admitted upstream
+    estimated_prompt_tokens: int
+    started_at: float = field(default_factory=time.monotonic)
+    chunks: list[str] = field(default_factory=list)
+    finish_reason: str | None = None
+    error: Exception | None = None
+    done: bool = False
+    task: asyncio.Task | None = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def admitted(self) -> bool:
+        return self.entry.queue_ms is not None
+
+    def content(self) -> str:
+        return "".join(self.chunks)
+
+    def _notify(self) -> None:
+        self._changed.set()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """
+        Yield buffered content, then live content until generation ends.
+
+        Raises:
+            Exception: The upstream error, if generation failed
+        """
+        sent = 0
+        while True:
+            if sent < len(self.chunks):
+                piece = "".join(self.chunks[sent:])
+                sent = len(self.chunks)
+                yield piece
+                continue
+            if self.done:
+                break
+            self._changed.clear()
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+    async def wait(self) -> None:
+        """
+        Wait for generation to end.
+
+        Raises:
+            Exception: The upstream error, if generation failed
+        """
+        async for _ in self.follow():
+            pass
+
+
+class SpeculativeGenerator:
+    """
+    Speculative pre-generation of a client's predicted next request.
+
+    A request may carry a hint of the request that will follow it, e.g. the
+    next persona's turn with the current reply in its history. Once the
+    current reply is complete, the predicted request is started as
+    background work and its output buffered. If the client's next request
+    matches the prediction exactly it is answered from the buffer, live if
+    generation is still running; a different request for the same persona
+    cancels it. One speculation per client is kept at a time.
+
+    Tokens of unused speculations count against wasted_tokens_per_hour;
+    once it is spent, no new speculation starts until the window moves on.
+    """
+
+    def __init__(
+        self,
+        config: SpeculationConfig,
+        stream: Callable[[ChatCompletionRequest, JournalEntry], AsyncIterator[StreamChunk]],
+        stop_detectors: StopDetectors | None = None,
+    ):
+        self.config = config
+        self._stream = stream
+        self._stop_detectors = stop_detectors
+        self._by_client: dict[str, Speculation] = {}
+        self._wasted: deque[tuple[float, int]] = deque()
+        self._counters: Counter[str] = Counter()
+        self._head_start_ms = 0.0
+
+    def _wasted_in_window(self) -> int:
+        cutoff = time.monotonic() - BUDGET_WINDOW_SEC
+        while self._wasted and self._wasted[0][0] < cutoff:
+            self._wasted.popleft()
+        return sum(tokens for _, tokens in self._wasted)
+
+    def _expired(self, speculation: Speculation) -> bool:
+        return time.monotonic() - speculation.started_at > self.config.ttl_sec
+
+    def start(
+        self,
+        client_id: str,
+        predicted: LLMRequest,
+        chat_request: ChatCompletionRequest,
+        estimated_prompt_tokens: int,
+    ) -> None:
+        """Start generating a predicted request, replacing the client's previous speculation."""
+        if not self.config.enabled:
+            return
+        for speculation in list(self._by_client.values()):
+            if self._expired(speculation):
+                self._discard(speculation, "expired")
+        previous = self._by_client.get(client_id)
+        if previous is not None:
+            self._discard(previous, "replaced")
+
+        if len(self._by_client) >= self.config.max_active:
+            self._counters["skipped_busy"] += 1
+            return
+        if self._wasted_in_window() >= self.config.wasted_tokens_per_hour:
+            self._counters["skipped_budget"] += 1
+            return
+
+        speculation = Speculation(
+            key=request_key(predicted),
+            client_id=client_id,
+            persona=predicted.persona,
+            entry=JournalEntry(
+                ts=time.time(),
+                request_id=predicted.request_id,
+                client_id=client_id,
+                persona=predicted.persona,
+                model=predicted.model,
+                priority=Priority.BACKGROUND.value,
+                stream=True,
+                source="speculation",
+            ),
+            estimated_prompt_tokens=estimated_prompt_tokens,
+        )
+        speculation.task = asyncio.create_task(self._run(speculation, chat_request))
+        self._by_client[client_id] = speculation
+        self._counters["started"] += 1
+        logger.debug("Speculating %s for client %s", predicted.request_id, client_id)
+
+    async def _run(self, speculation: Speculation, chat_request: ChatCompletionRequest) -> None:
+        # Speculated replies are cut by the persona's stop detector like any other
+        detector = self._stop_detectors.detector(speculation.persona) if self._stop_detectors else None
+        try:
+            # Leaving the loop early closes the stream, which cancels generation upstream
+            async with aclosing(self._stream(chat_request, speculation.entry)) as stream:
+                async for chunk in stream:
+                    for choice in chunk.choices:
+                        if choice.delta.content:
+                            piece = detector.feed(choice.delta.content) if detector else choice.delta.content
+                            if piece:
+                                speculation.chunks.append(piece)
+                                speculation._notify()
+                        if choice.finish_reason:
+                            speculation.finish_reason = choice.finish_reason
+                    if detector and detector.match:
+                        self._stopped(speculation, chat_request, detector)
+                        break
+            if detector and detector.match is None:
+                rest = detector.flush()
+                if rest:
+                    speculation.chunks.append(rest)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            speculation.error = e
+            logger.warning("Speculation %s failed: %s", speculation.entry.request_id, e)
+        finally:
+            speculation.done = True
+            speculation._notify()
+
+    def _stopped(self, speculation: Speculation, chat_request: ChatCompletionRequest, detector: StopDetector) -> None:
+        """Account for a speculated reply cut by its stop detector, before its stream is closed."""
+        entry = speculation.entry
+        # A cancelled stream reports no usage: estimate what was generated
+        entry.prompt_tokens = speculation.estimated_prompt_tokens
+        entry.completion_tokens = count_tokens(speculation.content()) + count_tokens(detector.discarded)
+        entry.finish_reason = speculation.finish_reason = STOP_DETECTOR_FINISH
+        tokens_saved = max(0, (chat_request.max_tokens or 0) - entry.completion_tokens)
+        self._stop_detectors.record(detector.match, count_tokens(detector.discarded), tokens_saved)
+        logger.info(
+            "Speculation %s: stopped by %s detector at %r",
+            entry.request_id, detector.match.kind, detector.match.text[:40],
+        )
+
+    def claim(self, client_id: str, request: LLMRequest) -> Speculation | None:
+        """
+        Take the client's speculation if it predicted this request.
+
+        A speculation for the same persona that does not match is cancelled.
+        One still waiting for an upstream slot is cancelled too: a fresh
+        interactive request would be served sooner.
+        """
+        speculation = self._by_client.get(client_id)
+        if speculation is None:
+            return None
+        if self._expired(speculation):
+            self._discard(speculation, "expired")
+            return None
+
+        if request_key(request) != speculation.key or request.tools or request.attachments:
+            if request.persona == speculation.persona:
+                self._discard(speculation, "mismatched")
+            return None
+        if not speculation.admitted:
+            self._discard(speculation, "not_started")
+            return None
+        if speculation.done and speculation.error is not None:
+            self._discard(speculation, "failed")
+            return None
+
+        del self._by_client[client_id]
+        self._counters["committed"] += 1
+        self._head_start_ms += (time.monotonic() - speculation.started_at) * 1000
+        return speculation
+
+    def _discard(self, speculation: Speculation, outcome: str) -> None:
+        if self._by_client.get(speculation.client_id) is speculation:
+            del self._by_client[speculation.client_id]
+        self._counters[outcome] += 1
+
+        entry = speculation.entry
+        if not speculation.done:
+            # Upstream reports no usage for a cancelled stream: estimate it for the journal
+            if speculation.admitted:
+                entry.prompt_tokens = speculation.estimated_prompt_tokens
+                entry.completion_tokens = count_tokens(speculation.content())
+            speculation.task.cancel()
+        wasted = entry.prompt_tokens + entry.completion_tokens
+        self._wasted.append((time.monotonic(), wasted))
+        self._counters["wasted_tokens"] += wasted
+
+    def drop_client(self, client_id: str) -> None:
+        """Cancel the speculation of a client that went away."""
+        speculation = self._by_client.get(client_id)
+        if speculation is not None:
+            self._discard(speculation, "disconnected")
+
+    async def close(self) -> None:
+        """Cancel running speculations."""
+        for speculation in list(self._by_client.values()):
+            if speculation.task is not None:
+                speculation.task.cancel()
+        self._by_client.clear()
+
+    def stats(self) -> dict:
+        """Get speculation metrics snapshot."""
+        committed = self._counters["committed"]
+        resolved = committed + sum(self._counters[outcome] for outcome in MISS_OUTCOMES)
+        return {
+            "enabled": self.config.enabled,
+            "active": len(self._by_client),
+            **{
+                name: self._counters[name]
+                for name in ("started", "committed", *MISS_OUTCOMES, "skipped_busy", "skipped_budget", "wasted_tokens")
+            },
+            "hit_rate": round(committed / resolved, 4) if resolved else 0.0,
+            "wasted_tokens_in_window": self._wasted_in_window(),
+            "avg_head_start_ms": round(self._head_start_ms / committed, 1) if committed else 0.0,
+        }
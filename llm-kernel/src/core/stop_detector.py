@@ -0,0 +1,231 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from src.models.config import StopDetectorConfig
+
+
+FINISH_REASON = "stop_detector"
+
+# Length of the end of the reply looked up to find candidate repetition periods
+REPETITION_NEEDLE_CHARS = 16
+
+# Tail buffer is trimmed once it grows this many times over what matching needs
+TRIM_FACTOR = 2
+
+
+def speaker_pattern(names: list[str]) -> str:
+    """Regex of a line starting with one of the names as a speaker label, e.g. "Bob:" or "**Bob**:"."""
+    alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return rf"^[ \t>*_]*(?:{alternatives})[*_]*[ \t]*:"
+
+
+@dataclass
+class StopMatch:
+    kind: str  # "pattern", "speaker" or "repetition"
+    position: int  # Reply is cut here
+    text: str  # What matched, for logs
+
+
+class StopDetector:
+    """
+    Incremental stop detection over one streamed reply.
+
+    Each piece is scanned together with the last lookback_chars before it,
+    so matches spanning chunk boundaries are found. The last holdback_chars
+    are held back from the client: a match that starts in them is cut
+    before the client ever sees it. With repetition detection on, at least
+    repetition_max_period is held back, so a repetition is always cut at
+    the start of a copy: the second one, or a later one if the second was
+    already sent.
+    """
+
+    def __init__(
+        self,
+        patterns: list[tuple[str, re.Pattern]],
+        config: StopDetectorConfig,
+    ):
+        self._patterns = patterns
+        self._config = config
+        self._tail = ""  # Received text from absolute offset _base on
+        self._base = 0
+        self._received = 0
+        self._emitted = 0
+        self._keep = max(config.lookback_chars, config.repetition_max_period * config.repetition_repeats)
+        self._holdback = config.holdback_chars
+        if config.repetition_repeats:
+            self._holdback = max(self._holdback, config.repetition_max_period)
+        self.match: StopMatch | None = None
+        self.discarded = ""  # Received text after the cut
+
+    def feed(self, piece: str) -> str:
+        """
+        Add a piece of the reply.
+
+        Returns:
+            Text that may be sent to the client now, up to the cut once a match is found
+        """
+        if self.match is not None:
+            self.discarded += piece
+            return ""
+        scan_from = max(0, self._received - self._config.lookback_chars)
+        self._tail += piece
+        self._received += len(piece)
+
+        self.match = self._find(scan_from)
+        if self.match is not None:
+            cut = max(self.match.position, self._emitted)
+            self.discarded = self._tail[cut - self._base:]
+            return self._emit(cut)
+
+        text = self._emit(max(self._emitted, self._received - self._holdback))
+        if len(self._tail) > TRIM_FACTOR * (self._keep + self._holdback):
+            # Everything not yet emitted is within the holdback of the end
+            drop = len(self._tail) - self._keep - self._holdback
+            self._tail = self._tail[drop:]
+            self._base += drop
+        return text
+
+    def feed_all(self, text: str) -> str:
+        """
+        Run a complete reply, e.g. a cached one, through the detector.
+
+        The reply is fed in pieces as if streamed: repetitions are only
+        looked for at the end of what has been received.
+
+        Returns:
+            The reply up to the cut, or all of it if nothing matched
+        """
+        step = self._config.repetition_min_period
+        kept = [self.feed(text[start:start + step]) for start in range(0, len(text), step)]
+        return "".join(kept) + self.flush()
+
+    def flush(self) -> str:
+        """Held-back text, once the reply ended without a match."""
+        if self.match is not None:
+            return ""
+        return self._emit(self._received)
+
+    def _emit(self, upto: int) -> str:
+        text = self._tail[self._emitted - self._base:upto - self._base]
+        self._emitted = upto
+        return text
+
+    def _find(self, scan_from: int) -> StopMatch | None:
+        # A "^" at the start of the trimmed buffer is mid-line in the reply
+        pos = max(scan_from - self._base, 1 if self._base else 0)
+        for kind, pattern in self._patterns:
+            found = pattern.search(self._tail, pos)
+            if found is not None:
+                return StopMatch(kind, found.start() + self._base, found.group(0))
+        return self._find_repetition()
+
+    def _find_repetition(self) -> StopMatch | None:
+        """
+        A block repeated repetition_repeats times in a row at the end.
+
+        The first copy is kept. Copies are aligned to where the repetition
+        starts, not to the end of what has been received, so the cut falls
+        at the start of a copy that has not been sent yet.
+        """
+        repeats = self._config.repetition_repeats
+        if not repeats:
+            return None
+        tail = self._tail
+        min_period = self._config.repetition_min_period
+        # Candidate periods are the distances back to earlier copies of the last few chars
+        needle_len = min(REPETITION_NEEDLE_CHARS, min_period)
+        needle = tail[-needle_len:]
+        lowest = max(0, len(tail) - needle_len - self._config.repetition_max_period)
+        end = len(tail) - min_period
+        while True:
+            found = tail.rfind(needle, lowest, end)
+            if found < 0:
+                return None
+            end = found + needle_len - 1
+            period = len(tail) - needle_len - found
+            span = period * repeats
+            if span > len(tail):
+                return None
+            # Periodic with this period iff it equals itself shifted by one period
+            if tail[-span + period:] != tail[-span:-period]:
+                continue
+            block = tail[-period:]
+            # Runs of a short unit, like "=====" rules, are not loops
+            if not block.strip() or (block + block).find(block, 1) < min_period:
+                continue
+            start = len(tail) - span
+            while start > 0 and tail[start - 1] == tail[start - 1 + period]:
+                start -= 1
+            # First copy boundary after the repetition start that is not sent yet
+            cut = self._base + start + period
+            if cut < self._emitted:
+                cut += -(-(self._emitted - cut) // period) * period
+            return StopMatch("repetition", cut, tail[cut - self._base - period:cut - self._base])
+
+
+class StopDetectors:
+    """
+    Builds stop detectors for persona replies from config.
+
+    Patterns from config apply to every persona, those listed under the
+    persona's name only to it. With speakers set, a line opening with
+    another participant's name as a label also stops the reply. Compiled
+    patterns are kept per persona until the config changes.
+    """
+
+    def __init__(self, config: StopDetectorConfig):
+        self.config = config
+        self._compiled: dict[str, list[tuple[str, re.Pattern]]] = {}
+        self._compiled_for: StopDetectorConfig | None = None
+        self._counters: Counter[str] = Counter()
+
+    def _patterns(self, persona: str) -> list[tuple[str, re.Pattern]]:
+        if self._compiled_for is not self.config:
+            self._compiled = {}
+            self._compiled_for = self.config
+        patterns = self._compiled.get(persona)
+        if patterns is None:
+            config = self.config
+            patterns = [
+                ("pattern", re.compile(source, re.MULTILINE))
+                for source in (*config.patterns, *config.personas.get(persona, []))
+            ]
+            others = [name for name in (*config.speakers, *config.personas) if name and name != persona]
+            if others:
+                patterns.append(("speaker", re.compile(speaker_pattern(list(dict.fromkeys(others))), re.MULTILINE)))
+            self._compiled[persona] = patterns
+        return patterns
+
+    def detector(self, persona: str) -> StopDetector | None:
+        """Detector for one reply of persona, None if detection is off or has nothing to look for."""
+        if not self.config.enabled:
+            return None
+        patterns = self._patterns(persona)
+        if not patterns and not self.config.repetition_repeats:
+            return None
+        return StopDetector(patterns, self.config)
+
+    def record(self, match: StopMatch, discarded_tokens: int, tokens_saved: int) -> None:
+        """Account for a reply cut by a detector."""
+        self._counters["stopped"] += 1
+        self._counters[f"stopped_{match.kind}"] += 1
+        self._counters["tokens_discarded"] += discarded_tokens
+        self._counters["tokens_saved"] += tokens_saved
+
+    def stats(self) -> dict:
+        """Get stop detector metrics snapshot."""
+        return {
+            "enabled": self.config.enabled,
+            **{
+                name: self._counters[name]
+                for name in (
+                    "stopped",
+                    "stopped_pattern",
+                    "stopped_speaker",
+                    "stopped_repetition",
+                    "tokens_discarded",
+                    "tokens_saved",
+                )
+            },
+        }
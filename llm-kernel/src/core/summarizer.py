@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
+
+from src.core.token_counter import count_tokens
+from src.models.config import SummarizationConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, HistoryMessage
+from src.utils.logging import get_logger
+
+
+logger = get_logger("summarizer")
+
+# A span whose summarization failed is not retried sooner than this
+RETRY_AFTER_SEC = 60
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a multi-participant chat. Merge the previous "
+    "summary (if any) and the new messages into one concise summary, written in the "
+    "language of the conversation. Keep participant names, facts, decisions, open "
+    "questions and each participant's stance and tone. Output only the summary."
+)
+
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+# Segment of a dialog history: (role, text)
+Segment = tuple[str, str]
+
+
+def _split_history(
+    messages: list[ChatMessage | HistoryMessage],
+) -> tuple[list[ChatMessage | HistoryMessage], list[Segment], bool]:
+    """
+    Split a request into leading system messages and summarizable segments.
+
+    A history of several messages is cut at message boundaries. A single
+    user message holding a flattened transcript is cut at line boundaries.
+
+    Returns:
+        System messages, segments, and whether segments are lines of one message
+    """
+    start = 0
+    while start < len(messages) and messages[start].role == "system":
+        start += 1
+    system, rest = messages[:start], messages[start:]
+
+    if len(rest) == 1:
+        return system, [(rest[0].role, line) for line in rest[0].content.split("\n")], True
+    return system, [(m.role, m.content) for m in rest], False
+
+
+class DialogSummarizer:
+    """
+    Rolling summarization of long dialog histories.
+
+    When a history exceeds trigger_tokens, its oldest span (everything but
+    the most recent keep_recent_tokens) is summarized in background by a
+    cheap model, merging the previous summary if there is one. Summaries
+    are cached by a hash of the exact segments they cover, so any later
+    request that starts with the same history gets the summary spliced in
+    place of that span. The request that triggers summarization is sent
+    unchanged; it never waits for the summary.
+    """
+
+    def __init__(
+        self,
+        config: SummarizationConfig,
+        complete: Callable[[ChatCompletionRequest], Awaitable[str]],
+    ):
+        self.config = config
+        self._complete = complete
+        self._summaries: OrderedDict[str, str] = OrderedDict()  # Prefix hash -> summary, LRU
+        self._pending: dict[str, asyncio.Task] = {}
+        self._failed_at: dict[str, float] = {}
+        self._counters: Counter[str] = Counter()
+
+    @staticmethod
+    def _prefix_keys(segments: list[Segment]) -> list[str]:
+        """Hash of segments[:i + 1] for every i, computed incrementally."""
+        digest = hashlib.sha256()
+        keys = []
+        for role, text in segments:
+            digest.update(role.encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\0")
+            keys.append(digest.hexdigest())
+        return keys
+
+    def _measure(
+        self, messages: list[ChatMessage | HistoryMessage]
+    ) -> tuple[list[ChatMessage | HistoryMessage], list[Segment], bool, list[int], list[str]] | None:
+        """
+        Split and count a history, and hash its prefixes; None if it is under trigger_tokens.
+
+        Runs in a worker thread: this is linear in the history size.
+        """
+        system, segments, flattened = _split_history(messages)
+        if len(segments) < 2:
+            return None
+        tokens = [count_tokens(text) for _, text in segments]
+        if sum(tokens) <= self.config.trigger_tokens:
+            return None
+        # The current (last) segment is never summarized
+        return system, segments, flattened, tokens, self._prefix_keys(segments[:-1])
+
+    async def apply(self, request: ChatCompletionRequest) -> ChatCompletionRequest:
+        """
+        Replace the longest summarized prefix of the history with its summary.
+
+        Also starts background summarization if the history is still over
+        trigger_tokens after splicing. Returns the request unchanged if
+        there is nothing to splice.
+        """
+        if not self.config.enabled:
+            return request
+        chars = sum(len(m.content) for m in request.messages)
+        if chars > self.config.max_input_chars:
+            return request
+        # A token covers at least one UTF-8 byte, a character at most four bytes
+        if chars * 4 <= self.config.trigger_tokens:
+            return request
+
+        measured = await asyncio.to_thread(self._measure, request.messages)
+        if measured is None:
+            return request
+        system, segments, flattened, tokens, keys = measured
+
+        covered, summary = 0, None
+        for i in range(len(keys) - 1, -1, -1):
+            summary = self._summaries.get(keys[i])
+            if summary is not None:
+                covered = i + 1
+                self._summaries.move_to_end(keys[i])
+                break
+
+        summary_tokens = count_tokens(summary) if summary else 0
+        if summary_tokens + sum(tokens[covered:]) > self.config.trigger_tokens:
+            self._schedule(segments, tokens, keys, covered, summary, flattened)
+
+        if summary is None:
+            return request
+
+        self._counters["spliced"] += 1
+        self._counters["tokens_saved"] += max(0, sum(tokens[:covered]) - summary_tokens)
+
+        # Attachments stay with the message they were sent with
+        if flattened:
+            tail = segments[covered:]
+            last = request.messages[-1]
+            history = [ChatMessage(role=last.role, content="\n".join(text for _, text in tail), parts=last.parts)]
+        else:
+            history = request.messages[len(system) + covered:]
+
+        return request.model_copy(update={
+            "messages": [
+                *system,
+                ChatMessage(role="system", content=SUMMARY_HEADER + summary),
+                *history,
+            ],
+        })
+
+    def _schedule(
+        self,
+        segments: list[Segment],
+        tokens: list[int],
+        keys: list[str],
+        covered: int,
+        summary: str | None,
+        flattened: bool,
+    ) -> None:
+        # Keep the newest segments within keep_recent_tokens, summarize the rest
+        cut = len(segments) - 1
+        kept = tokens[-1]
+        while cut > covered and kept + tokens[cut - 1] <= self.config.keep_recent_tokens:
+            cut -= 1
+            kept += tokens[cut]
+        if cut <= covered:
+            return
+
+        key = keys[cut - 1]
+        if key in self._pending or key in self._summaries:
+            return
+        now = time.monotonic()
+        if key in self._failed_at and now - self._failed_at[key] < RETRY_AFTER_SEC:
+            return
+        self._failed_at = {k: t for k, t in self._failed_at.items() if now - t < RETRY_AFTER_SEC}
+
+        span = segments[covered:cut]
+        if flattened:
+            transcript = "\n".join(text for _, text in span)
+        else:
+            transcript = "\n".join(f"{role}: {text}" for role, text in span)
+
+        task = asyncio.create_task(self._summarize(key, summary, transcript, len(span)))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def _summarize(self, key: str, previous: str | None, transcript: str, span_length: int) -> None:
+        prompt = f"Previous summary:\n{previous}\n\nNew messages:\n{transcript}" if previous else transcript
+        request = ChatCompletionRequest(
+            model=self.config.model,
+            messages=[
+                ChatMessage(role="system", content=SUMMARY_INSTRUCTIONS),
+                ChatMessage(role="user", content=prompt),
+            ],
+            max_tokens=self.config.max_summary_tokens,
+        )
+
+        started = time.monotonic()
+        try:
+            summary = (await self._complete(request)).strip()
+        except Exception as e:
+            self._failed_at[key] = time.monotonic()
+            self._counters["failed"] += 1
+            logger.warning("Summarization of %d segments failed: %s", span_length, e)
+            return
+        if not summary:
+            self._failed_at[key] = time.monotonic()
+            self._counters["failed"] += 1
+            return
+
+        self._summaries[key] = summary
+        while len(self._summaries) > self.config.cache_entries:
+            self._summaries.popitem(last=False)
+        self._counters["generated"] += 1
+        logger.info(
+            "Summarized %d segments into %d chars in %.1fs",
+            span_length, len(summary), time.monotonic() - started,
+        )
+
+    async def close(self) -> None:
+        """Cancel running summarizations."""
+        for task in list(self._pending.values()):
+            task.cancel()
+
+    def stats(self) -> dict:
+        """Get summarizer metrics snapshot."""
+        return {
+            "enabled": self.config.enabled,
+            "cached": len(self._summaries),
+            "pending": len(self._pending),
+            **{name: self._counters[name] for name in ("generated", "failed", "spliced", "tokens_saved")},
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+from src.models.openrouter import ChatCompletionRequest
+from src.utils.logging import get_logger
+
+
+logger = get_logger("token_counter")
+
+ENCODING_NAME = "cl100k_base"
+
+# Texts longer than this are estimated by length: exact BPE on multi-megabyte
+# prompts would block the event loop for seconds
+EXACT_MAX_CHARS = 64 * 1024
+
+# Average characters per token for the fallback estimate
+CHARS_PER_TOKEN = 4
+
+# Prompts with more text than this are counted in a worker thread, so one
+# long history does not stall every other connection
+INLINE_MAX_CHARS = 16 * 1024
+
+# Per-message overhead of chat formatting
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Rough prompt cost of an image or other attachment; providers count them differently
+ATTACHMENT_TOKENS = 1000
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+
+def load_encoding():
+    """
+    Load tiktoken encoding, blocking. Returns None if it is unavailable.
+
+    tiktoken downloads BPE files on first use, so this must not run on the
+    event loop; see preload_encoding.
+    """
+    global _encoding, _encoding_failed
+
+    with _encoding_lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(ENCODING_NAME)
+                logger.info("Loaded tokenizer encoding %s", ENCODING_NAME)
+            except Exception as e:
+                _encoding_failed = True
+                logger.warning("Tokenizer unavailable, using length-based estimates: %s", e)
+        return _encoding
+
+
+async def preload_encoding() -> None:
+    """Load tiktoken encoding in a worker thread."""
+    await asyncio.to_thread(load_encoding)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text.
+
+    Exact when the encoding is loaded and the text is short enough,
+    otherwise estimated from length. Never blocks on loading.
+    """
+    if not text:
+        return 0
+    if _encoding is not None and len(text) <= EXACT_MAX_CHARS:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_prompt_tokens(request: ChatCompletionRequest) -> int:
+    """Estimate prompt tokens of a chat completion request."""
+    tokens = sum(
+        count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+        for message in request.messages
+    )
+    for message in request.messages:
+        for call in message.tool_calls or ():
+            tokens += count_tokens(call.function.name) + count_tokens(call.function.arguments)
+        tokens += ATTACHMENT_TOKENS * len(message.parts or ())
+    # Tool schemas are sent as part of the prompt
+    for tool in request.tools or ():
+        tokens += count_tokens(tool.model_dump_json())
+    return tokens
+
+
+async def estimate_prompt_tokens_async(request: ChatCompletionRequest) -> int:
+    """Like estimate_prompt_tokens, counting long prompts off the event loop."""
+    if sum(len(message.content) for message in request.messages) <= INLINE_MAX_CHARS:
+        return estimate_prompt_tokens(request)
+    return await asyncio.to_thread(estimate_prompt_tokens, request)
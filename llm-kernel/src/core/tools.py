@@ -0,0 +1,245 @@
+import asyncio
+import importlib
+import inspect
+import json
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.models.config import ToolsConfig
+from src.models.openrouter import (
+    ChatMessage,
+    FunctionCall,
+    ToolCall,
+    ToolCallDelta,
+    ToolDefinition,
+    ToolFunction,
+)
+from src.utils.logging import get_logger
+
+
+logger = get_logger("tools")
+
+
+class ToolCallAssembler:
+    """
+    Assembles tool calls from streamed deltas.
+
+    The first delta of a call carries its id and function name, later ones
+    only append argument text; deltas of parallel calls are told apart by
+    index and may interleave.
+    """
+
+    def __init__(self):
+        self._calls: dict[int, dict] = {}
+
+    def add(self, deltas: list[ToolCallDelta]) -> None:
+        for delta in deltas:
+            call = self._calls.setdefault(delta.index, {"id": "", "name": "", "arguments": []})
+            if delta.id:
+                call["id"] = delta.id
+            if delta.function.name:
+                call["name"] = delta.function.name
+            if delta.function.arguments:
+                call["arguments"].append(delta.function.arguments)
+
+    def build(self) -> list[ToolCall]:
+        """Completed calls in index order."""
+        return [
+            ToolCall(
+                id=call["id"] or f"call_{index}",
+                function=FunctionCall(name=call["name"], arguments="".join(call["arguments"])),
+            )
+            for index, call in sorted(self._calls.items())
+        ]
+
+
+@dataclass
+class Tool:
+    """Kernel-side tool: handler is called with the model's arguments as keywords."""
+
+    name: str
+    description: str
+    parameters: dict
+    handler: Callable[..., Any]  # Sync handlers run in a worker thread
+    timeout_sec: float | None = None  # None = ToolsConfig.timeout_sec
+    cacheable: bool = True  # False for tools whose result changes between calls
+
+    def definition(self) -> ToolDefinition:
+        return ToolDefinition(
+            function=ToolFunction(name=self.name, description=self.description, parameters=self.parameters)
+        )
+
+
+@dataclass
+class ToolResult:
+    call: ToolCall
+    content: str  # What the model sees, an error description on failure
+    error: str | None = None
+    cached: bool = False
+    duration_ms: float = 0.0
+
+    def message(self) -> ChatMessage:
+        return ChatMessage(role="tool", tool_call_id=self.call.id, content=self.content)
+
+
+class ToolError(Exception):
+    """Tool call could not produce a result."""
+    pass
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls of an assistant turn.
+
+    Calls of one turn are independent by contract, so they run concurrently,
+    each under its own timeout. Results of cacheable tools are kept for
+    cache_ttl_sec, keyed by tool name and canonical arguments; identical
+    calls that are already running share one execution. Failures are
+    returned to the model as the tool result instead of failing the request.
+    """
+
+    def __init__(self, config: ToolsConfig):
+        self.config = config
+        self._tools: dict[str, Tool] = {}
+        self._cache: OrderedDict[tuple[str, str], tuple[float, str]] = OrderedDict()
+        self._running: dict[tuple[str, str], asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(config.max_concurrent)
+        self._counters: Counter[str] = Counter()
+
+    def reconfigure(self, config: ToolsConfig) -> None:
+        """Apply new settings. Calls already running keep the slots of the old limit."""
+        if config.max_concurrent != self.config.max_concurrent:
+            self._semaphore = asyncio.Semaphore(config.max_concurrent)
+        self.config = config
+
+    def register(self, tool: Tool) -> None:
+        if tool.name in self._tools:
+            logger.warning("Tool %s registered twice, replacing", tool.name)
+        self._tools[tool.name] = tool
+
+    def load_modules(self, modules: list[str]) -> None:
+        """Import modules exposing register_tools(executor) and let them register."""
+        for name in modules:
+            try:
+                importlib.import_module(name).register_tools(self)
+            except Exception as e:
+                logger.error("Failed to load tool module %s: %s", name, e)
+
+    def definitions(self, names: list[str]) -> list[ToolDefinition]:
+        """
+        Definitions of the named tools to offer the model.
+
+        Raises:
+            ToolError: If tools are disabled or a name is not registered
+        """
+        if not self.config.enabled:
+            raise ToolError("Tool calling is disabled")
+        unknown = [name for name in names if name not in self._tools]
+        if unknown:
+            raise ToolError(f"Unknown tools: {', '.join(unknown)}")
+        return [self._tools[name].definition() for name in names]
+
+    async def execute(self, calls: list[ToolCall]) -> list[ToolResult]:
+        """Run calls concurrently, results in call order."""
+        self._counters["rounds"] += 1
+        return list(await asyncio.gather(*(self._execute_one(call) for call in calls)))
+
+    async def _execute_one(self, call: ToolCall) -> ToolResult:
+        started = time.monotonic()
+        self._counters["calls"] += 1
+        cached = False
+        try:
+            tool = self._tools.get(call.function.name)
+            if tool is None:
+                raise ToolError(f"Unknown tool '{call.function.name}'")
+            try:
+                arguments = json.loads(call.function.arguments or "{}")
+            except json.JSONDecodeError as e:
+                raise ToolError(f"Arguments are not valid JSON: {e}") from e
+            if not isinstance(arguments, dict):
+                raise ToolError("Arguments must be a JSON object")
+
+            key = (tool.name, json.dumps(arguments, sort_keys=True, ensure_ascii=False))
+            content = self._cached(key) if tool.cacheable else None
+            if content is not None:
+                cached = True
+                self._counters["cache_hits"] += 1
+            else:
+                task = self._running.get(key) if tool.cacheable else None
+                if task is None:
+                    task = asyncio.create_task(self._invoke(tool, arguments))
+                    if tool.cacheable:
+                        self._running[key] = task
+                        task.add_done_callback(lambda _: self._running.pop(key, None))
+                else:
+                    self._counters["shared"] += 1
+                # A cancelled request must not cancel a call other requests share
+                content = await asyncio.shield(task)
+                if tool.cacheable and self.config.cache_ttl_sec:
+                    self._store(key, content)
+
+        except ToolError as e:
+            self._counters["failed"] += 1
+            logger.warning("Tool call %s (%s) failed: %s", call.id, call.function.name, e)
+            return ToolResult(
+                call=call,
+                content=f"Error: {e}",
+                error=str(e),
+                duration_ms=(time.monotonic() - started) * 1000,
+            )
+
+        return ToolResult(
+            call=call,
+            content=content,
+            cached=cached,
+            duration_ms=(time.monotonic() - started) * 1000,
+        )
+
+    async def _invoke(self, tool: Tool, arguments: dict) -> str:
+        timeout = tool.timeout_sec or self.config.timeout_sec
+        async with self._semaphore:
+            try:
+                if inspect.iscoroutinefunction(tool.handler):
+                    result = await asyncio.wait_for(tool.handler(**arguments), timeout)
+                else:
+                    # The thread keeps running after a timeout, only the wait is abandoned
+                    result = await asyncio.wait_for(asyncio.to_thread(tool.handler, **arguments), timeout)
+            except asyncio.TimeoutError as e:
+                raise ToolError(f"Timed out after {timeout}s") from e
+            except ToolError:
+                raise
+            except Exception as e:
+                raise ToolError(f"{type(e).__name__}: {e}") from e
+        if isinstance(result, str):
+            return result
+        return json.dumps(result, ensure_ascii=False, default=str)
+
+    def _cached(self, key: tuple[str, str]) -> str | None:
+        item = self._cache.get(key)
+        if item is None:
+            return None
+        expires_at, content = item
+        if time.monotonic() >= expires_at:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return content
+
+    def _store(self, key: tuple[str, str], content: str) -> None:
+        self._cache[key] = (time.monotonic() + self.config.cache_ttl_sec, content)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.config.cache_entries:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Get tool executor metrics snapshot."""
+        return {
+            "enabled": self.config.enabled,
+            "tools": sorted(self._tools),
+            "running": len(self._running),
+            "cached_results": len(self._cache),
+            **{name: self._counters[name] for name in ("calls", "cache_hits", "shared", "failed", "rounds")},
+        }
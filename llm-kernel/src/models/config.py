@@ -1,4 +1,7 @@
-from pydantic import BaseModel, Field
+import re
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator
 
 
 class ServerConfig(BaseModel):
@@ -6,6 +9,9 @@ class ServerConfig(BaseModel):
     port: int = Field(default=8765, ge=1, le=65535)
     ws_path: str = "/ws"
     api_prefix: str = "/api"
+    config_watch_interval_sec: float = Field(default=2, ge=0)  # 0 disables hot reload
+    workers: int = Field(default=1, ge=1)  # Worker processes sharing the port
+    drain_timeout_sec: float = Field(default=120, ge=0)  # Time running requests get to finish on shutdown
 
 
 class WebSocketConfig(BaseModel):
@@ -20,17 +26,161 @@ class WebSocketConfig(BaseModel):
 
 class OpenRouterConfig(BaseModel):
     base_url: str = "https://openrouter.ai/api/v1"
-    timeout_sec: int = Field(default=600, ge=30)
+    timeout_sec: int = Field(default=600, ge=30)  # Total deadline per request
+    connect_timeout_sec: float = Field(default=10, gt=0)
+    first_token_timeout_sec: float = Field(default=120, gt=0)
+    idle_timeout_sec: float = Field(default=60, gt=0)
     max_retries: int = Field(default=3, ge=0, le=10)
+    stream_body_threshold_kb: int = Field(default=1024, ge=1)
+    stream_upstream: bool = True  # Non-stream client requests are streamed upstream and assembled in the kernel
+    http2: bool = False
+    max_connections: int = Field(default=50, ge=1)
+    max_keepalive_connections: int = Field(default=20, ge=0)
+    keepalive_expiry_sec: float = Field(default=30, ge=0)
+    prewarm_connections: int = Field(default=2, ge=0)
+
+
+class SchedulerConfig(BaseModel):
+    max_concurrent: int = Field(default=32, ge=1)
+    max_background_concurrent: int = Field(default=8, ge=1)
+    max_per_client: int = Field(default=8, ge=1)
+    max_per_model: int = Field(default=16, ge=1)
+    max_queue_depth: int = Field(default=256, ge=0)
+    max_queue_time_sec: float = Field(default=30, gt=0)
+
+
+class RateLimitConfig(BaseModel):
+    enabled: bool = True
+    requests_per_sec: float = Field(default=10, gt=0)
+    request_burst: int = Field(default=20, ge=1)
+    tokens_per_min: int = Field(default=1_000_000, ge=1)
+    max_wait_sec: float = Field(default=10, ge=0)
+
+
+class StorageConfig(BaseModel):
+    data_dir: str = "data"  # Relative to project root
+    shared_state_file: str = "shared_state.sqlite3"  # Used with server.workers > 1
+
+
+class BlobStoreConfig(BaseModel):
+    dir: str = "blobs"  # Attachment store, relative to storage.data_dir
+    max_total_mb: int = Field(default=1024, ge=1)  # Least recently used blobs are evicted over this
+    max_blob_mb: int = Field(default=20, ge=1)
+
+
+class CatalogConfig(BaseModel):
+    ttl_sec: int = Field(default=3600, ge=60)
+    cache_file: str = "models_cache.json"  # Inside storage.data_dir
+
+
+class SimilarityCacheConfig(BaseModel):
+    enabled: bool = False
+    models: list[str] = Field(default_factory=list)  # Models that opt in
+    personas: list[str] = Field(default_factory=list)  # Personas that opt in
+    threshold: float = Field(default=0.9, gt=0, le=1)  # Minimum Jaccard similarity of the user turn
+    max_entries: int = Field(default=1000, ge=1)
+    ttl_sec: int = Field(default=86400, ge=1)
+    max_prompt_chars: int = Field(default=8000, ge=1)  # Longer prompts are not cached
+    min_similarity_chars: int = Field(default=32, ge=1)  # Shorter prompts match exactly only
+
+
+class SummarizationConfig(BaseModel):
+    enabled: bool = False
+    model: str = "openai/gpt-4o-mini"  # Cheap model that writes summaries
+    trigger_tokens: int = Field(default=24_000, ge=1000)  # History size that starts summarization
+    keep_recent_tokens: int = Field(default=8000, ge=0)  # Newest history kept verbatim
+    max_summary_tokens: int = Field(default=1024, ge=64)
+    max_input_chars: int = Field(default=2_000_000, ge=1)  # Larger requests are left alone
+    cache_entries: int = Field(default=256, ge=1)
+
+
+class ToolsConfig(BaseModel):
+    enabled: bool = True
+    modules: list[str] = Field(default_factory=list)  # Extra modules exposing register_tools(executor)
+    max_rounds: int = Field(default=5, ge=1)  # Tool steps per request before the answer is returned as is
+    timeout_sec: float = Field(default=10.0, gt=0)  # Per call, unless the tool sets its own
+    max_concurrent: int = Field(default=16, ge=1)
+    cache_ttl_sec: int = Field(default=300, ge=0)  # 0 = no result caching
+    cache_entries: int = Field(default=1024, ge=1)
+
+
+class SpeculationConfig(BaseModel):
+    enabled: bool = False
+    ttl_sec: int = Field(default=120, ge=1)  # Unclaimed speculations are dropped after this
+    max_active: int = Field(default=8, ge=1)
+    wasted_tokens_per_hour: int = Field(default=200_000, ge=0)  # Budget of unused speculations
+
+
+class StopDetectorConfig(BaseModel):
+    enabled: bool = False
+    patterns: list[str] = Field(default_factory=list)  # Regexes for every persona, "^" matches at line starts
+    personas: dict[str, list[str]] = Field(default_factory=dict)  # Persona name -> extra regexes
+    speakers: list[str] = Field(default_factory=list)  # Participants; another's "Name:" label stops a reply
+    repetition_repeats: int = Field(default=3, ge=0)  # Copies of a block in a row that stop a reply, 0 = off
+    repetition_min_period: int = Field(default=20, ge=1)  # Shortest repeated block, chars
+    repetition_max_period: int = Field(default=200, ge=1)
+    lookback_chars: int = Field(default=256, ge=1)  # How far before a new chunk a match may start
+    # Streamed text held back so matches are cut before sending; at least repetition_max_period if repetition is on
+    holdback_chars: int = Field(default=48, ge=0)
+
+    @field_validator("patterns")
+    @classmethod
+    def _check_patterns(cls, patterns: list[str]) -> list[str]:
+        for pattern in patterns:
+            re.compile(pattern)
+        return patterns
+
+    @field_validator("personas")
+    @classmethod
+    def _check_persona_patterns(cls, personas: dict[str, list[str]]) -> dict[str, list[str]]:
+        for patterns in personas.values():
+            cls._check_patterns(patterns)
+        return personas
+
+
+class JournalConfig(BaseModel):
+    enabled: bool = True
+    file: str = "journal.sqlite3"  # Inside storage.data_dir
+    batch_size: int = Field(default=500, ge=1)
+    flush_interval_ms: float = Field(default=500, ge=0)
+    max_pending: int = Field(default=10_000, ge=1)
+    retention_days: int = Field(default=90, ge=0)  # 0 keeps entries forever
+
+
+class LoggingConfig(BaseModel):
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    format: Literal["text", "json"] = "text"
+    debug_sample_rate: float = Field(default=0.01, ge=0, le=1)  # Per-chunk debug events
+
+
+class DiagnosticsConfig(BaseModel):
+    loop_lag_interval_ms: float = Field(default=100, gt=0)
+    slow_callback_ms: float = Field(default=100, ge=0)  # 0 disables slow-callback warnings
+    profiler_interval_ms: float = Field(default=10, ge=1)
+    max_profile_sec: float = Field(default=300, gt=0)
 
 
 class DefaultsConfig(BaseModel):
     model: str = "anthropic/claude-3.5-sonnet"
     max_tokens: int = Field(default=4096, ge=1)
+    speaker_labels: bool = True  # Prefix "Name: " to named user history messages, i.e. other participants' turns
 
 
 class AppConfig(BaseModel):
     server: ServerConfig = Field(default_factory=ServerConfig)
     websocket: WebSocketConfig = Field(default_factory=WebSocketConfig)
     openrouter: OpenRouterConfig = Field(default_factory=OpenRouterConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
+    rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    storage: StorageConfig = Field(default_factory=StorageConfig)
+    blobs: BlobStoreConfig = Field(default_factory=BlobStoreConfig)
+    catalog: CatalogConfig = Field(default_factory=CatalogConfig)
+    cache: SimilarityCacheConfig = Field(default_factory=SimilarityCacheConfig)
+    summarization: SummarizationConfig = Field(default_factory=SummarizationConfig)
+    tools: ToolsConfig = Field(default_factory=ToolsConfig)
+    speculation: SpeculationConfig = Field(default_factory=SpeculationConfig)
+    stop_detectors: StopDetectorConfig = Field(default_factory=StopDetectorConfig)
+    journal: JournalConfig = Field(default_factory=JournalConfig)
+    logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    diagnostics: DiagnosticsConfig = Field(default_factory=DiagnosticsConfig)
     defaults: DefaultsConfig = Field(default_factory=DefaultsConfig)
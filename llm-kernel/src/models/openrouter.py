@@ -1,24 +1,92 @@
-from typing import Literal
-from pydantic import BaseModel, Field
+from dataclasses import dataclass
+from typing import ClassVar, Literal
+from pydantic import BaseModel, Field, SkipValidation, field_validator
+
+
+class FunctionCall(BaseModel):
+    """Function name and JSON-encoded arguments chosen by the model."""
+
+    name: str
+    arguments: str = ""
+
+
+class ToolCall(BaseModel):
+    """Tool call in an assistant message."""
+
+    id: str
+    type: Literal["function"] = "function"
+    function: FunctionCall
+
+
+class ContentPart(BaseModel):
+    """Non-text part of a message, held in the blob store until the request is sent."""
+
+    hash: str
+    mime_type: str
+    filename: str = ""
 
 
 class ChatMessage(BaseModel):
     """Single message in chat completion request."""
 
+    role: Literal["system", "user", "assistant", "tool"]
+    content: str
+    tool_calls: list[ToolCall] | None = None  # Assistant messages only
+    tool_call_id: str | None = None  # Tool messages only
+    # Follow the text; inlined by iter_request_body, so never part of model_dump
+    parts: list[ContentPart] | None = Field(default=None, exclude=True)
+
+    @field_validator("content", mode="before")
+    @classmethod
+    def _null_content(cls, value: str | None) -> str:
+        # Assistant messages carrying only tool calls come back with null content
+        return "" if value is None else value
+
+
+@dataclass(slots=True)
+class HistoryMessage:
+    """
+    Dialog history message: role and text only.
+
+    A plain object rather than a ChatMessage, as a long history would
+    otherwise pay for thousands of model copies. Reads like a ChatMessage
+    without tool calls or parts.
+    """
+
     role: Literal["system", "user", "assistant"]
     content: str
+    tool_calls: ClassVar[None] = None
+    tool_call_id: ClassVar[None] = None
+    parts: ClassVar[None] = None
+
+
+class ToolFunction(BaseModel):
+    """Function offered to the model."""
+
+    name: str
+    description: str = ""
+    parameters: dict = Field(default_factory=lambda: {"type": "object", "properties": {}})
+
+
+class ToolDefinition(BaseModel):
+    """Tool entry of a chat completion request."""
+
+    type: Literal["function"] = "function"
+    function: ToolFunction
 
 
 class ChatCompletionRequest(BaseModel):
     """Request to OpenRouter /chat/completions endpoint."""
 
     model: str
-    messages: list[ChatMessage]
+    # Built by the kernel from validated parts, so items are kept as given
+    messages: SkipValidation[list[ChatMessage | HistoryMessage]]
     stream: bool = False
     max_tokens: int | None = None
     temperature: float | None = None
     top_p: float | None = None
     stop: list[str] | None = None
+    tools: list[ToolDefinition] | None = None
 
 
 class ChatCompletionUsage(BaseModel):
@@ -49,11 +117,28 @@ class ChatCompletionResponse(BaseModel):
     usage: ChatCompletionUsage | None = None
 
 
+class FunctionCallDelta(BaseModel):
+    """Piece of a streamed function call."""
+
+    name: str | None = None
+    arguments: str | None = None
+
+
+class ToolCallDelta(BaseModel):
+    """Piece of a streamed tool call; pieces of one call share the index."""
+
+    index: int = 0
+    id: str | None = None
+    type: str | None = None
+    function: FunctionCallDelta = Field(default_factory=FunctionCallDelta)
+
+
 class StreamDelta(BaseModel):
     """Delta content in streaming response."""
 
     role: str | None = None
     content: str | None = None
+    tool_calls: list[ToolCallDelta] | None = None
 
 
 class StreamChoice(BaseModel):
@@ -1,4 +1,79 @@
-from pydantic import BaseModel, Field
+import base64
+import binascii
+import re
+import sys
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class Attachment(BaseModel):
+    """Image, audio or document sent along with the user prompt."""
+
+    mime_type: str = Field(..., min_length=1, description="e.g. image/png, audio/wav, application/pdf")
+    hash: str = Field(default="", description="SHA-256 hex of the data; enough once the kernel has stored it")
+    data: bytes = Field(default=b"", description="Raw data (base64 in JSON), needed only the first time")
+    filename: str = ""
+
+    @field_validator("data", mode="before")
+    @classmethod
+    def _decode_base64(cls, value: str | bytes) -> bytes:
+        # JSON carries data as base64, protobuf as raw bytes
+        if isinstance(value, str):
+            try:
+                return base64.b64decode(value, validate=True)
+            except binascii.Error as e:
+                raise ValueError(f"data is not valid base64: {e}") from e
+        return value
+
+    @field_validator("hash")
+    @classmethod
+    def _check_hash(cls, value: str) -> str:
+        value = value.lower()
+        if value and not re.fullmatch(r"[0-9a-f]{64}", value):
+            raise ValueError("hash must be a SHA-256 hex digest")
+        return value
+
+    @model_validator(mode="after")
+    def _data_or_hash(self) -> "Attachment":
+        if not self.data and not self.hash:
+            raise ValueError("attachment needs data or hash")
+        return self
+
+
+class Message(BaseModel):
+    """Earlier dialog message, sent upstream as a message of its own."""
+
+    role: Literal["system", "user", "assistant"]
+    name: str = Field(default="", description="Speaker name, for multi-speaker dialogs")
+    content: str
+
+    @field_validator("name")
+    @classmethod
+    def _intern_name(cls, value: str) -> str:
+        # A long history repeats a few names thousands of times
+        return sys.intern(value)
+
+
+class NextRequestHint(BaseModel):
+    """Client's prediction of its next request, for speculative generation."""
+
+    model: str = Field(..., min_length=1)
+    persona: str = ""
+    system_prompt: str = ""
+    user_prompt: str = Field(
+        default="", description="Predicted prompt; '{{reply}}' is replaced with the current reply"
+    )
+    messages: list[Message] = Field(
+        default_factory=list,
+        description="Predicted history, e.g. the current one plus the reply; '{{reply}}' is replaced in contents",
+    )
+
+    @model_validator(mode="after")
+    def _prompt_or_messages(self) -> "NextRequestHint":
+        if not self.user_prompt and not self.messages:
+            raise ValueError("next request needs user_prompt or messages")
+        return self
 
 
 class LLMRequest(BaseModel):
@@ -7,5 +82,28 @@ class LLMRequest(BaseModel):
     request_id: str = Field(..., min_length=1, description="Unique request identifier (UUID)")
     model: str = Field(..., min_length=1, description="Model name (e.g., 'anthropic/claude-3.5-sonnet')")
     system_prompt: str = Field(default="", description="System prompt for the model")
-    user_prompt: str = Field(..., min_length=1, description="User prompt for the model")
+    user_prompt: str = Field(default="", description="User prompt for the model, after messages")
+    messages: list[Message] = Field(
+        default_factory=list, description="Dialog history between the system prompt and the user prompt"
+    )
     stream: bool = Field(default=True, description="Whether to stream the response")
+    priority: Literal["interactive", "background"] = Field(
+        default="interactive", description="Scheduling class: interactive chat or background batch work"
+    )
+    deadline_ms: int = Field(
+        default=0, ge=0, description="Time budget from receipt in milliseconds, 0 = server default"
+    )
+    persona: str = Field(default="", description="Client-side persona name, used for usage accounting")
+    tools: list[str] = Field(default_factory=list, description="Names of kernel tools the model may call")
+    next_request: NextRequestHint | None = Field(
+        default=None, description="Predicted next request, generated ahead if speculation is enabled"
+    )
+    attachments: list[Attachment] = Field(
+        default_factory=list, description="Non-text inputs that follow the user prompt"
+    )
+
+    @model_validator(mode="after")
+    def _prompt_or_messages(self) -> "LLMRequest":
+        if not self.user_prompt and not self.messages:
+            raise ValueError("request needs user_prompt or messages")
+        return self
@@ -48,7 +48,39 @@ class LLMCompleteResponse(BaseModel):
     content: str | None = None  # Full content for non-stream, None for stream done
     finish_reason: str | None = None
     usage: TokenUsage = Field(default_factory=TokenUsage)
+    tokens_saved: int = 0  # Upper bound of tokens not generated because a stop detector cut the reply
+
+
+class ToolCallInfo(BaseModel):
+    """Tool call executed by the kernel."""
+
+    id: str
+    name: str
+    arguments: str
+    result: str
+    error: str | None = None
+    cached: bool = False
+    duration_ms: int = 0
+
+
+class ToolCallsResponse(BaseModel):
+    """Tool step of a request; generation continues after it."""
+
+    type: Literal["tool_calls"] = "tool_calls"
+    request_id: str
+    calls: list[ToolCallInfo]
+
+
+class ControlResponse(BaseModel):
+    """Server notice not tied to a request."""
+
+    type: Literal["control"] = "control"
+    event: Literal["draining"]  # New requests are rejected, reconnect to send them
+    message: str = ""
+    deadline_ms: int = 0  # Time running requests have left to finish
 
 
 # Type alias for all possible response types
-WebSocketResponse = AckResponse | ErrorResponse | StreamChunkResponse | LLMCompleteResponse
+WebSocketResponse = (
+    AckResponse | ErrorResponse | StreamChunkResponse | LLMCompleteResponse | ToolCallsResponse | ControlResponse
+)
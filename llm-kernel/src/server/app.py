@@ -1,23 +1,86 @@
+import asyncio
+import logging
+import math
+import os
+import signal
+import threading
+import time
+import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from src.core.blob_store import BlobStore
+from src.core.builtin_tools import register_tools as register_builtin_tools
+from src.core.catalog import ModelCatalog
+from src.core.diagnostics import LoopLagMonitor, SamplingProfiler
+from src.core.drain import DrainController
+from src.core.journal import JournalEntry, RequestJournal
 from src.core.openrouter import OpenRouterClient
-from src.models.config import AppConfig
-from src.utils.config import get_api_key, get_config
-from src.utils.logging import get_logger, setup_logging
+from src.core.rate_limiter import RateLimiter
+from src.core.scheduler import Priority, RequestScheduler
+from src.core.shared_state import SharedStore
+from src.core.similarity_cache import SimilarityCache
+from src.core.speculation import SpeculativeGenerator
+from src.core.stop_detector import StopDetectors
+from src.core.summarizer import DialogSummarizer
+from src.core.token_counter import estimate_prompt_tokens_async, preload_encoding
+from src.core.tools import ToolExecutor
+from src.models.config import AppConfig, SchedulerConfig
+from src.models.openrouter import ChatCompletionRequest, StreamChunk
+from src.server.protocol import load_protobuf
+from src.utils.config import get_api_key, get_config, get_data_dir, watch_config_files
+from src.utils import startup
+from src.utils.logging import get_logger, set_log_level, setup_logging, shutdown_logging
 
 
 logger = get_logger("app")
 
+# Worker processes publish their stats this often in multi-worker mode
+WORKER_STATS_INTERVAL_SEC = 2
+WORKER_STATS_NAMESPACE = "worker_stats"
+
+# Pause between startup and background warm-up
+WARMUP_DELAY_SEC = 0.05
+
 
 # Global state
 _openrouter_client: OpenRouterClient | None = None
+_scheduler: RequestScheduler | None = None
+_rate_limiter: RateLimiter | None = None
+_model_catalog: ModelCatalog | None = None
+_request_journal: RequestJournal | None = None
+_response_cache: SimilarityCache | None = None
+_summarizer: DialogSummarizer | None = None
+_tool_executor: ToolExecutor | None = None
+_speculator: SpeculativeGenerator | None = None
+_stop_detectors: StopDetectors | None = None
+_drain: DrainController | None = None
+_blob_store: BlobStore | None = None
+_loop_monitor: LoopLagMonitor | None = None
+_profiler: SamplingProfiler | None = None
+_shared_store: SharedStore | None = None
+_workers = 1  # Worker processes this server was started with
 _app_config: AppConfig | None = None
 
+# Strong references to fire-and-forget tasks
+_background_tasks: set[asyncio.Task] = set()
+
+# Set between lifespan startup and shutdown
+_ready = False
+
+# Set once a stop signal has been received
+_stop_requested = False
+
+
+def is_ready() -> bool:
+    """Whether the server has started and is neither draining nor shutting down."""
+    return _ready and not (_drain is not None and _drain.draining)
+
 
 def get_openrouter_client() -> OpenRouterClient:
     """Get OpenRouter client instance."""
@@ -26,6 +89,102 @@ def get_openrouter_client() -> OpenRouterClient:
     return _openrouter_client
 
 
+def get_scheduler() -> RequestScheduler:
+    """Get request scheduler instance."""
+    if _scheduler is None:
+        raise RuntimeError("Request scheduler not initialized")
+    return _scheduler
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get rate limiter instance."""
+    if _rate_limiter is None:
+        raise RuntimeError("Rate limiter not initialized")
+    return _rate_limiter
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Get model catalog instance."""
+    if _model_catalog is None:
+        raise RuntimeError("Model catalog not initialized")
+    return _model_catalog
+
+
+def get_request_journal() -> RequestJournal:
+    """Get request journal instance."""
+    if _request_journal is None:
+        raise RuntimeError("Request journal not initialized")
+    return _request_journal
+
+
+def get_response_cache() -> SimilarityCache:
+    """Get similarity response cache instance."""
+    if _response_cache is None:
+        raise RuntimeError("Response cache not initialized")
+    return _response_cache
+
+
+def get_summarizer() -> DialogSummarizer:
+    """Get dialog summarizer instance."""
+    if _summarizer is None:
+        raise RuntimeError("Summarizer not initialized")
+    return _summarizer
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Get tool executor instance."""
+    if _tool_executor is None:
+        raise RuntimeError("Tool executor not initialized")
+    return _tool_executor
+
+
+def get_speculator() -> SpeculativeGenerator:
+    """Get speculative generator instance."""
+    if _speculator is None:
+        raise RuntimeError("Speculative generator not initialized")
+    return _speculator
+
+
+def get_stop_detectors() -> StopDetectors:
+    """Get stop detectors instance."""
+    if _stop_detectors is None:
+        raise RuntimeError("Stop detectors not initialized")
+    return _stop_detectors
+
+
+def get_drain_controller() -> DrainController:
+    """Get drain controller instance."""
+    if _drain is None:
+        raise RuntimeError("Drain controller not initialized")
+    return _drain
+
+
+def get_blob_store() -> BlobStore:
+    """Get attachment blob store instance."""
+    if _blob_store is None:
+        raise RuntimeError("Blob store not initialized")
+    return _blob_store
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Get event loop lag monitor instance."""
+    if _loop_monitor is None:
+        raise RuntimeError("Loop monitor not initialized")
+    return _loop_monitor
+
+
+def get_profiler() -> SamplingProfiler:
+    """Get sampling profiler instance."""
+    if _profiler is None:
+        raise RuntimeError("Profiler not initialized")
+    return _profiler
+
+
+def get_shared_store() -> SharedStore | None:
+    """Get store shared between worker processes, None in single-process mode."""
+    return _shared_store
+
+
 def get_app_config() -> AppConfig:
     """Get application config."""
     if _app_config is None:
@@ -33,57 +192,466 @@ def get_app_config() -> AppConfig:
     return _app_config
 
 
+def _spawn(coro) -> asyncio.Task:
+    """Run coroutine in background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _worker_share(config: SchedulerConfig, workers: int) -> SchedulerConfig:
+    """
+    Split kernel-wide scheduler limits evenly between worker processes.
+
+    The per-client limit is kept: a WebSocket connection stays on the
+    worker that accepted it, so a client's requests land on one worker.
+    """
+    if workers == 1:
+        return config
+
+    def share(limit: int) -> int:
+        return max(1, math.ceil(limit / workers))
+
+    return config.model_copy(update={
+        "max_concurrent": share(config.max_concurrent),
+        "max_background_concurrent": share(config.max_background_concurrent),
+        "max_per_model": share(config.max_per_model),
+        "max_queue_depth": math.ceil(config.max_queue_depth / workers),
+    })
+
+
+async def runtime_stats() -> dict:
+    """Get runtime statistics of this process. Shared rate limit buckets are read in a worker thread."""
+    return {
+        "worker_pid": os.getpid(),
+        "scheduler": get_scheduler().stats(),
+        "rate_limit": await get_rate_limiter().stats_async(),
+        "openrouter_pool": get_openrouter_client().pool_stats(),
+        "event_loop": get_loop_monitor().stats(),
+        "journal": get_request_journal().stats(),
+        "cache": get_response_cache().stats(),
+        "summarizer": get_summarizer().stats(),
+        "tools": get_tool_executor().stats(),
+        "speculation": get_speculator().stats(),
+        "stop_detectors": get_stop_detectors().stats(),
+        "drain": get_drain_controller().stats(),
+        "blobs": get_blob_store().stats(),
+    }
+
+
+async def complete_in_background(request: ChatCompletionRequest, client_id: str) -> str:
+    """
+    Run a kernel-initiated completion as background work.
+
+    Goes through the same rate budget and scheduler as client requests, in
+    the background class so it never delays interactive chat, and is
+    journaled under client_id for cost accounting.
+
+    Raises:
+        AdmissionRejected: If rate or queue limits reject it
+        OpenRouterError: On upstream failure
+    """
+    client = get_openrouter_client()
+    rate_limiter = get_rate_limiter()
+    entry = JournalEntry(
+        ts=time.time(),
+        request_id=f"kernel-{uuid.uuid4()}",
+        client_id=client_id,
+        persona="",
+        model=request.model,
+        priority=Priority.BACKGROUND.value,
+        stream=False,
+    )
+    started = time.monotonic()
+    reservation = None
+    usage = None
+    try:
+        reservation = await rate_limiter.acquire(
+            client.api_key, request.model, await estimate_prompt_tokens_async(request)
+        )
+        async with get_scheduler().slot(client_id, request.model, Priority.BACKGROUND):
+            entry.queue_ms = (time.monotonic() - started) * 1000
+            response = await client.chat_completion(request)
+    except asyncio.CancelledError:
+        entry.outcome = "CANCELLED"
+        raise
+    except Exception as e:
+        entry.outcome = getattr(e, "code", "OPENROUTER_ERROR")
+        raise
+    else:
+        usage = response.usage
+        if usage:
+            entry.prompt_tokens = usage.prompt_tokens
+            entry.completion_tokens = usage.completion_tokens
+        choice = response.choices[0] if response.choices else None
+        entry.finish_reason = choice.finish_reason if choice else None
+        return choice.message.content if choice and choice.message else ""
+    finally:
+        if reservation is not None:
+            rate_limiter.reconcile(reservation, usage.total_tokens if usage else 0)
+        entry.total_ms = (time.monotonic() - started) * 1000
+        entry.cost = get_model_catalog().cost(entry.model, entry.prompt_tokens, entry.completion_tokens)
+        get_request_journal().record(entry)
+
+
+async def stream_in_background(request: ChatCompletionRequest, entry: JournalEntry) -> AsyncIterator[StreamChunk]:
+    """
+    Stream a kernel-initiated completion as background work.
+
+    Same budgets and accounting as complete_in_background, with the journal
+    entry supplied by the caller. entry.queue_ms is set once the request is
+    admitted upstream. If the stream is cancelled, token counts already in
+    the entry (e.g. estimates) are what gets journaled.
+
+    Raises:
+        AdmissionRejected: If rate or queue limits reject it
+        OpenRouterError: On upstream failure
+    """
+    client = get_openrouter_client()
+    rate_limiter = get_rate_limiter()
+    started = time.monotonic()
+    reservation = None
+    try:
+        reservation = await rate_limiter.acquire(
+            client.api_key, request.model, await estimate_prompt_tokens_async(request)
+        )
+        async with get_scheduler().slot(entry.client_id, request.model, Priority.BACKGROUND):
+            entry.queue_ms = (time.monotonic() - started) * 1000
+            async for chunk in client.chat_completion_stream(request):
+                for choice in chunk.choices:
+                    if choice.finish_reason:
+                        entry.finish_reason = choice.finish_reason
+                if chunk.usage:
+                    entry.prompt_tokens = chunk.usage.prompt_tokens
+                    entry.completion_tokens = chunk.usage.completion_tokens
+                yield chunk
+    except asyncio.CancelledError:
+        entry.outcome = "CANCELLED"
+        raise
+    except Exception as e:
+        entry.outcome = getattr(e, "code", "OPENROUTER_ERROR")
+        raise
+    finally:
+        if reservation is not None:
+            rate_limiter.reconcile(reservation, entry.prompt_tokens + entry.completion_tokens)
+        entry.total_ms = (time.monotonic() - started) * 1000
+        entry.cost = get_model_catalog().cost(entry.model, entry.prompt_tokens, entry.completion_tokens)
+        get_request_journal().record(entry)
+
+
+async def drain(reason: str) -> bool:
+    """
+    Stop taking new requests and give running ones up to server.drain_timeout_sec.
+
+    Returns:
+        True if all running requests finished
+    """
+    return await get_drain_controller().drain(get_app_config().server.drain_timeout_sec, reason)
+
+
+async def _drain_then_stop(server_handler, signum: int) -> None:
+    name = signal.Signals(signum).name
+    logger.warning("Received %s, draining; send it again to stop now", name)
+    await drain(name)
+    server_handler(signum, None)
+
+
+def _drain_on_stop_signals() -> None:
+    """
+    Drain before the server handles a stop signal.
+
+    uvicorn closes every WebSocket as the first step of its shutdown,
+    cutting running generations off. The first stop signal now drains and
+    then hands the signal on to uvicorn; another one is handed on at once.
+    """
+    # Handlers can only be set from the main thread, which e.g. TestClient does not use
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+
+    def drain_first(server_handler):
+        def handle(signum, frame) -> None:
+            global _stop_requested
+            if _stop_requested:
+                server_handler(signum, frame)
+                return
+            _stop_requested = True
+            loop.call_soon_threadsafe(_spawn, _drain_then_stop(server_handler, signum))
+        return handle
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        server_handler = signal.getsignal(sig) if sig is not None else None
+        if callable(server_handler):
+            signal.signal(sig, drain_first(server_handler))
+
+
+async def _warm_up_catalog(catalog: ModelCatalog) -> None:
+    """Load the persisted catalog, then refresh it if it is stale."""
+    await catalog.load_from_disk()
+    if catalog.is_stale():
+        await catalog.get()
+
+
+async def _warm_up_admin_routes(app: FastAPI) -> None:
+    mount_admin_routes(app)
+
+
+async def _warm_up(app: FastAPI) -> None:
+    """Load everything startup skipped, concurrently."""
+    # uvicorn binds its socket once the lifespan startup returns; let it do
+    # so before warm-up threads compete with it for the GIL
+    await asyncio.sleep(WARMUP_DELAY_SEC)
+    await asyncio.gather(
+        startup.warmup("tokenizer", preload_encoding()),
+        startup.warmup("protobuf", asyncio.to_thread(load_protobuf)),
+        startup.warmup("connections", get_openrouter_client().prewarm()),
+        startup.warmup("catalog", _warm_up_catalog(get_model_catalog())),
+        startup.warmup("admin routes", _warm_up_admin_routes(app)),
+    )
+    logger.info("Warm-up finished %.0f ms after start", startup.elapsed_ms())
+
+
+async def _publish_worker_stats(store: SharedStore) -> None:
+    """Periodically share this worker's stats so any worker can report all of them."""
+    while True:
+        try:
+            stats = await runtime_stats()
+            await asyncio.to_thread(store.put, WORKER_STATS_NAMESPACE, str(os.getpid()), stats)
+        except Exception as e:
+            logger.warning("Failed to publish worker stats: %s", e)
+        await asyncio.sleep(WORKER_STATS_INTERVAL_SEC)
+
+
+async def _swap_openrouter_client(api_key: str, config: AppConfig) -> None:
+    """
+    Replace the OpenRouter client without dropping requests.
+
+    New requests use the new client immediately; the old one is closed in
+    the background once its in-flight streams finish.
+    """
+    global _openrouter_client
+
+    new_client = OpenRouterClient(
+        api_key=api_key,
+        config=config.openrouter,
+        rate_limiter=_rate_limiter,
+        blobs=_blob_store,
+    )
+    await new_client._get_client()
+
+    old_client = _openrouter_client
+    _openrouter_client = new_client
+    _spawn(new_client.prewarm())
+
+    if old_client is not None:
+        _spawn(old_client.drain_and_close(old_client.config.timeout_sec))
+    logger.info("OpenRouter client replaced")
+
+
+async def apply_config(config: AppConfig) -> None:
+    """Apply new configuration to running services."""
+    global _app_config
+
+    old_config = _app_config
+    _app_config = config
+
+    if _scheduler is not None:
+        _scheduler.reconfigure(_worker_share(config.scheduler, _workers))
+    if _rate_limiter is not None:
+        _rate_limiter.reconfigure(config.rate_limit)
+    if _model_catalog is not None:
+        _model_catalog.config = config.catalog
+    if _request_journal is not None:
+        _request_journal.config = config.journal
+    if _response_cache is not None:
+        _response_cache.config = config.cache
+    if _summarizer is not None:
+        _summarizer.config = config.summarization
+    if _tool_executor is not None:
+        _tool_executor.reconfigure(config.tools)
+    if _speculator is not None:
+        _speculator.config = config.speculation
+    if _stop_detectors is not None:
+        _stop_detectors.config = config.stop_detectors
+    if _blob_store is not None:
+        _blob_store.config = config.blobs
+    if _loop_monitor is not None:
+        _loop_monitor.config = config.diagnostics
+    if _profiler is not None:
+        _profiler.config = config.diagnostics
+    set_log_level(getattr(logging, config.logging.level), config.logging.debug_sample_rate)
+
+    if old_config is not None:
+        restart_only = [
+            name
+            for name, old_value, new_value in (
+                ("server", old_config.server, config.server),
+                ("websocket", old_config.websocket, config.websocket),
+                ("storage", old_config.storage, config.storage),
+                ("logging.format", old_config.logging.format, config.logging.format),
+            )
+            if old_value != new_value
+        ]
+        if restart_only:
+            logger.warning("Changed settings take effect after restart: %s", ", ".join(restart_only))
+
+    try:
+        api_key = get_api_key()
+    except ValueError as e:
+        logger.error("Keeping current OpenRouter client: %s", e)
+        return
+
+    client = _openrouter_client
+    if client is None or client.api_key != api_key or client.config != config.openrouter:
+        await _swap_openrouter_client(api_key, config)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Application lifespan manager."""
-    global _openrouter_client, _app_config
+    global _openrouter_client, _scheduler, _rate_limiter, _model_catalog, _app_config
+    global _request_journal, _response_cache, _summarizer, _tool_executor, _speculator, _loop_monitor, _profiler, _shared_store, _workers
+    global _stop_detectors, _drain, _blob_store
+    global _ready
 
-    # Startup
-    setup_logging()
-    logger.info("Starting LLM Kernel server...")
+    # Startup: only what requests can't run without. Everything that can be
+    # loaded later is warmed up in background once connections are accepted
+    with startup.phase("config"):
+        _app_config = get_config()
+        setup_logging(
+            level=getattr(logging, _app_config.logging.level),
+            fmt=_app_config.logging.format,
+            debug_sample_rate=_app_config.logging.debug_sample_rate,
+        )
+        logger.info("Starting LLM Kernel server...")
+        api_key = get_api_key()
 
-    _app_config = get_config()
-    api_key = get_api_key()
+    _loop_monitor = LoopLagMonitor(_app_config.diagnostics)
+    _spawn(_loop_monitor.run())
+    _profiler = SamplingProfiler(_app_config.diagnostics)
 
-    _openrouter_client = OpenRouterClient(
-        api_key=api_key,
-        config=_app_config.openrouter,
-    )
-    await _openrouter_client._get_client()  # Initialize client
+    _workers = _app_config.server.workers
+    if _workers > 1:
+        with startup.phase("shared state"):
+            _shared_store = SharedStore(get_data_dir() / _app_config.storage.shared_state_file)
+            await asyncio.to_thread(_shared_store.open)
+        logger.info("Worker %d of %d started", os.getpid(), _workers)
+
+    with startup.phase("blobs"):
+        _blob_store = BlobStore(_app_config.blobs, root=get_data_dir() / _app_config.blobs.dir)
+        await asyncio.to_thread(_blob_store.open)
+
+    with startup.phase("components"):
+        _rate_limiter = RateLimiter(_app_config.rate_limit, store=_shared_store)
+        _openrouter_client = OpenRouterClient(
+            api_key=api_key,
+            config=_app_config.openrouter,
+            rate_limiter=_rate_limiter,
+            blobs=_blob_store,
+        )
+        _scheduler = RequestScheduler(_worker_share(_app_config.scheduler, _workers))
+
+        # Catalog fetches through whichever client is current after hot reloads
+        _model_catalog = ModelCatalog(
+            _app_config.catalog,
+            cache_path=get_data_dir() / _app_config.catalog.cache_file,
+            fetch=lambda: get_openrouter_client().list_models(),
+        )
 
-    logger.info(f"Server configured on {_app_config.server.host}:{_app_config.server.port}")
+        # Per worker process: entries are cheap to rebuild and hits stay local
+        _response_cache = SimilarityCache(_app_config.cache)
+        _summarizer = DialogSummarizer(
+            _app_config.summarization,
+            complete=lambda request: complete_in_background(request, client_id="kernel:summarizer"),
+        )
+        _tool_executor = ToolExecutor(_app_config.tools)
+        register_builtin_tools(_tool_executor)
+        _tool_executor.load_modules(_app_config.tools.modules)
+        _stop_detectors = StopDetectors(_app_config.stop_detectors)
+        _speculator = SpeculativeGenerator(
+            _app_config.speculation, stream=stream_in_background, stop_detectors=_stop_detectors
+        )
+        _drain = DrainController()
+
+    with startup.phase("journal"):
+        _request_journal = RequestJournal(
+            _app_config.journal,
+            path=get_data_dir() / _app_config.journal.file,
+        )
+        await _request_journal.start()
+
+    # Background warm-up. Until the tokenizer is loaded, estimates fall back
+    # to length; until the catalog is loaded, context checks and costs are
+    # skipped; the first request pays for whatever handshake is not done yet
+    _spawn(_warm_up(app))
+
+    if _shared_store is not None:
+        _spawn(_publish_worker_stats(_shared_store))
+
+    if _app_config.server.config_watch_interval_sec > 0:
+        _spawn(watch_config_files(apply_config, _app_config.server.config_watch_interval_sec))
+
+    _drain_on_stop_signals()
+    _ready = True
+    ready_at_ms = startup.mark_ready()
+    logger.info(
+        "Server configured on %s:%s, ready %.0f ms after start (%s)",
+        _app_config.server.host,
+        _app_config.server.port,
+        ready_at_ms,
+        ", ".join(f"{name} {ms:.0f}" for name, ms in startup.report()["phases_ms"].items()),
+    )
 
     yield
 
     # Shutdown
+    _ready = False
     logger.info("Shutting down LLM Kernel server...")
+    for task in list(_background_tasks):
+        task.cancel()
+    if _profiler:
+        _profiler.stop()
+    if _summarizer:
+        await _summarizer.close()
+    if _speculator:
+        await _speculator.close()
+    if _model_catalog:
+        await _model_catalog.close()
     if _openrouter_client:
         await _openrouter_client.close()
+    if _request_journal:
+        await _request_journal.close()
+    if _shared_store:
+        _shared_store.close()
     logger.info("Server stopped")
+    shutdown_logging()
 
 
-def create_app() -> FastAPI:
-    """Create and configure FastAPI application."""
-    app = FastAPI(
-        title="LLM Kernel",
-        description="Local proxy server for OpenRouter API",
-        version="0.1.0",
-        lifespan=lifespan,
-    )
-
-    # Import and include routers
-    from src.api.routes import health, models, settings
-    from src.server.websocket import router as ws_router
+def mount_admin_routes(app: FastAPI) -> None:
+    """
+    Import and mount the admin API and UI routes, once.
 
-    config = get_config()
+    They are rarely used and building their routes is a noticeable part of
+    startup, so this runs during warm-up or on the first HTTP request,
+    whichever comes first.
+    """
+    if app.state.admin_routes_mounted:
+        return
+    app.state.admin_routes_mounted = True
 
-    # Mount API routes
-    app.include_router(health.router, prefix=config.server.api_prefix)
-    app.include_router(models.router, prefix=config.server.api_prefix)
-    app.include_router(settings.router, prefix=config.server.api_prefix)
+    from src.api.routes import blobs, cache, diagnostics, lifecycle, models, settings, stats, usage
 
-    # Mount WebSocket
-    app.include_router(ws_router)
+    api_prefix = get_config().server.api_prefix
+    app.include_router(models.router, prefix=api_prefix)
+    app.include_router(settings.router, prefix=api_prefix)
+    app.include_router(stats.router, prefix=api_prefix)
+    app.include_router(usage.router, prefix=api_prefix)
+    app.include_router(cache.router, prefix=api_prefix)
+    app.include_router(diagnostics.router, prefix=api_prefix)
+    app.include_router(lifecycle.router, prefix=api_prefix)
+    app.include_router(blobs.router, prefix=api_prefix)
 
     # Admin UI
     static_dir = Path(__file__).parent.parent.parent / "static"
@@ -98,4 +666,39 @@ def create_app() -> FastAPI:
         """Redirect root to admin."""
         return FileResponse(static_dir / "admin.html")
 
+
+class _MountAdminRoutes:
+    """ASGI middleware mounting the admin routes before the first HTTP request is routed."""
+
+    def __init__(self, app: ASGIApp, fastapi_app: FastAPI):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            mount_admin_routes(self.fastapi_app)
+        await self.app(scope, receive, send)
+
+
+def create_app() -> FastAPI:
+    """Create and configure FastAPI application."""
+    app = FastAPI(
+        title="LLM Kernel",
+        description="Local proxy server for OpenRouter API",
+        version="0.1.0",
+        lifespan=lifespan,
+    )
+
+    # Only what clients need right away; the rest is mounted by mount_admin_routes
+    from src.api.routes import health
+    from src.server.websocket import router as ws_router
+
+    config = get_config()
+
+    app.include_router(health.router, prefix=config.server.api_prefix)
+    app.include_router(ws_router)
+
+    app.state.admin_routes_mounted = False
+    app.add_middleware(_MountAdminRoutes, fastapi_app=app)
+
     return app
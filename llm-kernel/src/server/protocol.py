@@ -1,23 +1,44 @@
+import functools
 import json
 from enum import Enum
+from types import ModuleType
 
-from src.models.requests import LLMRequest
+from pydantic import TypeAdapter
+
+from src.core.tools import ToolResult
+from src.models.requests import Attachment, LLMRequest, Message, NextRequestHint
 from src.models.responses import (
     AckResponse,
+    ControlResponse,
     ErrorResponse,
     LLMCompleteResponse,
     StreamChunkResponse,
     TokenUsage,
+    ToolCallInfo,
+    ToolCallsResponse,
     WebSocketResponse,
 )
 from src.utils.logging import get_logger
 
-# Import generated protobuf messages
-from generated import messages_pb2
-
 
 logger = get_logger("protocol")
 
+# Validates a whole history in one call; faster than model_construct per message
+_MESSAGES = TypeAdapter(list[Message])
+
+
+@functools.cache
+def load_protobuf() -> ModuleType:
+    """
+    Import generated protobuf messages on first use.
+
+    The protobuf runtime is the slowest import of the protocol layer and
+    JSON clients never need it; the server warms it up after startup.
+    """
+    from generated import messages_pb2
+
+    return messages_pb2
+
 
 class SerializationFormat(str, Enum):
     JSON = "json"
@@ -29,6 +50,28 @@ class ProtocolError(Exception):
     pass
 
 
+def _build_typed_request(fields: dict) -> LLMRequest:
+    """
+    Build LLMRequest from already-typed protobuf fields.
+
+    Protobuf guarantees field types, so only the constraints are checked
+    here and pydantic validation (which would copy multi-megabyte prompts)
+    is skipped. History messages are many and small, so they are validated
+    after all, in bulk. Invalid input falls back to model_validate to get
+    the usual ValidationError.
+    """
+    if (
+        fields["request_id"]
+        and fields["model"]
+        and (fields["user_prompt"] or fields["messages"])
+        and fields["priority"] in ("interactive", "background")
+        and all(m["role"] in ("system", "user", "assistant") for m in fields["messages"])
+    ):
+        fields["messages"] = _MESSAGES.validate_python(fields["messages"])
+        return LLMRequest.model_construct(**fields)
+    return LLMRequest.model_validate(fields)
+
+
 def deserialize_request(data: bytes | str, fmt: SerializationFormat) -> LLMRequest:
     """
     Deserialize incoming WebSocket message to LLMRequest.
@@ -54,23 +97,54 @@ def deserialize_request(data: bytes | str, fmt: SerializationFormat) -> LLMReque
             if not isinstance(data, bytes):
                 raise ProtocolError("Protobuf format requires binary data")
 
-            ws_msg = messages_pb2.WebSocketMessage()
+            ws_msg = load_protobuf().WebSocketMessage()
             ws_msg.ParseFromString(data)
 
             if not ws_msg.HasField("request"):
                 raise ProtocolError("Expected LLMRequest in WebSocketMessage")
 
+            # Read each string field once: every access builds a new str
             req = ws_msg.request
-            return LLMRequest(
-                request_id=req.request_id,
-                model=req.model,
-                system_prompt=req.system_prompt,
-                user_prompt=req.user_prompt,
-                stream=req.stream,
-            )
+            fields = {
+                "request_id": req.request_id,
+                "model": req.model,
+                "system_prompt": req.system_prompt,
+                "user_prompt": req.user_prompt,
+                "messages": [
+                    {"role": m.role, "name": m.name, "content": m.content}
+                    for m in req.messages
+                ],
+                "stream": req.stream,
+                "priority": req.priority or "interactive",
+                "deadline_ms": req.deadline_ms,
+                "persona": req.persona,
+                "tools": list(req.tools),
+                "next_request": None,
+                "attachments": [
+                    Attachment.model_validate({
+                        "mime_type": attachment.mime_type,
+                        "hash": attachment.hash,
+                        "data": attachment.data,
+                        "filename": attachment.filename,
+                    })
+                    for attachment in req.attachments
+                ],
+            }
+            if req.HasField("next_request"):
+                hint = req.next_request
+                fields["next_request"] = NextRequestHint.model_validate({
+                    "model": hint.model,
+                    "persona": hint.persona,
+                    "system_prompt": hint.system_prompt,
+                    "user_prompt": hint.user_prompt,
+                    "messages": [{"role": m.role, "name": m.name, "content": m.content} for m in hint.messages],
+                })
+                del hint
+            del ws_msg, req
+            return _build_typed_request(fields)
 
     except Exception as e:
-        logger.error(f"Deserialization failed: {e}")
+        logger.error("Deserialization failed: %s", e)
         raise ProtocolError(f"Failed to deserialize request: {e}") from e
 
 
@@ -89,7 +163,7 @@ def serialize_response(response: WebSocketResponse, fmt: SerializationFormat) ->
         return response.model_dump_json()
 
     elif fmt == SerializationFormat.PROTOBUF:
-        ws_msg = messages_pb2.WebSocketMessage()
+        ws_msg = load_protobuf().WebSocketMessage()
 
         if isinstance(response, AckResponse):
             ws_msg.ack.request_id = response.request_id
@@ -114,6 +188,25 @@ def serialize_response(response: WebSocketResponse, fmt: SerializationFormat) ->
             ws_msg.response.finish_reason = response.finish_reason or ""
             ws_msg.response.prompt_tokens = response.usage.prompt_tokens
             ws_msg.response.completion_tokens = response.usage.completion_tokens
+            ws_msg.response.tokens_saved = response.tokens_saved
+
+        elif isinstance(response, ToolCallsResponse):
+            ws_msg.tool_calls.request_id = response.request_id
+            for call in response.calls:
+                ws_msg.tool_calls.calls.add(
+                    id=call.id,
+                    name=call.name,
+                    arguments=call.arguments,
+                    result=call.result,
+                    error=call.error or "",
+                    cached=call.cached,
+                    duration_ms=call.duration_ms,
+                )
+
+        elif isinstance(response, ControlResponse):
+            ws_msg.control.event = response.event
+            ws_msg.control.message = response.message
+            ws_msg.control.deadline_ms = response.deadline_ms
 
         return ws_msg.SerializeToString()
 
@@ -154,6 +247,7 @@ def create_complete(
     prompt_tokens: int = 0,
     completion_tokens: int = 0,
     is_stream_done: bool = False,
+    tokens_saved: int = 0,
 ) -> LLMCompleteResponse:
     """Create complete response."""
     return LLMCompleteResponse(
@@ -165,4 +259,29 @@ def create_complete(
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
         ),
+        tokens_saved=tokens_saved,
     )
+
+
+def create_tool_calls(request_id: str, results: list[ToolResult]) -> ToolCallsResponse:
+    """Create tool step response."""
+    return ToolCallsResponse(
+        request_id=request_id,
+        calls=[
+            ToolCallInfo(
+                id=result.call.id,
+                name=result.call.function.name,
+                arguments=result.call.function.arguments,
+                result=result.content,
+                error=result.error,
+                cached=result.cached,
+                duration_ms=round(result.duration_ms),
+            )
+            for result in results
+        ],
+    )
+
+
+def create_control(event: str, message: str = "", deadline_ms: int = 0) -> ControlResponse:
+    """Create server notice."""
+    return ControlResponse(event=event, message=message, deadline_ms=deadline_ms)
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+
+import uvicorn
+
+from src.server.app import drain
+from src.utils.logging import get_logger
+
+
+logger = get_logger("runner")
+
+# Set for a successor process: listening socket fds it inherits, and the
+# pipe fd it reports readiness on
+LISTEN_FDS_ENV = "LLM_KERNEL_LISTEN_FDS"
+READY_FD_ENV = "LLM_KERNEL_READY_FD"
+
+# A successor that is not serving by then is killed and the restart aborted
+SUCCESSOR_START_TIMEOUT_SEC = 60
+
+# uvicorn's exit code for a server that failed to start
+STARTUP_FAILURE = 3
+
+_server: "KernelServer | None" = None
+
+
+def get_server() -> "KernelServer | None":
+    """Get server of this process, None when uvicorn manages worker processes."""
+    return _server
+
+
+def inherited_sockets() -> list[socket.socket] | None:
+    """Listening sockets handed over by a predecessor process, if any."""
+    fds = os.environ.pop(LISTEN_FDS_ENV, "")
+    if not fds:
+        return None
+    return [socket.socket(fileno=int(fd)) for fd in fds.split(",")]
+
+
+def _wait_ready(fd: int, timeout_sec: float) -> bool:
+    """Wait for a successor's readiness byte; EOF means it exited first."""
+    readable, _, _ = select.select([fd], [], [], timeout_sec)
+    return bool(readable) and os.read(fd, 1) == b"1"
+
+
+class KernelServer(uvicorn.Server):
+    """
+    uvicorn server that can stop gracefully and restart without downtime.
+
+    restart() starts a successor (same interpreter and command line, so it
+    picks up new code and config) that inherits the listening socket.
+    Once the successor reports it is serving, this process stops accepting
+    connections, drains and exits: connections queued on the socket meanwhile
+    are accepted by the successor, nothing is refused. If the successor
+    fails to start, this process keeps serving.
+
+    Socket inheritance needs a POSIX system. In multi-worker mode uvicorn
+    runs the workers and its supervisor restarts them one by one on SIGHUP.
+    """
+
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        ready_fd = os.environ.pop(READY_FD_ENV, "")
+        self._ready_fd = int(ready_fd) if ready_fd else None
+        self._stopping: asyncio.Task | None = None
+
+    async def startup(self, sockets: list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        if self.should_exit:
+            return
+        if self._ready_fd is not None:
+            os.write(self._ready_fd, b"1")
+            os.close(self._ready_fd)
+            self._ready_fd = None
+        if self.can_restart():
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.request_restart)
+
+    @staticmethod
+    def can_restart() -> bool:
+        return os.name == "posix"
+
+    def request_restart(self) -> bool:
+        """Start a restart in background. False if already stopping or restarting."""
+        return self._request(self.restart())
+
+    def request_shutdown(self) -> bool:
+        """Start a graceful shutdown in background. False if already stopping or restarting."""
+        return self._request(self.shutdown_gracefully())
+
+    def _request(self, coro) -> bool:
+        if self._stopping is not None and not self._stopping.done():
+            coro.close()
+            return False
+        self._stopping = asyncio.create_task(coro)
+        return True
+
+    async def shutdown_gracefully(self) -> None:
+        """Drain, then exit."""
+        await drain("shutdown")
+        self.should_exit = True
+
+    async def restart(self) -> None:
+        """Hand the listening socket to a successor process, then drain and exit."""
+        if not await self._start_successor():
+            return
+        # Only this process's copies are closed: the successor keeps accepting
+        for server in self.servers:
+            server.close()
+        await drain("restart")
+        self.should_exit = True
+
+    async def _start_successor(self) -> bool:
+        fds = [sock.fileno() for server in self.servers for sock in (server.sockets or ())]
+        ready_read, ready_write = os.pipe()
+        env = {**os.environ, LISTEN_FDS_ENV: ",".join(map(str, fds)), READY_FD_ENV: str(ready_write)}
+        try:
+            process = subprocess.Popen([sys.executable, *sys.orig_argv[1:]], env=env, pass_fds=(*fds, ready_write))
+        except OSError as e:
+            logger.error("Failed to start successor process: %s", e)
+            os.close(ready_read)
+            return False
+        finally:
+            os.close(ready_write)
+
+        logger.info("Restarting: successor process %d started", process.pid)
+        try:
+            ready = await asyncio.to_thread(_wait_ready, ready_read, SUCCESSOR_START_TIMEOUT_SEC)
+        finally:
+            os.close(ready_read)
+        if not ready:
+            process.kill()
+            await asyncio.to_thread(process.wait)
+            logger.error("Successor process %d did not start, restart aborted", process.pid)
+            return False
+        logger.info("Successor process %d is serving, handing over", process.pid)
+        return True
+
+
+def run_server(app, sockets: list[socket.socket] | None = None, **options) -> None:
+    """Run a single-process server, on inherited sockets if given."""
+    global _server
+
+    _server = KernelServer(uvicorn.Config(app, **options))
+    try:
+        _server.run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+    if not _server.started:
+        sys.exit(STARTUP_FAILURE)
@@ -1,26 +1,66 @@
+import asyncio
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from pydantic import ValidationError
 
+from src.core.blob_store import BlobError, BlobNotFound, BlobStore
+from src.core.journal import JournalEntry
 from src.core.message_builder import build_chat_request
-from src.core.openrouter import OpenRouterClient, OpenRouterError
-from src.models.responses import WebSocketResponse
-from src.server.app import get_app_config, get_openrouter_client
+from src.core.openrouter import OpenRouterClient, OpenRouterError, OpenRouterTimeout
+from src.core.stop_detector import FINISH_REASON as STOP_DETECTOR_FINISH, StopDetector
+from src.core.token_counter import count_tokens, estimate_prompt_tokens_async
+from src.core.scheduler import AdmissionRejected, Priority
+from src.core.similarity_cache import CachedResponse, CacheHit, context_key
+from src.core.speculation import Speculation, predict_request
+from src.core.tools import ToolCallAssembler, ToolError
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, ContentPart, ToolCall
+from src.models.requests import LLMRequest
+from src.models.responses import TokenUsage, WebSocketResponse
+from src.server.app import (
+    get_app_config,
+    get_blob_store,
+    get_drain_controller,
+    get_model_catalog,
+    get_openrouter_client,
+    get_rate_limiter,
+    get_request_journal,
+    get_response_cache,
+    get_summarizer,
+    get_scheduler,
+    get_speculator,
+    get_stop_detectors,
+    get_tool_executor,
+)
 from src.server.protocol import (
     ProtocolError,
     SerializationFormat,
     create_ack,
     create_chunk,
     create_complete,
+    create_control,
     create_error,
+    create_tool_calls,
     deserialize_request,
     serialize_response,
 )
-from src.utils.logging import get_logger
+from src.utils.logging import bind_log_context, get_logger, log_context, sampled_debug
 
 
 logger = get_logger("websocket")
 router = APIRouter()
 
+# Token estimates may be approximate: only reject prompts clearly over the limit
+CONTEXT_TOLERANCE = 1.1
+
+# Finish reason of a reply cut short by an upstream failure, as OpenRouter reports mid-stream errors
+PARTIAL_FINISH_REASON = "error"
+
+# Between the texts of consecutive tool steps, so they don't run together
+ROUND_SEPARATOR = "\n\n"
+
 
 async def send_response(
     websocket: WebSocket,
@@ -35,47 +75,85 @@ async def send_response(
         await websocket.send_text(data)
 
 
-async def handle_llm_request(
+@dataclass
+class _Round:
+    """Result of one upstream call."""
+
+    content: str
+    tool_calls: list[ToolCall]
+    finish_reason: str | None
+    prompt_tokens: int
+    completion_tokens: int
+    tokens_saved: int = 0
+
+
+def _record_stop(request_id: str, detector: StopDetector, tokens_saved: int) -> None:
+    get_stop_detectors().record(detector.match, count_tokens(detector.discarded), tokens_saved)
+    logger.info(
+        "Request %s: stopped by %s detector at %r, up to %d token(s) saved",
+        request_id, detector.match.kind, detector.match.text[:40], tokens_saved,
+    )
+
+
+async def stream_round(
     websocket: WebSocket,
-    raw_data: bytes | str,
+    request: LLMRequest,
     fmt: SerializationFormat,
     client: OpenRouterClient,
-) -> None:
-    """Handle incoming LLM request."""
-    config = get_app_config()
-    request_id = "unknown"
-
-    try:
-        # Deserialize request
-        request = deserialize_request(raw_data, fmt)
-        request_id = request.request_id
-        logger.info(f"Request {request_id}: model={request.model}, stream={request.stream}")
+    chat_request: ChatCompletionRequest,
+    deadline: float | None,
+    entry: JournalEntry,
+    started_at: float,
+    output: list[str] | None,
+    separator: str = "",
+) -> _Round:
+    """
+    Stream one upstream call to the client, assembling any tool calls on the way.
 
-        # Send ACK
-        await send_response(
-            websocket,
-            create_ack(request_id, accepted=True),
-            fmt,
-        )
+    The separator is sent ahead of the first content, never kept in the
+    round's own content.
 
-        # Build OpenRouter request
-        chat_request = build_chat_request(request, config.defaults)
+    Content passes through the persona's stop detector, if any: once it
+    matches, the reply is cut there and the upstream stream is cancelled.
+    For a non-streaming client nothing is relayed; if upstream fails after
+    some content arrived, the round ends with what there is.
+    """
+    request_id = request.request_id
+    relay = request.stream
+    content: list[str] = []
+    received = False
+    tool_calls = ToolCallAssembler()
+    finish_reason = None
+    prompt_tokens = 0
+    completion_tokens = 0
+    detector = get_stop_detectors().detector(request.persona)
 
-        if request.stream:
-            # Streaming mode
-            finish_reason = None
-            prompt_tokens = 0
-            completion_tokens = 0
+    async def send_content(piece: str) -> None:
+        content.append(piece)
+        if len(content) == 1:
+            piece = separator + piece
+        if output is not None:
+            output.append(piece)
+        if relay:
+            sampled_debug(logger, "Request %s: chunk %d (%d chars)", request_id, len(content), len(piece))
+            # Send chunk to client immediately
+            await send_response(websocket, create_chunk(request_id, piece), fmt)
 
-            async for chunk in client.chat_completion_stream(chat_request):
+    try:
+        # Leaving the loop early closes the stream, which cancels generation upstream
+        async with aclosing(client.chat_completion_stream(chat_request, deadline)) as stream:
+            async for chunk in stream:
                 for choice in chunk.choices:
                     if choice.delta and choice.delta.content:
-                        # Send chunk to client immediately
-                        await send_response(
-                            websocket,
-                            create_chunk(request_id, choice.delta.content),
-                            fmt,
-                        )
+                        if entry.first_token_ms is None:
+                            entry.first_token_ms = (time.monotonic() - started_at) * 1000
+                        received = True
+                        piece = detector.feed(choice.delta.content) if detector else choice.delta.content
+                        if piece:
+                            await send_content(piece)
+
+                    if choice.delta and choice.delta.tool_calls:
+                        tool_calls.add(choice.delta.tool_calls)
 
                     if choice.finish_reason:
                         finish_reason = choice.finish_reason
@@ -85,88 +163,553 @@ async def handle_llm_request(
                     prompt_tokens = chunk.usage.prompt_tokens
                     completion_tokens = chunk.usage.completion_tokens
 
-            # Send done message
-            await send_response(
-                websocket,
-                create_complete(
-                    request_id=request_id,
-                    content=None,  # Content already sent via chunks
-                    finish_reason=finish_reason,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    is_stream_done=True,
-                ),
-                fmt,
+                if detector and detector.match:
+                    break
+
+    except OpenRouterError as e:
+        # A streaming client already has its chunks and gets the error after them
+        if relay or not received:
+            raise
+        rest = detector.flush() if detector else ""
+        if rest:
+            await send_content(rest)
+        reply = "".join(content)
+        logger.warning(
+            "Request %s: upstream failed after %d chars, returning partial reply: %s", request_id, len(reply), e
+        )
+        return _Round(
+            reply, [], PARTIAL_FINISH_REASON, await estimate_prompt_tokens_async(chat_request), count_tokens(reply)
+        )
+
+    if detector and detector.match:
+        # A cancelled stream reports no usage: estimate what was generated
+        completion_tokens = count_tokens("".join(content)) + count_tokens(detector.discarded)
+        tokens_saved = max(0, (chat_request.max_tokens or 0) - completion_tokens)
+        _record_stop(request_id, detector, tokens_saved)
+        return _Round(
+            "".join(content),
+            [],
+            STOP_DETECTOR_FINISH,
+            await estimate_prompt_tokens_async(chat_request),
+            completion_tokens,
+            tokens_saved,
+        )
+
+    if detector:
+        rest = detector.flush()
+        if rest:
+            await send_content(rest)
+
+    return _Round("".join(content), tool_calls.build(), finish_reason, prompt_tokens, completion_tokens)
+
+
+async def collect_round(
+    websocket: WebSocket,
+    request: LLMRequest,
+    fmt: SerializationFormat,
+    client: OpenRouterClient,
+    chat_request: ChatCompletionRequest,
+    deadline: float | None,
+    entry: JournalEntry,
+    started_at: float,
+    output: list[str] | None,
+    separator: str = "",
+) -> _Round:
+    """
+    Run one upstream call for a non-streaming client as a stream, assembling the reply in the kernel.
+
+    Unlike a non-streaming upstream call, a stall is caught by the first-token
+    and idle timeouts rather than one read timeout for the whole body, the
+    reply is never buffered as raw JSON, and a failure mid-way still returns
+    what was generated. Failures before any output are retried as
+    chat_completion does, except timeouts, which already took their time.
+    """
+    first_token_ms = entry.first_token_ms
+    for attempt in range(client.config.max_retries + 1):
+        # A failed attempt may have seen a token before failing
+        entry.first_token_ms = first_token_ms
+        try:
+            return await stream_round(
+                websocket, request, fmt, client, chat_request, deadline, entry, started_at, output, separator
             )
-            logger.info(f"Request {request_id}: streaming completed")
+        except OpenRouterTimeout:
+            raise
+        except OpenRouterError as e:
+            if attempt == client.config.max_retries:
+                raise
+            logger.warning("Request %s: upstream failed before any output, retrying: %s", request.request_id, e)
+    raise OpenRouterError("Max retries exceeded")
+
+
+async def complete_round(
+    request: LLMRequest,
+    client: OpenRouterClient,
+    chat_request: ChatCompletionRequest,
+    deadline: float | None,
+    output: list[str] | None,
+    separator: str = "",
+) -> _Round:
+    """Run one non-streaming upstream call; a stop detector match only cuts the finished reply."""
+    response = await client.chat_completion(chat_request, deadline)
+
+    content = ""
+    tool_calls: list[ToolCall] = []
+    finish_reason = None
+    if response.choices:
+        choice = response.choices[0]
+        if choice.message:
+            content = choice.message.content
+            tool_calls = choice.message.tool_calls or []
+        finish_reason = choice.finish_reason
+
+    detector = get_stop_detectors().detector(request.persona) if content else None
+    if detector:
+        content = detector.feed(content) + detector.flush()
+        if detector.match:
+            tool_calls = []
+            finish_reason = STOP_DETECTOR_FINISH
+            _record_stop(request.request_id, detector, 0)
+    if output is not None and content:
+        output.append(separator + content)
+
+    usage = response.usage
+    return _Round(
+        content,
+        tool_calls,
+        finish_reason,
+        usage.prompt_tokens if usage else 0,
+        usage.completion_tokens if usage else 0,
+    )
+
+
+async def run_tool_step(
+    websocket: WebSocket,
+    request: LLMRequest,
+    fmt: SerializationFormat,
+    chat_request: ChatCompletionRequest,
+    turn: _Round,
+) -> ChatCompletionRequest:
+    """Execute the tool calls of an assistant turn and append the turn and its results to the dialog."""
+    results = await get_tool_executor().execute(turn.tool_calls)
+    await send_response(websocket, create_tool_calls(request.request_id, results), fmt)
+    logger.info(
+        "Request %s: ran %d tool call(s), %d failed",
+        request.request_id, len(results), sum(result.error is not None for result in results),
+    )
+    return chat_request.model_copy(update={
+        "messages": [
+            *chat_request.messages,
+            ChatMessage(role="assistant", content=turn.content, tool_calls=turn.tool_calls),
+            *(result.message() for result in results),
+        ],
+    })
+
+
+async def process_request(
+    websocket: WebSocket,
+    request: LLMRequest,
+    fmt: SerializationFormat,
+    client: OpenRouterClient,
+    chat_request: ChatCompletionRequest,
+    deadline: float | None,
+    entry: JournalEntry,
+    output: list[str] | None = None,
+) -> TokenUsage:
+    """
+    Run admitted request against OpenRouter, send results to client and fill in the journal entry.
+
+    If the model calls kernel tools, they are executed and generation
+    continues with their results, up to tools.max_rounds steps, all within
+    the same scheduler slot and deadline. Token usage is summed over steps;
+    the texts of steps are joined with ROUND_SEPARATOR, streamed or not.
+    If output is given, the generated content is collected into it.
+    """
+    request_id = request.request_id
+    started_at = time.monotonic()
+    max_rounds = get_tool_executor().config.max_rounds if chat_request.tools else 0
+    content: list[str] = []
+    prompt_tokens = 0
+    completion_tokens = 0
+    tokens_saved = 0
 
+    for step in range(max_rounds + 1):
+        separator = ROUND_SEPARATOR if content else ""
+        if request.stream:
+            turn = await stream_round(
+                websocket, request, fmt, client, chat_request, deadline, entry, started_at, output, separator
+            )
+        elif client.config.stream_upstream:
+            turn = await collect_round(
+                websocket, request, fmt, client, chat_request, deadline, entry, started_at, output, separator
+            )
         else:
-            # Non-streaming mode
-            response = await client.chat_completion(chat_request)
+            turn = await complete_round(request, client, chat_request, deadline, output, separator)
+        if turn.content:
+            content.append(turn.content)
+        prompt_tokens += turn.prompt_tokens
+        completion_tokens += turn.completion_tokens
+        tokens_saved += turn.tokens_saved
+
+        if not turn.tool_calls:
+            break
+        if step == max_rounds:
+            logger.warning("Request %s: tool step limit (%d) reached", request_id, max_rounds)
+            break
+        chat_request = await run_tool_step(websocket, request, fmt, chat_request, turn)
+
+    entry.finish_reason = turn.finish_reason
+    await send_response(
+        websocket,
+        create_complete(
+            request_id=request_id,
+            # Streamed content was already sent via chunks
+            content=None if request.stream else ROUND_SEPARATOR.join(content),
+            finish_reason=turn.finish_reason,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            is_stream_done=request.stream,
+            tokens_saved=tokens_saved,
+        ),
+        fmt,
+    )
+    logger.info("Request %s: completed (stream=%s, %d step(s))", request_id, request.stream, step + 1)
+    return TokenUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+async def send_cached_response(
+    websocket: WebSocket,
+    request: LLMRequest,
+    fmt: SerializationFormat,
+    hit: CacheHit,
+) -> tuple[str, str | None]:
+    """
+    Answer a request from cache, in the shape the client asked for.
+
+    The answer goes through the persona's stop detector, which may have
+    changed since it was cached.
+
+    Returns:
+        Content and finish reason sent
+    """
+    request_id = request.request_id
+    response = hit.response
+    content, finish_reason = response.content, response.finish_reason
+    # Nothing upstream is saved by cutting a cached answer
+    detector = get_stop_detectors().detector(request.persona)
+    if detector:
+        content = detector.feed_all(content)
+        if detector.match:
+            finish_reason = STOP_DETECTOR_FINISH
+            _record_stop(request_id, detector, 0)
+    await send_response(websocket, create_ack(request_id, accepted=True), fmt)
+
+    # No upstream tokens were spent on this answer
+    if request.stream and content:
+        await send_response(websocket, create_chunk(request_id, content), fmt)
+    await send_response(
+        websocket,
+        create_complete(
+            request_id=request_id,
+            content=None if request.stream else content,
+            finish_reason=finish_reason,
+            prompt_tokens=0,
+            completion_tokens=0,
+            is_stream_done=request.stream,
+        ),
+        fmt,
+    )
+    logger.info("Request %s: served from cache (hit %d, similarity %.3f)", request_id, hit.hit_id, hit.similarity)
+    return content, finish_reason
+
+
+async def send_speculative_response(
+    websocket: WebSocket,
+    request: LLMRequest,
+    fmt: SerializationFormat,
+    speculation: Speculation,
+) -> None:
+    """
+    Answer a request from its speculative generation, live if still running.
+
+    The generation already went through the persona's stop detector.
+
+    Raises:
+        OpenRouterError: If the speculative generation fails
+    """
+    request_id = request.request_id
+    await send_response(websocket, create_ack(request_id, accepted=True), fmt)
+
+    if request.stream:
+        async for piece in speculation.follow():
+            await send_response(websocket, create_chunk(request_id, piece), fmt)
+    else:
+        await speculation.wait()
+
+    await send_response(
+        websocket,
+        create_complete(
+            request_id=request_id,
+            content=None if request.stream else speculation.content(),
+            finish_reason=speculation.finish_reason,
+            prompt_tokens=speculation.entry.prompt_tokens,
+            completion_tokens=speculation.entry.completion_tokens,
+            is_stream_done=request.stream,
+        ),
+        fmt,
+    )
+    logger.info("Request %s: served from speculation %s", request_id, speculation.entry.request_id)
 
-            content = ""
-            finish_reason = None
-            if response.choices:
-                choice = response.choices[0]
-                if choice.message:
-                    content = choice.message.content
-                finish_reason = choice.finish_reason
 
-            usage = response.usage
-            prompt_tokens = usage.prompt_tokens if usage else 0
-            completion_tokens = usage.completion_tokens if usage else 0
+async def speculate_next(client_id: str, request: LLMRequest, reply: str) -> None:
+    """Start generating the request predicted to follow this one, if speculation is on."""
+    speculator = get_speculator()
+    if request.next_request is None or not speculator.config.enabled or get_drain_controller().draining:
+        return
+    try:
+        predicted = predict_request(request.next_request, reply)
+    except ValidationError as e:
+        logger.warning("Request %s: cannot predict next request: %s", request.request_id, e)
+        return
+    chat_request = await get_summarizer().apply(build_chat_request(predicted, get_app_config().defaults))
+    speculator.start(client_id, predicted, chat_request, await estimate_prompt_tokens_async(chat_request))
+
+
+def store_attachments(store: BlobStore, request: LLMRequest) -> list[ContentPart]:
+    """
+    Store inline attachment data and check referenced hashes, blocking on disk.
+
+    Data is dropped from the request once stored: from here on the
+    attachment is read from the store when the upstream body is encoded.
+
+    Raises:
+        AdmissionRejected: If an attachment is missing from the store or cannot be stored
+    """
+    parts = []
+    for attachment in request.attachments:
+        try:
+            if attachment.data:
+                digest = store.put(attachment.data)
+                if attachment.hash and attachment.hash != digest:
+                    raise BlobError(f"Attachment hash {attachment.hash} does not match its data ({digest})")
+                attachment.data = b""
+            else:
+                digest = attachment.hash
+                if not store.touch(digest):
+                    raise BlobNotFound(f"Attachment {digest} is not stored, send its data")
+        except BlobNotFound as e:
+            raise AdmissionRejected("ATTACHMENT_NOT_FOUND", str(e)) from e
+        except BlobError as e:
+            raise AdmissionRejected("ATTACHMENT_ERROR", str(e)) from e
+        parts.append(ContentPart(hash=digest, mime_type=attachment.mime_type, filename=attachment.filename))
+    return parts
+
+
+async def handle_llm_request(
+    websocket: WebSocket,
+    raw_data: bytes | str,
+    fmt: SerializationFormat,
+    client: OpenRouterClient,
+    client_id: str,
+) -> None:
+    """Handle incoming LLM request."""
+    config = get_app_config()
+    received_at = time.monotonic()
+    request_id = "unknown"
+    entry: JournalEntry | None = None
+    outcome = "ok"
+
+    drain = get_drain_controller()
+    with log_context(client_id=client_id), drain.track():
+        try:
+            # Deserialize request
+            request = deserialize_request(raw_data, fmt)
+            del raw_data  # Release the raw frame before going upstream
+            request_id = request.request_id
+            bind_log_context(request_id=request_id, model=request.model)
+            logger.info("Request %s: model=%s, stream=%s", request_id, request.model, request.stream)
+            entry = JournalEntry(
+                ts=time.time(),
+                request_id=request_id,
+                client_id=client_id,
+                persona=request.persona,
+                model=request.model,
+                priority=request.priority,
+                stream=request.stream,
+            )
+            drain.admit()
 
+            # Deadline counts from receipt, so queueing time is included
+            deadline = None
+            if request.deadline_ms:
+                deadline = time.monotonic() + request.deadline_ms / 1000
+
+            tools = None
+            if request.tools:
+                try:
+                    tools = get_tool_executor().definitions(request.tools)
+                except ToolError as e:
+                    raise AdmissionRejected("UNKNOWN_TOOL", str(e)) from e
+
+            parts = None
+            if request.attachments:
+                parts = await asyncio.to_thread(store_attachments, get_blob_store(), request)
+
+            # Build OpenRouter request, with old history replaced by its summary if there is one
+            chat_request = await get_summarizer().apply(build_chat_request(request, config.defaults, tools, parts))
+
+            # Reject prompts that clearly can't fit the model before going upstream
+            estimated_tokens = await estimate_prompt_tokens_async(chat_request)
+            model_info = get_model_catalog().lookup(request.model)
+            if model_info and model_info.context_length and (
+                estimated_tokens > model_info.context_length * CONTEXT_TOLERANCE
+            ):
+                raise AdmissionRejected(
+                    "CONTEXT_TOO_LONG",
+                    f"Prompt is ~{estimated_tokens} tokens, {request.model} accepts {model_info.context_length}",
+                )
+
+            # A correctly predicted request is already being generated
+            speculation = get_speculator().claim(client_id, request)
+            if speculation is not None:
+                entry.source = "speculation"
+                entry.queue_ms = 0.0
+                # Tokens are journaled with the speculative generation itself
+                await send_speculative_response(websocket, request, fmt, speculation)
+                entry.finish_reason = speculation.finish_reason
+                await speculate_next(client_id, request, speculation.content())
+                return
+
+            # Near-duplicates of cached prompts never go upstream. Answers built
+            # from tool results may depend on when they were made, and answers
+            # about attachments on more than the prompt, so neither is cached
+            cache = get_response_cache()
+            fingerprint = None
+            if cache.eligible(request.model, request.persona) and not tools and not parts:
+                cache_key = context_key(
+                    request.model,
+                    request.persona,
+                    request.system_prompt,
+                    (field for m in request.messages for field in (m.role, m.name, m.content)),
+                )
+                fingerprint = cache.fingerprint(request.user_prompt)
+                hit = cache.lookup(cache_key, fingerprint, request.user_prompt) if fingerprint else None
+                if hit is not None:
+                    entry.source = "cache"
+                    entry.queue_ms = 0.0
+                    content, entry.finish_reason = await send_cached_response(websocket, request, fmt, hit)
+                    await speculate_next(client_id, request, content)
+                    return
+            output = [] if fingerprint is not None or request.next_request is not None else None
+
+            # Reserve rate budget, then wait for an upstream slot; ACK once admitted
+            rate_limiter = get_rate_limiter()
+            reservation = await rate_limiter.acquire(client.api_key, request.model, estimated_tokens)
+            usage = None
+            try:
+                scheduler = get_scheduler()
+                async with scheduler.slot(client_id, request.model, Priority(request.priority)):
+                    entry.queue_ms = (time.monotonic() - received_at) * 1000
+                    await send_response(
+                        websocket,
+                        create_ack(request_id, accepted=True),
+                        fmt,
+                    )
+                    usage = await process_request(
+                        websocket, request, fmt, client, chat_request, deadline, entry, output
+                    )
+            finally:
+                # Rejected, failed and cancelled requests get their reservation back
+                rate_limiter.reconcile(reservation, usage.total_tokens if usage else 0)
+
+            entry.prompt_tokens = usage.prompt_tokens
+            entry.completion_tokens = usage.completion_tokens
+
+            if output is not None:
+                await speculate_next(client_id, request, "".join(output))
+
+            # Only complete answers are worth replaying
+            if fingerprint is not None and entry.finish_reason == "stop":
+                cache.store(
+                    cache_key,
+                    fingerprint,
+                    request.model,
+                    request.user_prompt,
+                    CachedResponse(
+                        content="".join(output),
+                        finish_reason=entry.finish_reason,
+                        prompt_tokens=usage.prompt_tokens,
+                        completion_tokens=usage.completion_tokens,
+                    ),
+                )
+
+        except AdmissionRejected as e:
+            outcome = e.code
+            logger.warning("Request %s rejected: %s", request_id, e)
             await send_response(
                 websocket,
-                create_complete(
-                    request_id=request_id,
-                    content=content,
-                    finish_reason=finish_reason,
-                    prompt_tokens=prompt_tokens,
-                    completion_tokens=completion_tokens,
-                    is_stream_done=False,
-                ),
+                create_ack(request_id, accepted=False, error_code=e.code, error_message=str(e)),
                 fmt,
             )
-            logger.info(f"Request {request_id}: completed (non-streaming)")
 
-    except ProtocolError as e:
-        logger.error(f"Protocol error: {e}")
-        await send_response(
-            websocket,
-            create_error(request_id, "PROTOCOL_ERROR", str(e)),
-            fmt,
-        )
+        except ProtocolError as e:
+            outcome = "PROTOCOL_ERROR"
+            logger.error("Protocol error: %s", e)
+            await send_response(
+                websocket,
+                create_error(request_id, "PROTOCOL_ERROR", str(e)),
+                fmt,
+            )
 
-    except ValidationError as e:
-        logger.error(f"Validation error: {e}")
-        await send_response(
-            websocket,
-            create_ack(request_id, accepted=False, error_code="VALIDATION_ERROR", error_message=str(e)),
-            fmt,
-        )
+        except ValidationError as e:
+            outcome = "VALIDATION_ERROR"
+            logger.error("Validation error: %s", e)
+            await send_response(
+                websocket,
+                create_ack(request_id, accepted=False, error_code="VALIDATION_ERROR", error_message=str(e)),
+                fmt,
+            )
 
-    except OpenRouterError as e:
-        logger.error(f"OpenRouter error: {e}")
-        await send_response(
-            websocket,
-            create_error(request_id, "OPENROUTER_ERROR", str(e)),
-            fmt,
-        )
+        except OpenRouterTimeout as e:
+            outcome = "TIMEOUT"
+            logger.error("Request %s timed out: %s", request_id, e)
+            await send_response(
+                websocket,
+                create_error(request_id, "TIMEOUT", str(e)),
+                fmt,
+            )
 
-    except Exception as e:
-        logger.exception(f"Unexpected error: {e}")
-        await send_response(
-            websocket,
-            create_error(request_id, "INTERNAL_ERROR", str(e)),
-            fmt,
-        )
+        except OpenRouterError as e:
+            outcome = "OPENROUTER_ERROR"
+            logger.error("OpenRouter error: %s", e)
+            await send_response(
+                websocket,
+                create_error(request_id, "OPENROUTER_ERROR", str(e)),
+                fmt,
+            )
+
+        except Exception as e:
+            outcome = "INTERNAL_ERROR"
+            logger.exception("Unexpected error: %s", e)
+            await send_response(
+                websocket,
+                create_error(request_id, "INTERNAL_ERROR", str(e)),
+                fmt,
+            )
+
+        finally:
+            # Unparseable requests have nothing worth accounting
+            if entry is not None:
+                entry.outcome = outcome
+                entry.total_ms = (time.monotonic() - received_at) * 1000
+                entry.cost = get_model_catalog().cost(entry.model, entry.prompt_tokens, entry.completion_tokens)
+                get_request_journal().record(entry)
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
     format: str = Query(default="json", alias="format"),
+    client_id: str | None = Query(default=None),
 ) -> None:
     """WebSocket endpoint for LLM requests."""
     # Parse format
@@ -174,26 +717,51 @@ async def websocket_endpoint(
         fmt = SerializationFormat(format.lower())
     except ValueError:
         fmt = SerializationFormat.JSON
-        logger.warning(f"Unknown format '{format}', falling back to JSON")
+        logger.warning("Unknown format '%s', falling back to JSON", format)
+
+    # Connections without explicit client_id get per-connection quotas
+    if client_id is None:
+        peer = websocket.client
+        client_id = f"{peer.host}:{peer.port}" if peer else "unknown"
 
     await websocket.accept()
-    logger.info(f"Client connected, format={fmt.value}")
+    logger.info("Client connected, format=%s, client_id=%s", fmt.value, client_id)
+
+    async def notify_draining(remaining_sec: float) -> None:
+        await send_response(
+            websocket,
+            create_control(
+                "draining",
+                "Server is shutting down: running requests finish, send new ones after reconnecting",
+                round(remaining_sec * 1000),
+            ),
+            fmt,
+        )
 
-    client = get_openrouter_client()
+    drain = get_drain_controller()
+    drain.add_connection(notify_draining)
 
     try:
+        if drain.draining:
+            await notify_draining(drain.remaining_sec())
+
         while True:
-            # Receive message
+            # Receive message. The frame is passed straight through without a
+            # local binding, so the handler can drop the last reference to it.
             if fmt == SerializationFormat.PROTOBUF:
-                data = await websocket.receive_bytes()
+                receive = websocket.receive_bytes
             else:
-                data = await websocket.receive_text()
+                receive = websocket.receive_text
 
-            # Handle request
-            await handle_llm_request(websocket, data, fmt, client)
+            # Client is looked up per request: it may be swapped on config reload
+            await handle_llm_request(websocket, await receive(), fmt, get_openrouter_client(), client_id)
 
     except WebSocketDisconnect:
         logger.info("Client disconnected")
 
     except Exception as e:
-        logger.exception(f"WebSocket error: {e}")
+        logger.exception("WebSocket error: %s", e)
+
+    finally:
+        drain.remove_connection(notify_draining)
+        get_speculator().drop_client(client_id)
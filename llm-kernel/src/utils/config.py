@@ -1,10 +1,18 @@
+import asyncio
 import json
 import os
+import stat
+import tempfile
+from collections.abc import Awaitable, Callable
 from pathlib import Path
 
 from dotenv import load_dotenv
 
 from src.models.config import AppConfig
+from src.utils.logging import get_logger
+
+
+logger = get_logger("config")
 
 
 _config: AppConfig | None = None
@@ -16,6 +24,39 @@ def get_project_root() -> Path:
     return Path(__file__).parent.parent.parent
 
 
+def get_data_dir() -> Path:
+    """Get directory for kernel runtime data, creating it if needed."""
+    data_dir = Path(get_config().storage.data_dir)
+    if not data_dir.is_absolute():
+        data_dir = get_project_root() / data_dir
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def get_env_path() -> Path:
+    """Get path of the .env file with secrets."""
+    return get_project_root() / ".env"
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write file via temp file + rename, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates the file as 0600: keep the mode of the file being replaced
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(path.stat().st_mode))
+        except FileNotFoundError:
+            pass
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
 def load_config(config_path: Path | None = None) -> AppConfig:
     """Load configuration from JSON file and environment variables."""
     global _config, _config_path
@@ -26,8 +67,7 @@ def load_config(config_path: Path | None = None) -> AppConfig:
     _config_path = config_path
 
     # Load .env file
-    env_path = get_project_root() / ".env"
-    load_dotenv(env_path)
+    load_dotenv(get_env_path())
 
     # Load config.json
     if config_path.exists():
@@ -61,8 +101,31 @@ def save_config(config: AppConfig | None = None) -> None:
     if _config_path is None:
         _config_path = get_project_root() / "config.json"
 
-    with open(_config_path, "w", encoding="utf-8") as f:
-        json.dump(_config.model_dump(), f, indent=2)
+    atomic_write_text(_config_path, json.dumps(_config.model_dump(), indent=2))
+
+
+async def save_config_async(config: AppConfig | None = None) -> None:
+    """Save configuration without blocking the event loop."""
+    await asyncio.to_thread(save_config, config)
+
+
+def reload_config() -> AppConfig:
+    """Re-read config.json and .env, letting .env override the environment."""
+    global _config
+
+    if _config_path is None:
+        return load_config()
+
+    load_dotenv(get_env_path(), override=True)
+
+    if _config_path.exists():
+        with open(_config_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _config = AppConfig.model_validate(data)
+    else:
+        _config = AppConfig()
+
+    return _config
 
 
 def get_api_key() -> str:
@@ -75,7 +138,7 @@ def get_api_key() -> str:
 
 def set_api_key(key: str) -> None:
     """Set OpenRouter API key in .env file."""
-    env_path = get_project_root() / ".env"
+    env_path = get_env_path()
 
     # Read existing .env content
     lines: list[str] = []
@@ -95,8 +158,55 @@ def set_api_key(key: str) -> None:
         lines.append(f"OPENROUTER_API_KEY={key}\n")
 
     # Write back
-    with open(env_path, "w", encoding="utf-8") as f:
-        f.writelines(lines)
+    atomic_write_text(env_path, "".join(lines))
 
     # Update environment
     os.environ["OPENROUTER_API_KEY"] = key
+
+
+async def set_api_key_async(key: str) -> None:
+    """Set API key without blocking the event loop."""
+    await asyncio.to_thread(set_api_key, key)
+
+
+def _file_mtimes() -> tuple[float | None, float | None]:
+    """Get modification times of config.json and .env (None if missing)."""
+    config_path = _config_path or get_project_root() / "config.json"
+    result = []
+    for path in (config_path, get_env_path()):
+        try:
+            result.append(path.stat().st_mtime_ns)
+        except FileNotFoundError:
+            result.append(None)
+    return result[0], result[1]
+
+
+async def watch_config_files(
+    on_change: Callable[[AppConfig], Awaitable[None]],
+    interval_sec: float,
+) -> None:
+    """
+    Poll config.json and .env, calling on_change with reloaded config.
+
+    Invalid files are logged and skipped; the running config stays in place
+    until a valid version is written.
+    """
+    last = await asyncio.to_thread(_file_mtimes)
+    while True:
+        await asyncio.sleep(interval_sec)
+        current = await asyncio.to_thread(_file_mtimes)
+        if current == last:
+            continue
+        last = current
+
+        try:
+            config = await asyncio.to_thread(reload_config)
+        except Exception as e:
+            logger.error("Config reload failed, keeping current config: %s", e)
+            continue
+
+        logger.info("Config files changed, applying")
+        try:
+            await on_change(config)
+        except Exception as e:
+            logger.exception("Failed to apply reloaded config: %s", e)
@@ -1,31 +1,172 @@
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Literal
 
+# Per-task request context, attached to every record logged inside the task
+_request_context: ContextVar[dict[str, str] | None] = ContextVar("log_request_context", default=None)
+
+# Record attributes copied into JSON output when present
+_CONTEXT_FIELDS = ("request_id", "model", "client_id")
+
+_listener: logging.handlers.QueueListener | None = None
+_debug_sample_rate = 0.01
+
+
+class _ContextFilter(logging.Filter):
+    """Copy request context onto records in the logging task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler formats the message in the caller's thread, which is
+    exactly the cost we want off the event loop. Records stay in-process,
+    so they don't need to be made picklable.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with request context fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in _CONTEXT_FIELDS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    fmt: Literal["text", "json"] = "text",
+    debug_sample_rate: float = 0.01,
+) -> logging.Logger:
+    """
+    Setup application logging.
+
+    Records go through a queue; a background thread formats them and writes
+    to stdout, so a slow terminal or pipe never blocks the event loop.
+    """
+    global _listener, _debug_sample_rate
 
-def setup_logging(level: int = logging.INFO) -> logging.Logger:
-    """Setup application logging."""
     logger = logging.getLogger("llm-kernel")
     logger.setLevel(level)
+    _debug_sample_rate = debug_sample_rate
 
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
 
-    # Console handler
+    # Console handler, driven by the listener thread
     handler = logging.StreamHandler(sys.stdout)
     handler.setLevel(level)
 
     # Format
-    formatter = logging.Formatter(
-        "[%(asctime)s] %(levelname)s %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if fmt == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
 
     return logger
 
 
+def set_log_level(level: int, debug_sample_rate: float) -> None:
+    """Change the level of a running logging setup; the format is fixed until restart."""
+    global _debug_sample_rate
+
+    logging.getLogger("llm-kernel").setLevel(level)
+    _debug_sample_rate = debug_sample_rate
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the logging thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    logger = logging.getLogger("llm-kernel")
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            logger.removeHandler(handler)
+
+
+@contextmanager
+def log_context(**fields: str) -> Iterator[None]:
+    """Attach fields (request_id, model, ...) to records logged inside the block."""
+    token = _request_context.set({**(_request_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+def bind_log_context(**fields: str) -> None:
+    """
+    Add fields to the current task's log context, e.g. once a request is parsed.
+
+    Sets a copy: tasks spawned earlier share the dict they were created with
+    and must not see fields bound here. The enclosing log_context block
+    still drops them on exit.
+    """
+    _request_context.set({**(_request_context.get() or {}), **fields})
+
+
+def sampled_debug(logger: logging.Logger, msg: str, *args) -> None:
+    """
+    Debug log for per-chunk events, sampled at the configured rate.
+
+    Costs one level check when debug is disabled; arguments are formatted
+    only for sampled records.
+    """
+    if logger.isEnabledFor(logging.DEBUG) and random.random() < _debug_sample_rate:
+        logger.debug(msg, *args)
+
+
 def get_logger(name: str | None = None) -> logging.Logger:
     """Get a logger instance."""
     if name:
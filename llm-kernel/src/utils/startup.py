@@ -0,0 +1,63 @@
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+
+
+# Import of this module is the reference point: main.py imports it first
+_started = time.perf_counter()
+_phases: dict[str, float] = {}
+_warmup: dict[str, dict] = {}
+_ready_at: float | None = None
+
+
+def elapsed_ms(moment: float | None = None) -> float:
+    """Milliseconds from start to moment (default: now)."""
+    return round(((moment or time.perf_counter()) - _started) * 1000, 1)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a startup step that runs before the server accepts connections."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases[name] = _phases.get(name, 0.0) + round((time.perf_counter() - started) * 1000, 1)
+
+
+def mark_ready() -> float:
+    """Record that the server is about to accept connections. Returns ms since start."""
+    global _ready_at
+    _ready_at = time.perf_counter()
+    return elapsed_ms(_ready_at)
+
+
+async def warmup(name: str, work: Awaitable[object]) -> None:
+    """Run a warm-up step after startup, recording when it finished."""
+    _warmup[name] = {"status": "running", "done_at_ms": None}
+    started = time.perf_counter()
+    try:
+        await work
+    except Exception as e:
+        _warmup[name].update(status="failed", error=str(e))
+    else:
+        _warmup[name]["status"] = "done"
+    finally:
+        _warmup[name].update(
+            done_at_ms=elapsed_ms(),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+
+def warm() -> bool:
+    """Whether warm-up has started and all its steps have finished."""
+    return bool(_warmup) and all(step["status"] != "running" for step in _warmup.values())
+
+
+def report() -> dict:
+    """Startup timing breakdown, in milliseconds from process start."""
+    return {
+        "ready_at_ms": elapsed_ms(_ready_at) if _ready_at is not None else None,
+        "phases_ms": dict(_phases),
+        "warmup": {name: dict(step) for name, step in _warmup.items()},
+    }
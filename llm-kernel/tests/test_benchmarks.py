@@ -0,0 +1,47 @@
+from benchmarks import cases
+from benchmarks.harness import ALLOCATION_NOISE, compare, measure, platform_mismatch, select
+
+
+def test_scaling_cases_cover_one_to_many_workers():
+    names = {c.name for c in select("scaling/")}
+    for workers in cases.WORKER_COUNTS:
+        assert f"scaling/request_path/{workers}-workers" in names
+        assert f"scaling/shared_store/{workers}-workers" in names
+
+
+def test_scaling_case_splits_work_between_workers():
+    (request_path,) = select("scaling/request_path/2-workers")
+    with request_path.setup() as op:
+        assert op() > 0
+    (shared_store,) = select("scaling/shared_store/2-workers")
+    with shared_store.setup() as op:
+        assert op() == cases.SCALING_UPDATES
+
+
+def test_measure_counts_live_allocations():
+    result = measure(lambda: [object() for _ in range(5000)], min_time=0.001, rounds=1)
+    assert 5000 <= result.allocations < 6000
+    assert measure(lambda: None, min_time=0.001, rounds=1).allocations < ALLOCATION_NOISE
+
+
+def _document(allocations: int | None, **meta) -> dict:
+    result = {"ops_per_sec": 1000.0, "mean_ms": 1.0, "peak_kb": 10.0, "retained_kb": 0.0}
+    if allocations is not None:
+        result["allocations"] = allocations
+    return {"meta": {"python": "3.11.7", "platform": "Linux", "machine": "x86_64", **meta}, "results": {"op": result}}
+
+
+def test_compare_reports_allocation_regressions():
+    regressions, improvements = compare(_document(1000), _document(2000), threshold=0.2)
+    assert [(c.metric, c.baseline, c.current) for c in regressions] == [("allocations", 1000, 2000)]
+    assert improvements == []
+
+
+def test_compare_ignores_allocation_noise_and_old_baselines():
+    assert compare(_document(10), _document(60), threshold=0.2) == ([], [])
+    assert compare(_document(None), _document(5000), threshold=0.2) == ([], [])
+
+
+def test_platform_mismatch():
+    assert platform_mismatch(_document(0), _document(0)) == []
+    assert platform_mismatch(_document(0), _document(0, python="3.12.1")) == ["python"]
@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import json
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import blobs as blobs_route
+from src.core import openrouter
+from src.core.blob_store import BlobStore
+from src.core.openrouter import BLOB_CHUNK_BYTES, iter_request_body
+from src.models.config import BlobStoreConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, ContentPart
+
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def store(tmp_path) -> BlobStore:
+    store = BlobStore(BlobStoreConfig(max_blob_mb=1), root=tmp_path / "blobs")
+    store.open()
+    return store
+
+
+@pytest.fixture
+def client(monkeypatch, store) -> TestClient:
+    monkeypatch.setattr(blobs_route, "get_blob_store", lambda: store)
+    app = FastAPI()
+    app.include_router(blobs_route.router)
+    return TestClient(app)
+
+
+def chunked(data: bytes, size: int = 64 * 1024):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_chunked_upload_is_stored(client, store):
+    data = b"x" * (MB // 2)
+    reply = client.put("/blobs", content=chunked(data))
+    assert reply.status_code == 200
+    assert reply.json()["size"] == len(data)
+    assert store.size(reply.json()["hash"]) == len(data)
+
+
+def test_chunked_upload_over_limit_is_cut_off(monkeypatch, store):
+    monkeypatch.setattr(blobs_route, "get_blob_store", lambda: store)
+    app = FastAPI()
+    app.include_router(blobs_route.router)
+    body = list(chunked(b"x" * (4 * MB)))
+    received, sent = [], []
+
+    async def receive() -> dict:
+        received.append(body[len(received)])
+        return {"type": "http.request", "body": received[-1], "more_body": len(received) < len(body)}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "PUT",
+        "path": "/blobs",
+        "headers": [(b"transfer-encoding", b"chunked")],
+        "query_string": b"",
+    }
+    asyncio.run(app(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert store.stats()["stored"] == 0
+    # Reading stopped just past the limit rather than at the end of the body
+    assert sum(map(len, received)) < 2 * MB
+
+
+def test_blob_is_encoded_off_the_event_loop(monkeypatch, store):
+    data = bytes(range(256)) * (BLOB_CHUNK_BYTES // 128 + 1)
+    digest = store.put(data)
+    threads = []
+    b64encode = base64.b64encode
+
+    def record(chunk: bytes) -> bytes:
+        threads.append(threading.current_thread())
+        return b64encode(chunk)
+
+    monkeypatch.setattr(openrouter.base64, "b64encode", record)
+    chat_request = ChatCompletionRequest(
+        model="test/model",
+        messages=[ChatMessage(role="user", content="see", parts=[ContentPart(hash=digest, mime_type="image/png")])],
+    )
+
+    async def encode() -> bytes:
+        return b"".join([piece async for piece in iter_request_body(chat_request, stream=False, blobs=store)])
+
+    body = json.loads(asyncio.run(encode()))
+    url = body["messages"][0]["content"][1]["image_url"]["url"]
+    assert base64.b64decode(url.removeprefix("data:image/png;base64,")) == data
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
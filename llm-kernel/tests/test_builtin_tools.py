@@ -0,0 +1,42 @@
+import time
+
+import pytest
+
+from src.core.builtin_tools import MAX_INT_BITS, calculate
+from src.core.tools import ToolError
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("(2 + 3) * 4.5", "22.5"),
+    ("2 ** 10", "1024"),
+    ("2 ** -1", "0.5"),
+    ("1 ** 10 ** 100", "1"),
+    ("7 // 2 % 3", "0"),
+])
+def test_evaluates_arithmetic(expression, expected):
+    assert calculate(expression) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "((9**999)**999)**999",
+    "9**9**9",
+    "(2**4000) * (2**4000)",
+    "2 ** 5000",
+    "10.0 ** 400",
+])
+def test_rejects_huge_results_quickly(expression):
+    started = time.monotonic()
+    with pytest.raises(ToolError):
+        calculate(expression)
+    assert time.monotonic() - started < 0.5
+
+
+def test_result_within_budget_is_computed():
+    assert int(calculate("2 ** 2000")) == 2 ** 2000
+    assert int(calculate("(2 ** 1000) * (2 ** 1000)")).bit_length() <= MAX_INT_BITS
+
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "1 << 10", "a + 1", "1 / 0", "1 +"])
+def test_rejects_unsupported_or_invalid(expression):
+    with pytest.raises(ToolError):
+        calculate(expression)
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.routes import models as models_route
+from src.core.catalog import CatalogSnapshot, ModelCatalog
+from src.models.config import CatalogConfig
+from src.models.openrouter import OpenRouterModel
+
+
+MODELS = [
+    OpenRouterModel(id="mistralai/mistral-large", name="Mistral Large", context_length=128_000),
+    OpenRouterModel(id="mistralai/mixtral-8x7b", name="Mixtral 8x7B", context_length=32_000),
+    OpenRouterModel(id="nousresearch/hermes-2-mistral-7b", name="Hermes 2 Mistral 7B", context_length=8000),
+    OpenRouterModel(id="openai/gpt-4o", name="GPT-4o", context_length=128_000),
+    OpenRouterModel(id="undi95/toppy", name="Toppy (Mistral finetune)", context_length=4000),
+]
+
+
+@pytest.fixture
+def snapshot() -> CatalogSnapshot:
+    return CatalogSnapshot(MODELS, fetched_at=time.time())
+
+
+def ids(models: list[OpenRouterModel]) -> list[str]:
+    return [m.id for m in models]
+
+
+def test_search_returns_prefix_then_substring_matches(snapshot):
+    assert ids(snapshot.search("mistral")) == [
+        "mistralai/mistral-large",
+        "mistralai/mixtral-8x7b",
+        "nousresearch/hermes-2-mistral-7b",
+        "undi95/toppy",
+    ]
+
+
+def test_search_without_prefix_match_uses_substrings(snapshot):
+    assert ids(snapshot.search("GPT")) == ["openai/gpt-4o"]
+
+
+def test_search_filters(snapshot):
+    assert ids(snapshot.search("mistral", min_context=16_000)) == ["mistralai/mistral-large", "mistralai/mixtral-8x7b"]
+    assert len(snapshot.search()) == len(MODELS)
+
+
+@pytest.fixture
+def client(monkeypatch, snapshot) -> TestClient:
+    class Catalog:
+        async def get(self, force_refresh: bool = False) -> CatalogSnapshot:
+            return snapshot
+
+    monkeypatch.setattr(models_route, "get_model_catalog", lambda: Catalog())
+    app = FastAPI()
+    app.include_router(models_route.router)
+    return TestClient(app)
+
+
+def test_etag_revalidation(client):
+    etag = client.get("/models?q=mistral").headers["etag"]
+    assert etag.startswith('W/"')
+
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        assert client.get("/models?q=mistral", headers={"If-None-Match": header}).status_code == 304, header
+
+    for header in ('"other"', 'W/"other", "another"'):
+        assert client.get("/models?q=mistral", headers={"If-None-Match": header}).status_code == 200, header
+    # Another query is another representation
+    assert client.get("/models?q=gpt", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_forced_refresh_does_not_settle_for_disk_cache(tmp_path):
+    cache_path = tmp_path / "models.json"
+    cache_path.write_text(json.dumps({"fetched_at": time.time(), "models": [m.model_dump() for m in MODELS[:1]]}))
+    fetches = []
+
+    async def fetch() -> list[OpenRouterModel]:
+        fetches.append(time.time())
+        return MODELS
+
+    catalog = ModelCatalog(CatalogConfig(), cache_path, fetch)
+
+    async def scenario() -> CatalogSnapshot:
+        # First use reads the fresh disk cache; a forced refresh meanwhile still goes upstream
+        first = asyncio.create_task(catalog.get())
+        await asyncio.sleep(0)
+        forced = await catalog.get(force_refresh=True)
+        await first
+        return forced
+
+    forced = asyncio.run(scenario())
+    assert len(forced.models) == len(MODELS)
+    assert len(fetches) == 1
+    assert len(asyncio.run(catalog.get()).models) == len(MODELS)
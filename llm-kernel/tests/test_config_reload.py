@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import queue
+import stat
+
+import pytest
+
+from src.core.rate_limiter import RateLimited, RateLimiter
+from src.core.scheduler import RequestScheduler
+from src.core.tools import Tool, ToolExecutor
+from src.models.config import AppConfig, LoggingConfig, RateLimitConfig, SchedulerConfig, ServerConfig, ToolsConfig
+from src.models.openrouter import FunctionCall, ToolCall
+from src.server import app
+from src.utils import logging as logging_utils
+from src.utils.config import atomic_write_text
+
+
+@pytest.fixture
+def reload(monkeypatch):
+    """apply_config with only the given services running."""
+    def no_api_key() -> str:
+        raise ValueError("no key in tests")
+
+    monkeypatch.setattr(app, "get_api_key", no_api_key)
+    monkeypatch.setattr(app, "_app_config", None)
+    root = logging.getLogger("llm-kernel")
+    level = root.level
+
+    def install(
+        scheduler: RequestScheduler | None = None,
+        executor: ToolExecutor | None = None,
+        rate_limiter: RateLimiter | None = None,
+    ):
+        monkeypatch.setattr(app, "_scheduler", scheduler)
+        monkeypatch.setattr(app, "_tool_executor", executor)
+        monkeypatch.setattr(app, "_rate_limiter", rate_limiter)
+        return app.apply_config
+
+    yield install
+    root.setLevel(level)
+
+
+def test_raised_scheduler_limit_admits_queued_requests(reload):
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1))
+    config = AppConfig(scheduler=SchedulerConfig(max_concurrent=4))
+    apply_config = reload(scheduler=scheduler)
+
+    async def scenario() -> int:
+        admitted = asyncio.Event()
+        release = asyncio.Event()
+
+        async def request(i: int) -> None:
+            async with scheduler.slot(f"client-{i}", "test/model"):
+                if scheduler.stats()["active"] == 3:
+                    admitted.set()
+                await release.wait()
+
+        tasks = [asyncio.create_task(request(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["active"] == 1
+        await apply_config(config)
+        await asyncio.wait_for(admitted.wait(), 1)
+        active = scheduler.stats()["active"]
+        release.set()
+        await asyncio.gather(*tasks)
+        return active
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_raised_tool_limit_applies_to_next_calls(reload):
+    executor = ToolExecutor(ToolsConfig(max_concurrent=1))
+    apply_config = reload(executor=executor)
+    running = 0
+    peak = 0
+
+    async def handler(i: int) -> str:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return str(i)
+
+    executor.register(Tool(name="wait", description="", parameters={}, handler=handler, cacheable=False))
+    calls = [ToolCall(id=f"call-{i}", function=FunctionCall(name="wait", arguments=f'{{"i": {i}}}')) for i in range(4)]
+
+    async def scenario() -> None:
+        await apply_config(AppConfig(tools=ToolsConfig(max_concurrent=4)))
+        results = await executor.execute(calls)
+        assert [r.content for r in results] == ["0", "1", "2", "3"]
+
+    asyncio.run(scenario())
+    assert peak == 4
+
+
+def test_lowered_rate_limit_shrinks_existing_buckets(reload):
+    rate_limiter = RateLimiter(RateLimitConfig(requests_per_sec=0.01, request_burst=20, max_wait_sec=0))
+    apply_config = reload(rate_limiter=rate_limiter)
+
+    lowered = AppConfig(rate_limit=RateLimitConfig(requests_per_sec=0.01, request_burst=2, max_wait_sec=0))
+
+    async def scenario() -> None:
+        # 19 of 20 requests left in the bucket; 2 fit the lowered burst
+        await rate_limiter.acquire("sk-test", "test/model", 10)
+        await apply_config(lowered)
+        for _ in range(2):
+            await rate_limiter.acquire("sk-test", "test/model", 10)
+        with pytest.raises(RateLimited):
+            await rate_limiter.acquire("sk-test", "test/model", 10)
+
+    asyncio.run(scenario())
+
+
+def test_log_level_is_applied_and_restart_only_changes_are_reported(reload, monkeypatch, caplog):
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    monkeypatch.setattr(logging_utils, "_listener", logging.handlers.QueueListener(queue.SimpleQueue(), handler))
+    apply_config = reload()
+
+    asyncio.run(apply_config(AppConfig()))
+    changed = AppConfig(server=ServerConfig(port=9000), logging=LoggingConfig(level="DEBUG", format="json"))
+    asyncio.run(apply_config(changed))
+
+    assert logging.getLogger("llm-kernel").level == logging.DEBUG
+    assert handler.level == logging.DEBUG
+    assert "take effect after restart: server, logging.format" in caplog.text
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX file modes")
+def test_atomic_write_keeps_file_mode(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("{}")
+    path.chmod(0o644)
+    atomic_write_text(path, '{"a": 1}')
+    assert path.read_text() == '{"a": 1}'
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
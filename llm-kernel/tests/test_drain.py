@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.drain import DrainController
+from src.core.scheduler import AdmissionRejected
+from src.models.config import AppConfig
+from src.server import websocket
+
+
+def test_drain_rejects_new_requests_and_waits_for_running_ones():
+    drain = DrainController()
+    notices = []
+
+    async def notify(remaining_sec: float) -> None:
+        notices.append(remaining_sec)
+
+    async def request(finish: asyncio.Event) -> None:
+        drain.admit()
+        with drain.track():
+            await finish.wait()
+
+    async def scenario() -> tuple[bool, float]:
+        drain.add_connection(notify)
+        finish = asyncio.Event()
+        running = asyncio.create_task(request(finish))
+        await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        draining = asyncio.create_task(drain.drain(5, "test"))
+        await asyncio.sleep(0.01)
+        assert not draining.done()
+        assert notices == [5]
+        with pytest.raises(AdmissionRejected) as rejected:
+            drain.admit()
+        assert rejected.value.code == "DRAINING"
+
+        finish.set()
+        await running
+        return await draining, time.monotonic() - started
+
+    drained, elapsed = asyncio.run(scenario())
+    assert drained
+    assert elapsed < 1
+    stats = drain.stats()
+    assert (stats["draining"], stats["reason"], stats["active_requests"]) == (True, "test", 0)
+    assert (stats["drains"], stats["rejected"], stats["finished_while_draining"], stats["abandoned"]) == (1, 1, 1, 0)
+
+
+def test_drain_gives_up_at_the_deadline():
+    drain = DrainController()
+
+    async def scenario() -> tuple[bool, float]:
+        with drain.track():
+            started = time.monotonic()
+            drained = await drain.drain(0.1)
+            return drained, time.monotonic() - started
+
+    drained, elapsed = asyncio.run(scenario())
+    assert not drained
+    assert 0.05 < elapsed < 1
+    assert drain.stats()["abandoned"] == 1
+
+
+@pytest.fixture
+def journal() -> list:
+    return []
+
+
+@pytest.fixture
+def draining(monkeypatch, journal) -> DrainController:
+    """WebSocket endpoint wired to a controller that has started draining."""
+    drain = DrainController()
+    asyncio.run(drain.drain(30))
+    monkeypatch.setattr(websocket, "get_drain_controller", lambda: drain)
+    monkeypatch.setattr(websocket, "get_app_config", lambda: AppConfig())
+    monkeypatch.setattr(websocket, "get_openrouter_client", lambda: None)
+    monkeypatch.setattr(websocket, "get_speculator", lambda: SimpleNamespace(drop_client=lambda client_id: None))
+    monkeypatch.setattr(websocket, "get_model_catalog", lambda: SimpleNamespace(cost=lambda *args: None))
+    monkeypatch.setattr(websocket, "get_request_journal", lambda: SimpleNamespace(record=journal.append))
+    return drain
+
+
+def test_client_of_draining_server_is_told_and_rejected(draining, journal):
+    app = FastAPI()
+    app.include_router(websocket.router)
+    request = {"request_id": "r-1", "model": "test/model", "user_prompt": "hi"}
+
+    with TestClient(app).websocket_connect("/ws?client_id=client") as ws:
+        notice = ws.receive_json()
+        ws.send_text(json.dumps(request))
+        ack = ws.receive_json()
+
+    assert (notice["type"], notice["event"]) == ("control", "draining")
+    assert 0 < notice["deadline_ms"] <= 30_000
+    assert (ack["type"], ack["request_id"], ack["accepted"], ack["error_code"]) == ("ack", "r-1", False, "DRAINING")
+    assert [entry.outcome for entry in journal] == ["DRAINING"]
+    assert draining.stats()["rejected"] == 1
@@ -0,0 +1,89 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from src.core.journal import JournalEntry, RequestJournal
+from src.models.config import JournalConfig
+
+
+def entry(i: int) -> JournalEntry:
+    return JournalEntry(
+        ts=time.time(),
+        request_id=f"r-{i}",
+        client_id="client",
+        persona="Alice",
+        model="test/model",
+        priority="interactive",
+        stream=True,
+        prompt_tokens=10,
+        completion_tokens=5,
+    )
+
+
+def stored(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM requests").fetchone()[0]
+
+
+def test_close_flushes_entries_waiting_for_the_interval(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+
+    async def scenario() -> RequestJournal:
+        journal = RequestJournal(JournalConfig(flush_interval_ms=60_000), path)
+        await journal.start()
+        for i in range(3):
+            journal.record(entry(i))
+        await asyncio.sleep(0.05)  # Writer is now holding the batch back for the interval
+        started = time.monotonic()
+        await journal.close()
+        assert time.monotonic() - started < 5
+        return journal
+
+    journal = asyncio.run(scenario())
+    assert journal.stats()["written"] == 3
+    assert journal.stats()["dropped"] == 0
+    assert stored(path) == 3
+
+
+def test_close_waits_for_write_in_progress(tmp_path, monkeypatch):
+    path = tmp_path / "journal.sqlite3"
+    writing = threading.Event()
+
+    async def scenario() -> RequestJournal:
+        journal = RequestJournal(JournalConfig(flush_interval_ms=0), path)
+        write_sync = journal._write_sync
+
+        def slow_write(batch):
+            writing.set()
+            time.sleep(0.2)
+            write_sync(batch)
+
+        monkeypatch.setattr(journal, "_write_sync", slow_write)
+        await journal.start()
+        journal.record(entry(0))
+        while not writing.is_set():
+            await asyncio.sleep(0.01)
+        journal.record(entry(1))  # Arrives while the first batch is being written
+        await journal.close()
+        return journal
+
+    journal = asyncio.run(scenario())
+    assert journal.stats()["written"] == 2
+    assert stored(path) == 2
+
+
+def test_aggregate_after_close_returns_nothing(tmp_path):
+    async def scenario() -> tuple[list[dict], list[dict]]:
+        journal = RequestJournal(JournalConfig(flush_interval_ms=0), tmp_path / "journal.sqlite3")
+        await journal.start()
+        journal.record(entry(0))
+        await asyncio.sleep(0.05)
+        before = await journal.aggregate(0, time.time() + 1)
+        await journal.close()
+        return before, await journal.aggregate(0, time.time() + 1)
+
+    before, after = asyncio.run(scenario())
+    assert before[0]["requests"] == 1
+    assert before[0]["prompt_tokens"] == 10
+    assert after == []
@@ -0,0 +1,62 @@
+import ast
+import asyncio
+import logging
+from pathlib import Path
+
+from src.utils.logging import _ContextFilter, bind_log_context, log_context
+
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+LOG_METHODS = {"debug", "info", "warning", "error", "exception", "critical"}
+
+
+def context_of(record_name: str) -> dict:
+    record = logging.LogRecord(record_name, logging.INFO, __file__, 0, "msg", None, None)
+    _ContextFilter().filter(record)
+    return {key: getattr(record, key) for key in ("request_id", "model", "client_id") if hasattr(record, key)}
+
+
+def test_bound_fields_do_not_leak_into_sibling_tasks():
+    async def scenario() -> tuple[dict, dict, dict]:
+        bound = asyncio.Event()
+
+        async def first() -> dict:
+            bind_log_context(model="test/a")
+            bound.set()
+            return context_of("first")
+
+        async def second() -> dict:
+            await bound.wait()
+            return context_of("second")
+
+        with log_context(request_id="r-1"):
+            contexts = await asyncio.gather(first(), second())
+            return *contexts, context_of("parent")
+
+    first, second, parent = asyncio.run(scenario())
+    assert first == {"request_id": "r-1", "model": "test/a"}
+    assert second == {"request_id": "r-1"}
+    assert parent == {"request_id": "r-1"}
+
+
+def test_bound_fields_end_with_the_log_context_block():
+    with log_context(request_id="r-1"):
+        bind_log_context(client_id="client")
+        assert context_of("inside") == {"request_id": "r-1", "client_id": "client"}
+    assert context_of("outside") == {}
+
+
+def test_log_messages_are_formatted_lazily():
+    # An f-string message is built even when the level is off, and on the event loop rather than the log thread
+    eager = []
+    for path in SRC.rglob("*.py"):
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in LOG_METHODS
+                and node.args
+                and isinstance(node.args[0], ast.JoinedStr)
+            ):
+                eager.append(f"{path.relative_to(SRC)}:{node.lineno}")
+    assert eager == []
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from src.core.message_builder import build_chat_request
+from src.core.openrouter import iter_request_body
+from src.models.config import DefaultsConfig
+from src.models.openrouter import ChatMessage, HistoryMessage
+from src.models.requests import LLMRequest
+from src.server.protocol import SerializationFormat, deserialize_request, load_protobuf
+
+
+HISTORY = [
+    {"role": "system", "name": "Narrator", "content": "The meeting starts."},
+    {"role": "user", "name": "Bob", "content": "Shall we start?"},
+    {"role": "assistant", "name": "Alice", "content": "Yes, let's."},
+    {"role": "user", "content": "Unnamed line"},
+]
+
+
+def request(**fields) -> LLMRequest:
+    return LLMRequest.model_validate({
+        "request_id": "r-1",
+        "model": "test/model",
+        "system_prompt": "You are Alice.",
+        "user_prompt": "Kirill: What about Monday?",
+        "messages": HISTORY,
+        **fields,
+    })
+
+
+def sent(chat_request) -> list[dict]:
+    async def encode() -> bytes:
+        return b"".join([piece async for piece in iter_request_body(chat_request, stream=False)])
+
+    return json.loads(asyncio.run(encode()))["messages"]
+
+
+def test_only_named_user_turns_are_labelled():
+    messages = build_chat_request(request(), DefaultsConfig()).messages
+    assert [(m.role, m.content) for m in messages] == [
+        ("system", "You are Alice."),
+        ("system", "The meeting starts."),
+        ("user", "Bob: Shall we start?"),
+        ("assistant", "Yes, let's."),
+        ("user", "Unnamed line"),
+        ("user", "Kirill: What about Monday?"),
+    ]
+
+
+def test_labels_can_be_turned_off():
+    messages = build_chat_request(request(), DefaultsConfig(speaker_labels=False)).messages
+    assert messages[2].content == "Shall we start?"
+
+
+def test_history_is_not_copied_into_models():
+    llm_request = request()
+    messages = build_chat_request(llm_request, DefaultsConfig()).messages
+    assert all(type(m) is HistoryMessage for m in messages[1:-1])
+    assert isinstance(messages[0], ChatMessage) and isinstance(messages[-1], ChatMessage)
+    # Unlabelled content is the client's str itself
+    assert messages[3].content is llm_request.messages[2].content
+
+
+def test_streamed_and_dumped_bodies_match():
+    chat_request = build_chat_request(request(), DefaultsConfig())
+    dumped = chat_request.model_dump(exclude_none=True)["messages"]
+    assert sent(chat_request) == dumped
+    assert dumped[2] == {"role": "user", "content": "Bob: Shall we start?"}
+
+
+def test_history_survives_both_wire_formats():
+    fields = {
+        "request_id": "r-1",
+        "model": "test/model",
+        "user_prompt": "Kirill: What about Monday?",
+        "messages": HISTORY,
+    }
+    from_json = deserialize_request(json.dumps(fields), SerializationFormat.JSON)
+
+    message = load_protobuf().WebSocketMessage()
+    for field, value in fields.items():
+        if field == "messages":
+            for item in value:
+                message.request.messages.add(**item)
+        else:
+            setattr(message.request, field, value)
+    from_protobuf = deserialize_request(message.SerializeToString(), SerializationFormat.PROTOBUF)
+
+    expected = [(m["role"], m.get("name", ""), m["content"]) for m in HISTORY]
+    for parsed in (from_json, from_protobuf):
+        assert [(m.role, m.name, m.content) for m in parsed.messages] == expected
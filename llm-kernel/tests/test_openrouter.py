@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from src.core.journal import JournalEntry
+from src.core.openrouter import OpenRouterClient, OpenRouterError, OpenRouterTimeout
+from src.core.stop_detector import StopDetectors
+from src.models.config import OpenRouterConfig, StopDetectorConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage
+from src.models.requests import LLMRequest
+from src.server import websocket
+from src.server.websocket import PARTIAL_FINISH_REASON
+
+
+HANG_SEC = 30
+
+
+def chat() -> ChatCompletionRequest:
+    return ChatCompletionRequest(model="test/model", messages=[ChatMessage(role="user", content="hi")])
+
+
+def sse(content: str) -> bytes:
+    chunk = {"id": "gen", "model": "test/model", "choices": [{"index": 0, "delta": {"content": content}}]}
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+def make_client(handler, **config) -> tuple[OpenRouterClient, list[httpx.Request]]:
+    """Client whose upstream is handler; every request it sends is recorded."""
+    requests = []
+
+    async def record(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return await handler(request, len(requests))
+
+    client = OpenRouterClient("sk-test", OpenRouterConfig(**config))
+    client._client = httpx.AsyncClient(base_url=client.config.base_url, transport=httpx.MockTransport(record))
+    return client, requests
+
+
+def streamed(*parts: bytes | float | Exception) -> httpx.Response:
+    """SSE response sending parts in order: bytes are sent, floats are pauses, exceptions break the stream."""
+    async def body():
+        for part in parts:
+            if isinstance(part, float):
+                await asyncio.sleep(part)
+            elif isinstance(part, Exception):
+                raise part
+            else:
+                yield part
+
+    return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+
+async def collect(client: OpenRouterClient, deadline: float | None = None) -> list[str]:
+    return [
+        chunk.choices[0].delta.content
+        async for chunk in client.chat_completion_stream(chat(), deadline)
+    ]
+
+
+def test_deadline_hit_while_retrying_is_a_timeout():
+    async def handler(request, attempt):
+        if attempt == 1:
+            await asyncio.sleep(0.1)
+            return httpx.Response(503, text="overloaded")
+        await asyncio.sleep(HANG_SEC)
+
+    client, requests = make_client(handler, max_retries=3)
+
+    async def scenario() -> float:
+        started = time.monotonic()
+        with pytest.raises(OpenRouterTimeout):
+            await client.chat_completion(chat(), deadline=started + 0.3)
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+    # OpenRouterTimeout is what the endpoint reports to the client as TIMEOUT
+    assert len(requests) == 2
+    assert elapsed < 1
+
+
+def test_idle_stream_is_cut_at_idle_timeout():
+    async def handler(request, attempt):
+        return streamed(sse("Hello"), float(HANG_SEC))
+
+    client, _ = make_client(handler, idle_timeout_sec=0.1)
+    received = []
+
+    async def scenario() -> float:
+        started = time.monotonic()
+        with pytest.raises(OpenRouterTimeout, match="No stream data"):
+            async for chunk in client.chat_completion_stream(chat()):
+                received.append(chunk.choices[0].delta.content)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 1
+    assert received == ["Hello"]
+
+
+def test_keep_alives_do_not_count_as_first_token():
+    async def handler(request, attempt):
+        return streamed(*[b": OPENROUTER PROCESSING\n\n", 0.05] * 100)
+
+    client, _ = make_client(handler, first_token_timeout_sec=0.2, idle_timeout_sec=10)
+
+    async def scenario() -> float:
+        started = time.monotonic()
+        with pytest.raises(OpenRouterTimeout, match="No first token"):
+            await collect(client)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 1
+
+
+def test_request_deadline_caps_stream_timeouts():
+    async def handler(request, attempt):
+        return streamed(sse("Hello"), 0.05, sse(" there"), float(HANG_SEC))
+
+    client, _ = make_client(handler, idle_timeout_sec=10)
+
+    async def scenario() -> None:
+        with pytest.raises(OpenRouterTimeout, match="deadline"):
+            await collect(client, deadline=time.monotonic() + 0.3)
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def rounds(monkeypatch):
+    """collect_round against a client, for a non-streaming client request."""
+    monkeypatch.setattr(websocket, "get_stop_detectors", lambda: StopDetectors(StopDetectorConfig()))
+
+    def run(client: OpenRouterClient):
+        request = LLMRequest(request_id="r-1", model="test/model", user_prompt="hi", stream=False)
+        entry = JournalEntry(
+            ts=time.time(), request_id="r-1", client_id="client", persona="", model="test/model",
+            priority="interactive", stream=False,
+        )
+        return asyncio.run(
+            websocket.collect_round(None, request, None, client, chat(), None, entry, time.monotonic(), None)
+        )
+
+    return run
+
+
+def test_failure_before_first_token_is_retried(rounds):
+    async def handler(request, attempt):
+        if attempt == 1:
+            return httpx.Response(503, text="overloaded")
+        return streamed(sse("Hello"), b"data: [DONE]\n\n")
+
+    client, requests = make_client(handler, max_retries=2)
+    turn = rounds(client)
+    assert len(requests) == 2
+    assert turn.content == "Hello"
+
+
+def test_failure_after_first_token_is_not_retried(rounds):
+    async def handler(request, attempt):
+        return streamed(sse("Hello"), httpx.ReadError("connection reset"))
+
+    client, requests = make_client(handler, max_retries=2)
+    turn = rounds(client)
+    assert len(requests) == 1
+    assert (turn.content, turn.finish_reason) == ("Hello", PARTIAL_FINISH_REASON)
+
+
+def test_timeout_is_not_retried(rounds):
+    async def handler(request, attempt):
+        return streamed(float(HANG_SEC))
+
+    client, requests = make_client(handler, max_retries=2, first_token_timeout_sec=0.1)
+    with pytest.raises(OpenRouterTimeout):
+        rounds(client)
+    assert len(requests) == 1
+
+
+def test_error_status_is_an_upstream_error():
+    async def handler(request, attempt):
+        return httpx.Response(400, text="bad request")
+
+    client, _ = make_client(handler)
+    with pytest.raises(OpenRouterError) as error:
+        asyncio.run(collect(client))
+    assert not isinstance(error.value, OpenRouterTimeout)
+    assert error.value.status_code == 400
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.openrouter import OpenRouterError
+from src.core.rate_limiter import RateLimiter
+from src.core.scheduler import AdmissionRejected, Priority, RequestScheduler
+from src.core.shared_state import SharedStore
+from src.models.config import RateLimitConfig, SchedulerConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage
+from src.server import app
+
+
+API_KEY = "sk-test"
+MODEL = "test/model"
+TOKENS_PER_MIN = 60_000
+
+
+def available(limiter: RateLimiter) -> float:
+    (bucket,) = limiter.stats()["buckets"]
+    return bucket["tokens_available"]
+
+
+def test_reconcile_corrects_estimate_with_usage():
+    async def scenario(limiter: RateLimiter) -> None:
+        reservation = await limiter.acquire(API_KEY, MODEL, 1000)
+        limiter.reconcile(reservation, 1500)
+
+    limiter = RateLimiter(RateLimitConfig(tokens_per_min=TOKENS_PER_MIN))
+    asyncio.run(scenario(limiter))
+    assert available(limiter) == pytest.approx(TOKENS_PER_MIN - 1500, abs=2)
+
+
+def test_reconcile_without_usage_refunds_reservation():
+    async def scenario(limiter: RateLimiter) -> None:
+        reservation = await limiter.acquire(API_KEY, MODEL, 1000)
+        limiter.reconcile(reservation, 0)
+
+    limiter = RateLimiter(RateLimitConfig(tokens_per_min=TOKENS_PER_MIN))
+    asyncio.run(scenario(limiter))
+    assert available(limiter) == pytest.approx(TOKENS_PER_MIN, abs=2)
+
+
+class _FailingClient:
+    api_key = API_KEY
+
+    async def chat_completion(self, request):
+        raise OpenRouterError("upstream is down")
+
+
+@pytest.fixture
+def background(monkeypatch):
+    """complete_in_background wired to a real limiter and scheduler, with a failing upstream."""
+    limiter = RateLimiter(RateLimitConfig(tokens_per_min=TOKENS_PER_MIN))
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1, max_queue_depth=0))
+    monkeypatch.setattr(app, "get_openrouter_client", lambda: _FailingClient())
+    monkeypatch.setattr(app, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(app, "get_scheduler", lambda: scheduler)
+    monkeypatch.setattr(app, "get_model_catalog", lambda: SimpleNamespace(cost=lambda *args: None))
+    monkeypatch.setattr(app, "get_request_journal", lambda: SimpleNamespace(record=lambda entry: None))
+    return limiter, scheduler
+
+
+def _request() -> ChatCompletionRequest:
+    return ChatCompletionRequest(model=MODEL, messages=[ChatMessage(role="user", content="word " * 2000)])
+
+
+def test_upstream_error_refunds_reservation(background):
+    limiter, _ = background
+    with pytest.raises(OpenRouterError):
+        asyncio.run(app.complete_in_background(_request(), client_id="test"))
+    assert available(limiter) == pytest.approx(TOKENS_PER_MIN, abs=2)
+
+
+def test_queue_rejection_refunds_reservation(background):
+    limiter, scheduler = background
+
+    async def scenario() -> None:
+        async with scheduler.slot("other", MODEL, Priority.INTERACTIVE):
+            await app.complete_in_background(_request(), client_id="test")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        asyncio.run(scenario())
+    assert rejected.value.code == "QUEUE_FULL"
+    assert available(limiter) == pytest.approx(TOKENS_PER_MIN, abs=2)
+
+
+def test_cancelled_request_refunds_reservation(background):
+    limiter, scheduler = background
+    scheduler.config.max_queue_depth = 1
+
+    async def scenario() -> None:
+        async with scheduler.slot("other", MODEL, Priority.INTERACTIVE):
+            task = asyncio.create_task(app.complete_in_background(_request(), client_id="test"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(scenario())
+    assert available(limiter) == pytest.approx(TOKENS_PER_MIN, abs=2)
+
+
+RUNTIME_COMPONENTS = (
+    "get_scheduler", "get_loop_monitor", "get_request_journal", "get_response_cache", "get_summarizer",
+    "get_tool_executor", "get_speculator", "get_stop_detectors", "get_drain_controller", "get_blob_store",
+)
+
+
+def test_runtime_stats_read_shared_buckets_off_the_event_loop(monkeypatch, tmp_path):
+    store = SharedStore(tmp_path / "shared.sqlite3")
+    store.open()
+    limiter = RateLimiter(RateLimitConfig(tokens_per_min=TOKENS_PER_MIN), store=store)
+    threads = []
+    items = store.items
+
+    def record(namespace: str, max_age_sec: float | None = None) -> dict[str, dict]:
+        threads.append(threading.current_thread())
+        return items(namespace, max_age_sec)
+
+    component = SimpleNamespace(stats=dict)
+    for getter in RUNTIME_COMPONENTS:
+        monkeypatch.setattr(app, getter, lambda: component)
+    monkeypatch.setattr(app, "get_openrouter_client", lambda: SimpleNamespace(pool_stats=dict))
+    monkeypatch.setattr(app, "get_rate_limiter", lambda: limiter)
+
+    async def scenario() -> dict:
+        await limiter.acquire(API_KEY, MODEL, 1000)
+        monkeypatch.setattr(store, "items", record)
+        return await app.runtime_stats()
+
+    stats = asyncio.run(scenario())
+    store.close()
+    (bucket,) = stats["rate_limit"]["buckets"]
+    assert bucket["tokens_available"] == pytest.approx(TOKENS_PER_MIN - 1000, abs=2)
+    assert threads and threading.main_thread() not in threads
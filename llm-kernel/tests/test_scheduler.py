@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from src.core.scheduler import AdmissionRejected, Priority, RequestScheduler
+from src.models.config import SchedulerConfig
+
+
+MODEL = "test/model"
+
+
+def queued(scheduler: RequestScheduler) -> int:
+    return sum(scheduler.stats()["queue_depth"].values())
+
+
+def test_interactive_requests_are_admitted_before_background_ones():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1))
+    order = []
+
+    async def request(name: str, priority: Priority) -> None:
+        async with scheduler.slot(name, MODEL, priority):
+            order.append(name)
+
+    async def scenario() -> None:
+        async with scheduler.slot("holder", MODEL):
+            # Background work queued first still waits for the later interactive requests
+            tasks = [asyncio.create_task(request(f"background-{i}", Priority.BACKGROUND)) for i in range(2)]
+            await asyncio.sleep(0.01)
+            tasks += [asyncio.create_task(request(f"interactive-{i}", Priority.INTERACTIVE)) for i in range(2)]
+            await asyncio.sleep(0.01)
+            assert queued(scheduler) == 4
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["interactive-0", "interactive-1", "background-0", "background-1"]
+
+
+def test_background_limit_leaves_room_for_interactive():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=2, max_background_concurrent=1))
+
+    async def scenario() -> None:
+        async with scheduler.slot("batch-1", MODEL, Priority.BACKGROUND):
+            waiting = asyncio.create_task(scheduler._acquire("batch-2", MODEL, Priority.BACKGROUND))
+            await asyncio.sleep(0.01)
+            assert not waiting.done()
+            async with scheduler.slot("chat", MODEL, Priority.INTERACTIVE):
+                assert scheduler.stats()["active"] == 2
+            waiting.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_rejected():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1, max_queue_depth=1))
+
+    async def scenario() -> None:
+        async with scheduler.slot("a", MODEL):
+            waiting = asyncio.create_task(scheduler._acquire("b", MODEL, Priority.INTERACTIVE))
+            await asyncio.sleep(0.01)
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with scheduler.slot("c", MODEL):
+                    pass
+            assert rejected.value.code == "QUEUE_FULL"
+            waiting.cancel()
+
+    asyncio.run(scenario())
+    assert scheduler.stats()["rejected"] == {"QUEUE_FULL": 1}
+
+
+def test_queue_timeout_is_rejected():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1, max_queue_time_sec=0.05))
+
+    async def scenario() -> None:
+        async with scheduler.slot("a", MODEL):
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with scheduler.slot("b", MODEL):
+                    pass
+            assert rejected.value.code == "QUEUE_TIMEOUT"
+            assert queued(scheduler) == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1))
+
+    async def scenario() -> None:
+        async with scheduler.slot("a", MODEL):
+            waiting = asyncio.create_task(scheduler._acquire("b", MODEL, Priority.INTERACTIVE))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            assert queued(scheduler) == 0
+        # The slot freed by "a" is not handed to the cancelled waiter
+        assert scheduler.stats()["active"] == 0
+        async with scheduler.slot("c", MODEL):
+            assert scheduler.stats()["active"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_as_its_slot_is_granted_releases_it():
+    scheduler = RequestScheduler(SchedulerConfig(max_concurrent=1))
+
+    async def waiter() -> None:
+        async with scheduler.slot("b", MODEL):
+            await asyncio.sleep(1)
+
+    async def scenario() -> None:
+        async with scheduler.slot("a", MODEL):
+            task = asyncio.create_task(waiter())
+            await asyncio.sleep(0.01)
+        # Leaving the block granted "b" the slot; cancel before it gets to run
+        assert scheduler.stats()["active"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.stats()["active"] == 0
+        assert scheduler.stats()["active_by_priority"][Priority.INTERACTIVE.value] == 0
+
+    asyncio.run(scenario())
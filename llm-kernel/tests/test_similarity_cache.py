@@ -0,0 +1,85 @@
+import pytest
+
+from src.core.similarity_cache import CachedResponse, SimilarityCache, context_key
+from src.models.config import SimilarityCacheConfig
+
+
+PROMPT = "What is the best way to learn to play the guitar as an adult beginner?"
+KEY = context_key("test/model", "Alice", "You are Alice.", ("user", "Bob", "Hi Alice!"))
+
+
+def response(content: str = "Practice every day.") -> CachedResponse:
+    return CachedResponse(content=content, finish_reason="stop", prompt_tokens=20, completion_tokens=5)
+
+
+@pytest.fixture
+def cache() -> SimilarityCache:
+    cache = SimilarityCache(SimilarityCacheConfig(enabled=True, threshold=0.8))
+    cache.store(KEY, cache.fingerprint(PROMPT), "test/model", PROMPT, response())
+    return cache
+
+
+def lookup(cache: SimilarityCache, prompt: str, key: str = KEY):
+    return cache.lookup(key, cache.fingerprint(prompt), prompt)
+
+
+@pytest.mark.parametrize("prompt", [
+    PROMPT,
+    "what is the BEST way to learn to play the guitar as an adult beginner",
+    "What's the best way to learn to play the guitar, as an adult beginner?",
+    "What is the best way to learn to play guitar as an adult beginner?",
+])
+def test_near_duplicates_hit(cache, prompt):
+    hit = lookup(cache, prompt)
+    assert hit is not None
+    assert hit.similarity >= 0.8
+    assert hit.response.content == "Practice every day."
+
+
+@pytest.mark.parametrize("prompt", [
+    "What is the best way to learn to play the violin as a child?",
+    "How do I restring a guitar?",
+])
+def test_different_prompts_miss(cache, prompt):
+    assert lookup(cache, prompt) is None
+
+
+def test_numbers_must_match():
+    cache = SimilarityCache(SimilarityCacheConfig(enabled=True, threshold=0.5))
+    prompt = "Please tell me how much is 1234 plus 5678 in the decimal system"
+    cache.store(KEY, cache.fingerprint(prompt), "test/model", prompt, response("6912"))
+    assert lookup(cache, prompt.replace("5678", "5679")) is None
+    assert lookup(cache, prompt) is not None
+
+
+@pytest.mark.parametrize("key", [
+    context_key("other/model", "Alice", "You are Alice.", ("user", "Bob", "Hi Alice!")),
+    context_key("test/model", "Bob", "You are Alice.", ("user", "Bob", "Hi Alice!")),
+    context_key("test/model", "Alice", "You are Bob.", ("user", "Bob", "Hi Alice!")),
+    context_key("test/model", "Alice", "You are Alice.", ("user", "Bob", "Hi Alice! How are you?")),
+    context_key("test/model", "Alice", "You are Alice.", ("user", "Carol", "Hi Alice!")),
+    context_key("test/model", "Alice", "You are Alice."),
+])
+def test_other_context_never_hits(cache, key):
+    assert lookup(cache, PROMPT, key) is None
+    assert lookup(cache, PROMPT.lower(), key) is None
+
+
+def test_context_key_keeps_field_boundaries():
+    assert context_key("m", "p", "", ("user", "", "a\0b")) != context_key("m", "p", "", ("user", "", "a", "b"))
+    assert context_key("m", "p", "", ("ab", "")) != context_key("m", "p", "", ("a", "b"))
+    assert context_key("m", "p", "", ("",)) != context_key("m", "p", "")
+
+
+def test_short_prompts_match_exactly_only():
+    cache = SimilarityCache(SimilarityCacheConfig(enabled=True, threshold=0.5))
+    cache.store(KEY, cache.fingerprint("Good morning!"), "test/model", "Good morning!", response("Morning!"))
+    assert lookup(cache, "good morning") is not None
+    assert lookup(cache, "Good mornings!") is None
+
+
+def test_rejected_hit_evicts_entry(cache):
+    hit = lookup(cache, PROMPT)
+    assert cache.reject_hit(hit.hit_id)
+    assert lookup(cache, PROMPT) is None
+    assert cache.stats()["false_positives"] == 1
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import speculation as speculation_module
+from src.core.speculation import Speculation, SpeculativeGenerator
+from src.models.config import AppConfig, SpeculationConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, StreamChoice, StreamChunk, StreamDelta
+from src.models.requests import LLMRequest
+from src.server import websocket
+from src.server.protocol import SerializationFormat, deserialize_request, load_protobuf
+
+
+HISTORY = [
+    {"role": "user", "name": "Bob", "content": "Shall we start?"},
+    {"role": "assistant", "name": "Alice", "content": "Yes, let's."},
+]
+
+
+def chunks(*pieces: str) -> list[StreamChunk]:
+    return [
+        StreamChunk(id="gen", model="test/model", choices=[StreamChoice(delta=StreamDelta(content=piece))])
+        for piece in pieces
+    ]
+
+
+def make_generator(reply: tuple[str, ...] = ("Sounds ", "good."), **config) -> SpeculativeGenerator:
+    async def upstream(request, entry):
+        entry.queue_ms = 0.0
+        for chunk in chunks(*reply):
+            yield chunk
+
+    return SpeculativeGenerator(SpeculationConfig(enabled=True, **config), stream=upstream)
+
+
+@pytest.fixture
+def speculator(monkeypatch) -> SpeculativeGenerator:
+    """speculate_next wired to a generator with a canned upstream."""
+    generator = make_generator()
+
+    class Summarizer:
+        async def apply(self, chat_request):
+            return chat_request
+
+    monkeypatch.setattr(websocket, "get_speculator", lambda: generator)
+    monkeypatch.setattr(websocket, "get_drain_controller", lambda: SimpleNamespace(draining=False))
+    monkeypatch.setattr(websocket, "get_summarizer", lambda: Summarizer())
+    monkeypatch.setattr(websocket, "get_app_config", lambda: AppConfig())
+    return generator
+
+
+def protobuf_request(fields: dict) -> LLMRequest:
+    message = load_protobuf().WebSocketMessage()
+    for name, value in fields.items():
+        if name == "messages":
+            for item in value:
+                message.request.messages.add(**item)
+        elif name == "next_request":
+            hint = message.request.next_request
+            for key, item in value.items():
+                if key == "messages":
+                    for history_item in item:
+                        hint.messages.add(**history_item)
+                else:
+                    setattr(hint, key, item)
+        else:
+            setattr(message.request, name, value)
+    return deserialize_request(message.SerializeToString(), SerializationFormat.PROTOBUF)
+
+
+@pytest.mark.parametrize("fmt", [SerializationFormat.JSON, SerializationFormat.PROTOBUF])
+def test_history_request_with_next_request_is_claimed(speculator, fmt):
+    current = {
+        "request_id": "r-1",
+        "model": "test/model",
+        "persona": "Alice",
+        "user_prompt": "Kirill: What about Monday?",
+        "messages": HISTORY,
+        "next_request": {
+            "model": "test/model",
+            "persona": "Bob",
+            "user_prompt": "Kirill: Bob?",
+            "messages": [
+                *HISTORY,
+                {"role": "user", "name": "Kirill", "content": "What about Monday?"},
+                {"role": "user", "name": "Alice", "content": "{{reply}}"},
+            ],
+        },
+    }
+    following = {
+        "request_id": "r-2",
+        "model": "test/model",
+        "persona": "Bob",
+        "user_prompt": "Kirill: Bob?",
+        "messages": [
+            *HISTORY,
+            {"role": "user", "name": "Kirill", "content": "What about Monday?"},
+            {"role": "user", "name": "Alice", "content": "Monday works."},
+        ],
+    }
+
+    def parse(fields: dict) -> LLMRequest:
+        if fmt == SerializationFormat.JSON:
+            return deserialize_request(json.dumps(fields), fmt)
+        return protobuf_request(fields)
+
+    async def scenario():
+        await websocket.speculate_next("client", parse(current), "Monday works.")
+        speculation = speculator._by_client["client"]
+        await speculation.wait()
+        return speculator.claim("client", parse(following))
+
+    speculation = asyncio.run(scenario())
+    assert speculation is not None
+    assert speculation.content() == "Sounds good."
+    assert speculator.stats()["committed"] == 1
+    assert speculator.stats()["mismatched"] == 0
+
+
+def predicted(persona: str = "Bob", user_prompt: str = "Alice: Monday works.") -> LLMRequest:
+    return LLMRequest(
+        request_id="spec-1", model="test/model", user_prompt=user_prompt, persona=persona, priority="background"
+    )
+
+
+def chat() -> ChatCompletionRequest:
+    return ChatCompletionRequest(model="test/model", messages=[ChatMessage(role="user", content="hi")])
+
+
+def client_request(persona: str = "Bob", user_prompt: str = "Alice: Monday works.") -> LLMRequest:
+    return LLMRequest(request_id="r-2", model="test/model", user_prompt=user_prompt, persona=persona)
+
+
+async def started(generator: SpeculativeGenerator, request: LLMRequest | None = None) -> Speculation:
+    generator.start("client", request or predicted(), chat(), estimated_prompt_tokens=10)
+    return generator._by_client["client"]
+
+
+def test_matching_request_claims_finished_speculation():
+    generator = make_generator()
+
+    async def scenario() -> Speculation | None:
+        speculation = await started(generator)
+        await speculation.wait()
+        return generator.claim("client", client_request())
+
+    speculation = asyncio.run(scenario())
+    assert speculation is not None and speculation.content() == "Sounds good."
+    stats = generator.stats()
+    assert (stats["committed"], stats["active"], stats["hit_rate"], stats["wasted_tokens"]) == (1, 0, 1.0, 0)
+
+
+def test_claim_follows_a_running_speculation_live():
+    release = asyncio.Event()
+
+    async def upstream(request, entry):
+        entry.queue_ms = 0.0
+        yield chunks("Sounds ")[0]
+        await release.wait()
+        yield chunks("good.")[0]
+
+    generator = SpeculativeGenerator(SpeculationConfig(enabled=True), stream=upstream)
+
+    async def scenario() -> str:
+        speculation = await started(generator)
+        await asyncio.sleep(0.01)
+        claimed = generator.claim("client", client_request())
+        assert claimed is speculation and not claimed.done
+        release.set()
+        return "".join([piece async for piece in claimed.follow()])
+
+    assert asyncio.run(scenario()) == "Sounds good."
+
+
+def test_different_request_of_same_persona_discards_speculation():
+    generator = make_generator()
+
+    async def scenario() -> tuple[Speculation, Speculation | None]:
+        speculation = await started(generator)
+        await speculation.wait()
+        speculation.entry.prompt_tokens, speculation.entry.completion_tokens = 10, 2
+        return speculation, generator.claim("client", client_request(user_prompt="Alice: Tuesday then."))
+
+    speculation, claimed = asyncio.run(scenario())
+    assert claimed is None
+    stats = generator.stats()
+    assert (stats["mismatched"], stats["active"], stats["wasted_tokens"], stats["wasted_tokens_in_window"]) == (
+        1, 0, 12, 12
+    )
+
+
+def test_request_of_another_persona_keeps_speculation():
+    generator = make_generator()
+
+    async def scenario() -> Speculation | None:
+        speculation = await started(generator)
+        await speculation.wait()
+        assert generator.claim("client", client_request(persona="Carol")) is None
+        return generator.claim("client", client_request())
+
+    assert asyncio.run(scenario()) is not None
+    assert generator.stats()["mismatched"] == 0
+    assert generator.stats()["committed"] == 1
+
+
+def test_speculation_waiting_for_a_slot_is_not_started():
+    async def upstream(request, entry):
+        await asyncio.Event().wait()  # Never admitted
+        yield chunks("never")[0]
+
+    generator = SpeculativeGenerator(SpeculationConfig(enabled=True), stream=upstream)
+
+    async def scenario() -> tuple[Speculation, Speculation | None]:
+        speculation = await started(generator)
+        await asyncio.sleep(0.01)
+        claimed = generator.claim("client", client_request())
+        await asyncio.sleep(0)
+        return speculation, claimed
+
+    speculation, claimed = asyncio.run(scenario())
+    assert claimed is None
+    assert speculation.task.cancelled()
+    stats = generator.stats()
+    # Nothing was generated, so nothing was wasted
+    assert (stats["not_started"], stats["wasted_tokens"]) == (1, 0)
+
+
+def test_expired_speculation_is_not_claimed(monkeypatch):
+    generator = make_generator(ttl_sec=5)
+    now = time.monotonic()
+    monkeypatch.setattr(speculation_module.time, "monotonic", lambda: now)
+
+    async def scenario() -> Speculation | None:
+        speculation = await started(generator)
+        await speculation.wait()
+        monkeypatch.setattr(speculation_module.time, "monotonic", lambda: now + 6)
+        return generator.claim("client", client_request())
+
+    assert asyncio.run(scenario()) is None
+    assert generator.stats()["expired"] == 1
+
+
+def test_spent_budget_skips_new_speculations():
+    generator = make_generator(wasted_tokens_per_hour=10)
+
+    async def scenario() -> None:
+        speculation = await started(generator)
+        await speculation.wait()
+        speculation.entry.prompt_tokens, speculation.entry.completion_tokens = 8, 4
+        # The new prediction replaces the unclaimed one, which spends the budget
+        generator.start("client", predicted(user_prompt="Alice: Tuesday then."), chat(), estimated_prompt_tokens=10)
+
+    asyncio.run(scenario())
+    stats = generator.stats()
+    assert (stats["started"], stats["replaced"], stats["skipped_budget"], stats["active"]) == (1, 1, 1, 0)
+    assert stats["wasted_tokens_in_window"] == 12
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from src.core.similarity_cache import CachedResponse, CacheHit
+from src.core.speculation import SpeculativeGenerator
+from src.core.stop_detector import FINISH_REASON, StopDetector, StopDetectors
+from src.models.config import SpeculationConfig, StopDetectorConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage, StreamChoice, StreamChunk, StreamDelta
+from src.models.requests import LLMRequest
+from src.server import websocket
+
+
+SENTENCE = "This is a repeated sentence! "
+
+
+def detector(**config) -> StopDetector:
+    return StopDetectors(StopDetectorConfig(enabled=True, **config)).detector("Alice")
+
+
+def stream(detector: StopDetector, text: str, chunk: int = 5) -> str:
+    sent = "".join(detector.feed(text[i:i + chunk]) for i in range(0, len(text), chunk))
+    return sent + detector.flush()
+
+
+@pytest.mark.parametrize("intro", ["", "Intro text. ", "x" * 500 + "\nIntro text. "])
+@pytest.mark.parametrize("chunk", [1, 5, 64])
+def test_repetition_is_cut_at_the_second_copy(intro, chunk):
+    d = detector()
+    sent = stream(d, intro + SENTENCE * 6, chunk)
+    assert d.match.kind == "repetition"
+    assert sent.rstrip() == (intro + SENTENCE).rstrip()
+    assert d.discarded.lstrip().startswith(SENTENCE.strip())
+
+
+def test_repetition_cut_never_splits_a_copy_already_sent():
+    # A long block: part of the second copy is sent before the third one completes
+    block = (
+        "Then the committee met again to discuss the budget, "
+        "the schedule and who would present it to the board in May."
+    )
+    assert 100 < len(block) <= StopDetectorConfig().repetition_max_period
+    d = detector()
+    sent = stream(d, "Intro. " + block * 5)
+    assert d.match.kind == "repetition"
+    assert sent == "Intro. " + block * 2
+
+
+def test_short_runs_are_not_loops():
+    d = detector()
+    rule = "=" * 200 + "\n"
+    assert stream(d, "Table\n" + rule + "done") == "Table\n" + rule + "done"
+    assert d.match is None
+
+
+def test_other_speaker_at_reply_start_is_cut():
+    d = detector(speakers=["Alice", "Bob"])
+    assert stream(d, "Bob: I think so.") == ""
+    assert d.match.kind == "speaker"
+
+
+def test_own_name_at_reply_start_is_kept():
+    d = detector(speakers=["Alice", "Bob"])
+    assert stream(d, "Alice: I think so.\nBob: me too") == "Alice: I think so.\n"
+
+
+def test_feed_all_cuts_a_complete_reply():
+    d = detector()
+    assert d.feed_all("Intro text. " + SENTENCE * 6).rstrip() == ("Intro text. " + SENTENCE).rstrip()
+    assert d.match.kind == "repetition"
+
+
+def _chunks(text: str, size: int = 7) -> list[StreamChunk]:
+    return [
+        StreamChunk(id="gen", model="test/model", choices=[StreamChoice(delta=StreamDelta(content=text[i:i + size]))])
+        for i in range(0, len(text), size)
+    ]
+
+
+def test_speculated_reply_is_cut_and_its_stream_closed():
+    chunks = _chunks("Intro text. " + SENTENCE * 40)
+    consumed = []
+
+    async def upstream(request, entry):
+        entry.queue_ms = 0.0
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    detectors = StopDetectors(StopDetectorConfig(enabled=True))
+    generator = SpeculativeGenerator(SpeculationConfig(enabled=True), stream=upstream, stop_detectors=detectors)
+    predicted = LLMRequest(request_id="spec-1", model="test/model", user_prompt="hi", persona="Alice")
+    chat_request = ChatCompletionRequest(model="test/model", messages=[ChatMessage(role="user", content="hi")])
+
+    async def scenario():
+        generator.start("client", predicted, chat_request, estimated_prompt_tokens=10)
+        speculation = generator._by_client["client"]
+        await speculation.wait()
+        return speculation
+
+    speculation = asyncio.run(scenario())
+    assert speculation.content().rstrip() == ("Intro text. " + SENTENCE).rstrip()
+    assert speculation.finish_reason == FINISH_REASON
+    assert speculation.entry.prompt_tokens == 10
+    assert len(consumed) < len(chunks)
+    assert detectors.stats()["stopped_repetition"] == 1
+
+
+def test_cached_reply_is_cut(monkeypatch):
+    sent = []
+
+    async def send_response(ws, response, fmt):
+        sent.append(response)
+
+    detectors = StopDetectors(StopDetectorConfig(enabled=True, speakers=["Alice", "Bob"]))
+    monkeypatch.setattr(websocket, "send_response", send_response)
+    monkeypatch.setattr(websocket, "get_stop_detectors", lambda: detectors)
+    hit = CacheHit(
+        hit_id=1,
+        entry_id=1,
+        similarity=0.99,
+        response=CachedResponse(
+            content="Sure.\nBob: and I agree", finish_reason="stop", prompt_tokens=5, completion_tokens=5
+        ),
+    )
+    request = LLMRequest(request_id="r-1", model="test/model", user_prompt="hi", persona="Alice", stream=False)
+
+    content, finish_reason = asyncio.run(websocket.send_cached_response(None, request, None, hit))
+    assert (content, finish_reason) == ("Sure.\n", FINISH_REASON)
+    assert sent[-1].content == "Sure.\n"
+    assert sent[-1].finish_reason == FINISH_REASON
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+
+from src.core import summarizer, token_counter
+from src.core.summarizer import SUMMARY_HEADER, DialogSummarizer
+from src.core.token_counter import INLINE_MAX_CHARS, estimate_prompt_tokens, estimate_prompt_tokens_async
+from src.models.config import SummarizationConfig
+from src.models.openrouter import ChatCompletionRequest, ChatMessage
+
+
+def chat(*contents: str) -> ChatCompletionRequest:
+    return ChatCompletionRequest(
+        model="test/model",
+        messages=[ChatMessage(role="user" if i % 2 == 0 else "assistant", content=c) for i, c in enumerate(contents)],
+    )
+
+
+def counting_threads(monkeypatch, module, texts: list[str] | None = None) -> list[threading.Thread]:
+    """Record the thread of every count_tokens call made through module, and optionally the text."""
+    threads = []
+    count_tokens = token_counter.count_tokens
+
+    def record(text: str) -> int:
+        threads.append(threading.current_thread())
+        if texts is not None:
+            texts.append(text)
+        return count_tokens(text)
+
+    monkeypatch.setattr(module, "count_tokens", record)
+    return threads
+
+
+def test_short_prompt_is_counted_inline(monkeypatch):
+    threads = counting_threads(monkeypatch, token_counter)
+    request = chat("hello", "hi there")
+    assert asyncio.run(estimate_prompt_tokens_async(request)) == estimate_prompt_tokens(request)
+    assert set(threads) == {threading.main_thread()}
+
+
+def test_long_prompt_is_counted_off_the_event_loop(monkeypatch):
+    threads = counting_threads(monkeypatch, token_counter)
+    request = chat("word " * INLINE_MAX_CHARS)
+    assert asyncio.run(estimate_prompt_tokens_async(request)) == estimate_prompt_tokens(request)
+    assert threading.main_thread() in threads  # The direct call above
+    assert any(thread is not threading.main_thread() for thread in threads)
+
+
+def make_summarizer() -> DialogSummarizer:
+    async def complete(request: ChatCompletionRequest) -> str:
+        return "They talked."
+
+    return DialogSummarizer(SummarizationConfig(enabled=True, trigger_tokens=1000, keep_recent_tokens=0), complete)
+
+
+def test_summarizer_skips_short_history_without_counting(monkeypatch):
+    threads = counting_threads(monkeypatch, summarizer)
+    request = chat("hello", "hi", "how are you?")
+    assert asyncio.run(make_summarizer().apply(request)) is request
+    assert threads == []
+
+
+def test_summarizer_counts_long_history_off_the_event_loop(monkeypatch):
+    texts = []
+    threads = counting_threads(monkeypatch, summarizer, texts)
+    history = ["message %d " % i + "word " * 200 for i in range(20)]
+
+    async def scenario() -> tuple[ChatCompletionRequest, ChatCompletionRequest]:
+        dialog = make_summarizer()
+        first = await dialog.apply(chat(*history))
+        while dialog.stats()["pending"]:
+            await asyncio.sleep(0.01)
+        # The same history, one message longer, gets the summary spliced in
+        return first, await dialog.apply(chat(*history, "and one more"))
+
+    first, second = asyncio.run(scenario())
+    assert len(first.messages) == len(history)
+    assert second.messages[0].content == SUMMARY_HEADER + "They talked."
+    assert len(second.messages) < len(history)
+    # Only the summary itself, a few hundred tokens at most, is counted on the loop
+    on_loop = [text for thread, text in zip(threads, texts) if thread is threading.main_thread()]
+    assert on_loop == ["They talked."]
+    assert len(threads) > len(history)
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.journal import JournalEntry
+from src.core.openrouter import OpenRouterError
+from src.core.stop_detector import StopDetectors
+from src.core.tools import Tool, ToolExecutor
+from src.models.config import OpenRouterConfig, StopDetectorConfig, ToolsConfig
+from src.models.openrouter import (
+    ChatCompletionChoice,
+    ChatCompletionRequest,
+    ChatCompletionResponse,
+    ChatMessage,
+    FunctionCall,
+    FunctionCallDelta,
+    StreamChoice,
+    StreamChunk,
+    StreamDelta,
+    ToolCall,
+    ToolCallDelta,
+    ToolDefinition,
+    ToolFunction,
+)
+from src.models.requests import LLMRequest
+from src.server import websocket
+from src.server.websocket import ROUND_SEPARATOR
+
+
+# Each round: (content, tool call or None)
+ROUNDS = [
+    ("Let me check.", ToolCall(id="call-1", function=FunctionCall(name="add", arguments="{}"))),
+    ("It is 4.", None),
+]
+
+
+class FakeClient:
+    """Upstream that answers each call with the next of ROUNDS."""
+
+    def __init__(self, stream_upstream: bool):
+        self.config = OpenRouterConfig(stream_upstream=stream_upstream)
+        self.requests: list[ChatCompletionRequest] = []
+
+    def _next(self, chat_request: ChatCompletionRequest) -> tuple[str, ToolCall | None]:
+        self.requests.append(chat_request)
+        return ROUNDS[len(self.requests) - 1]
+
+    async def chat_completion_stream(self, chat_request, deadline):
+        content, call = self._next(chat_request)
+        for i in range(0, len(content), 4):
+            delta = StreamDelta(content=content[i:i + 4])
+            yield StreamChunk(id="gen", model="test/model", choices=[StreamChoice(delta=delta)])
+        if call:
+            delta = StreamDelta(tool_calls=[
+                ToolCallDelta(id=call.id, type="function", function=FunctionCallDelta(name="add", arguments="{}"))
+            ])
+            yield StreamChunk(id="gen", model="test/model", choices=[StreamChoice(delta=delta)])
+        finish_reason = "tool_calls" if call else "stop"
+        yield StreamChunk(id="gen", model="test/model", choices=[StreamChoice(finish_reason=finish_reason)])
+
+    async def chat_completion(self, chat_request, deadline):
+        content, call = self._next(chat_request)
+        message = ChatMessage(role="assistant", content=content, tool_calls=[call] if call else None)
+        return ChatCompletionResponse(
+            id="gen", model="test/model", choices=[ChatCompletionChoice(message=message, finish_reason="stop")]
+        )
+
+
+def entry() -> JournalEntry:
+    return JournalEntry(
+        ts=time.time(), request_id="r-1", client_id="client", persona="", model="test/model",
+        priority="interactive", stream=False,
+    )
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    sent = []
+
+    async def send_response(ws, response, fmt):
+        sent.append(response)
+
+    executor = ToolExecutor(ToolsConfig())
+    executor.register(Tool(name="add", description="", parameters={}, handler=lambda: "4"))
+    monkeypatch.setattr(websocket, "send_response", send_response)
+    monkeypatch.setattr(websocket, "get_tool_executor", lambda: executor)
+    monkeypatch.setattr(websocket, "get_stop_detectors", lambda: StopDetectors(StopDetectorConfig()))
+    return sent
+
+
+@pytest.mark.parametrize("stream, stream_upstream", [(True, True), (False, True), (False, False)])
+def test_tool_step_texts_are_separated(sent, stream, stream_upstream):
+    client = FakeClient(stream_upstream)
+    request = LLMRequest(request_id="r-1", model="test/model", user_prompt="2 + 2?", stream=stream)
+    tool = ToolDefinition(function=ToolFunction(name="add", description="", parameters={}))
+    chat_request = ChatCompletionRequest(
+        model="test/model", messages=[ChatMessage(role="user", content="2 + 2?")], tools=[tool]
+    )
+    output = []
+
+    asyncio.run(websocket.process_request(None, request, None, client, chat_request, None, entry(), output))
+    expected = "Let me check." + ROUND_SEPARATOR + "It is 4."
+    if stream:
+        assert "".join(r.content for r in sent if r.type == "chunk") == expected
+    else:
+        assert sent[-1].content == expected
+    assert "".join(output) == expected
+    # The model sees its own turn without the separator
+    assert client.requests[1].messages[-2].content == "Let me check."
+
+
+def test_retry_resets_first_token_time(monkeypatch):
+    attempts = []
+
+    async def stream_round(ws, request, fmt, client, chat_request, deadline, entry, started_at, output, separator):
+        attempts.append(entry.first_token_ms)
+        if len(attempts) == 1:
+            entry.first_token_ms = 5.0
+            raise OpenRouterError("connection reset")
+        return websocket._Round("done", [], "stop", 1, 1)
+
+    monkeypatch.setattr(websocket, "stream_round", stream_round)
+    client = FakeClient(stream_upstream=True)
+    request = LLMRequest(request_id="r-1", model="test/model", user_prompt="hi", stream=False)
+    chat_request = ChatCompletionRequest(model="test/model", messages=[ChatMessage(role="user", content="hi")])
+
+    asyncio.run(websocket.collect_round(None, request, None, client, chat_request, None, entry(), 0.0, None))
+    assert attempts == [None, None]